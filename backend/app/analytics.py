@@ -0,0 +1,58 @@
+from datetime import date, timedelta
+from fastapi import HTTPException
+
+# daily_sales / daily_totals rollups (migration 0009). Physical orders count on the day they are placed, digital orders
+# on the day Paystack confirms them; callers hold the write transaction that places or pays the order.
+
+_COUNTED = "((o.type='digital' AND o.paid_at IS NOT NULL) OR (o.type='physical' AND o.status!='cancelled'))"
+_DAY = "date(CASE o.type WHEN 'digital' THEN o.paid_at ELSE o.created_at END)"
+
+def record_order(db, order_id: int):
+    db.execute(f"""INSERT INTO daily_sales(day, vendor_id, category_slug, product_type, orders, items, gmv_pesewas, commission_pesewas)
+                   SELECT {_DAY}, oi.vendor_id, COALESCE(p.category_slug, ''), oi.product_type,
+                          1, SUM(oi.qty), SUM(oi.price_pesewas*oi.qty), SUM(oi.commission_pesewas)
+                   FROM order_items oi JOIN orders o ON o.id=oi.order_id JOIN products p ON p.id=oi.product_id
+                   WHERE oi.order_id=?
+                   GROUP BY 1, 2, 3, 4
+                   ON CONFLICT(day, vendor_id, category_slug, product_type) DO UPDATE SET
+                     orders=orders+excluded.orders, items=items+excluded.items,
+                     gmv_pesewas=gmv_pesewas+excluded.gmv_pesewas, commission_pesewas=commission_pesewas+excluded.commission_pesewas""",
+               (order_id,))
+    db.execute(f"""INSERT INTO daily_totals(day, product_type, orders, items, gmv_pesewas, commission_pesewas)
+                   SELECT {_DAY}, o.type, 1, SUM(oi.qty), SUM(oi.price_pesewas*oi.qty), SUM(oi.commission_pesewas)
+                   FROM order_items oi JOIN orders o ON o.id=oi.order_id
+                   WHERE oi.order_id=?
+                   GROUP BY 1, 2
+                   ON CONFLICT(day, product_type) DO UPDATE SET
+                     orders=orders+excluded.orders, items=items+excluded.items,
+                     gmv_pesewas=gmv_pesewas+excluded.gmv_pesewas, commission_pesewas=commission_pesewas+excluded.commission_pesewas""",
+               (order_id,))
+
+def backfill(db, start: str | None = None, end: str | None = None) -> int:
+    # rebuilds the rollups for days in [start, end] (YYYY-MM-DD, open-ended when None) from orders; returns rows written
+    start, end = start or "0000-01-01", end or "9999-12-31"
+    db.execute("DELETE FROM daily_sales WHERE day BETWEEN ? AND ?", (start, end))
+    db.execute("DELETE FROM daily_totals WHERE day BETWEEN ? AND ?", (start, end))
+    n = db.execute(f"""INSERT INTO daily_sales(day, vendor_id, category_slug, product_type, orders, items, gmv_pesewas, commission_pesewas)
+                       SELECT {_DAY}, oi.vendor_id, COALESCE(p.category_slug, ''), oi.product_type,
+                              COUNT(DISTINCT oi.order_id), SUM(oi.qty), SUM(oi.price_pesewas*oi.qty), SUM(oi.commission_pesewas)
+                       FROM order_items oi JOIN orders o ON o.id=oi.order_id JOIN products p ON p.id=oi.product_id
+                       WHERE {_COUNTED} AND {_DAY} BETWEEN ? AND ?
+                       GROUP BY 1, 2, 3, 4""", (start, end)).rowcount
+    n += db.execute(f"""INSERT INTO daily_totals(day, product_type, orders, items, gmv_pesewas, commission_pesewas)
+                        SELECT {_DAY}, o.type, COUNT(DISTINCT o.id), SUM(oi.qty), SUM(oi.price_pesewas*oi.qty), SUM(oi.commission_pesewas)
+                        FROM order_items oi JOIN orders o ON o.id=oi.order_id
+                        WHERE {_COUNTED} AND {_DAY} BETWEEN ? AND ?
+                        GROUP BY 1, 2""", (start, end)).rowcount
+    return n
+
+def day_range(start: str | None, end: str | None, days: int = 30) -> tuple[str, str]:
+    # query-string range for the dashboards: inclusive YYYY-MM-DD bounds, the last `days` days by default
+    try:
+        last = date.fromisoformat(end) if end else date.today()
+        first = date.fromisoformat(start) if start else last - timedelta(days=days-1)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Dates must be YYYY-MM-DD")
+    if first > last or (last - first).days > 366:
+        raise HTTPException(status_code=422, detail="Invalid date range")
+    return first.isoformat(), last.isoformat()
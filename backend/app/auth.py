@@ -1,4 +1,5 @@
 import json, hmac, hashlib, time
+from functools import lru_cache
 from urllib.parse import parse_qsl
 from typing import Dict, Any
 from fastapi import HTTPException, Depends
@@ -6,9 +7,19 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt
 from .settings import settings
 from .db import get_db
+from .cache import TTLCache
+from .invalidation import register
 
 bearer = HTTPBearer(auto_error=False)
 
+# user_id -> vendor_id (or None) for tokens issued without a vendor claim; invalidated by register_vendor
+vendor_by_user = TTLCache(maxsize=50_000, ttl=300)
+register("vendor_by_user", vendor_by_user)
+
+@lru_cache(maxsize=4)
+def _webapp_secret(bot_token: str) -> bytes:
+    return hashlib.sha256(bot_token.encode("utf-8")).digest()
+
 def verify_telegram_webapp_init_data(init_data: str, bot_token: str, max_age_seconds: int = 24*3600) -> Dict[str, Any]:
     if not bot_token:
         raise HTTPException(status_code=500, detail="BOT_TOKEN not set")
@@ -27,8 +38,7 @@ def verify_telegram_webapp_init_data(init_data: str, bot_token: str, max_age_sec
             raise HTTPException(status_code=401, detail="Invalid auth_date")
 
     data_check_string = "\n".join([f"{k}={pairs[k]}" for k in sorted(pairs.keys())])
-    secret_key = hashlib.sha256(bot_token.encode("utf-8")).digest()
-    expected = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+    expected = hmac.new(_webapp_secret(bot_token), data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
     if not hmac.compare_digest(expected, received_hash):
         raise HTTPException(status_code=401, detail="Invalid initData signature")
 
@@ -42,8 +52,10 @@ def verify_telegram_webapp_init_data(init_data: str, bot_token: str, max_age_sec
 
     return {"telegram_id": int(user.get("id")), "first_name": user.get("first_name"), "username": user.get("username")}
 
-def create_jwt(user_id: int, role: str) -> str:
+def create_jwt(user_id: int, role: str, vendor_id: int | None = None) -> str:
     payload = {"sub": str(user_id), "role": role, "iat": int(time.time())}
+    if vendor_id:
+        payload["vid"] = vendor_id
     return jwt.encode(payload, settings.JWT_SECRET, algorithm="HS256")
 
 def require_user(creds: HTTPAuthorizationCredentials = Depends(bearer)) -> Dict[str, Any]:
@@ -51,7 +63,7 @@ def require_user(creds: HTTPAuthorizationCredentials = Depends(bearer)) -> Dict[
         raise HTTPException(status_code=401, detail="Missing token")
     try:
         decoded = jwt.decode(creds.credentials, settings.JWT_SECRET, algorithms=["HS256"])
-        return {"user_id": int(decoded["sub"]), "role": decoded.get("role", "customer")}
+        return {"user_id": int(decoded["sub"]), "role": decoded.get("role", "customer"), "vendor_id": decoded.get("vid")}
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -61,8 +73,13 @@ def require_admin(user=Depends(require_user)):
     return user
 
 def require_vendor(user=Depends(require_user)):
-    with get_db() as db:
-        v = db.execute("SELECT v.id FROM vendors v WHERE v.user_id=?", (user["user_id"],)).fetchone()
-        if not v:
-            raise HTTPException(status_code=403, detail="Vendor required")
-        return {"user_id": user["user_id"], "role": user["role"], "vendor_id": v["id"]}
+    vendor_id = user["vendor_id"]
+    if not vendor_id:
+        def load():
+            with get_db() as db:
+                v = db.execute("SELECT v.id FROM vendors v WHERE v.user_id=?", (user["user_id"],)).fetchone()
+                return v["id"] if v else None
+        vendor_id = vendor_by_user.get_or_set(user["user_id"], load)
+    if not vendor_id:
+        raise HTTPException(status_code=403, detail="Vendor required")
+    return {"user_id": user["user_id"], "role": user["role"], "vendor_id": vendor_id}
@@ -0,0 +1,66 @@
+from fastapi import HTTPException
+from .analytics import record_order
+from .db import get_db
+from .settings import settings
+
+# Shared write path for /api/checkout/*: one BEGIN IMMEDIATE transaction, INSERT ... RETURNING for the order
+# and executemany for its rows, so a checkout never upgrades a read lock halfway through.
+
+def _existing(db, user_id: int, key: str, order_type: str):
+    o = db.execute("""SELECT o.id, o.type, o.status, o.total_pesewas, o.paystack_reference, p.status AS payment_status, p.authorization_url
+                      FROM orders o LEFT JOIN payments p ON p.reference=o.paystack_reference
+                      WHERE o.user_id=? AND o.idempotency_key=?""", (user_id, key)).fetchone()
+    if o and o["type"] != order_type:
+        raise HTTPException(status_code=422, detail="Idempotency-Key already used for a different checkout")
+    return o
+
+def place_order(user_id: int, order_type: str, cart_item_ids: list[int], idempotency_key: str | None = None, delivery=None):
+    # returns (order row, replayed); the order row has id, total_pesewas, paystack_reference and, for digital, email
+    if not cart_item_ids:
+        raise HTTPException(status_code=400, detail="No items")
+    with get_db(immediate=True) as db:
+        if idempotency_key:
+            o = _existing(db, user_id, idempotency_key, order_type)
+            if o:
+                return dict(o), True
+        q = ",".join("?"*len(cart_item_ids))
+        rows = db.execute(f"""SELECT ci.id AS cart_item_id, ci.qty, p.id, p.vendor_id, p.type, p.name, p.price_pesewas FROM cart_items ci
+                               JOIN carts c ON c.id=ci.cart_id
+                               JOIN products p ON p.id=ci.product_id
+                               WHERE c.user_id=? AND ci.id IN ({q})""", (user_id, *cart_item_ids)).fetchall()
+        if not rows:
+            raise HTTPException(status_code=400, detail="No items")
+        if any(r["type"] != order_type for r in rows):
+            raise HTTPException(status_code=400, detail=f"{order_type.capitalize()} checkout must contain {order_type} items only")
+
+        items = []
+        for r in rows:
+            gross = int(r["price_pesewas"])*int(r["qty"])
+            commission = int(round(gross*settings.COMMISSION_RATE)) if order_type == "digital" else 0
+            items.append((r["id"], r["vendor_id"], order_type, r["name"], r["price_pesewas"], r["qty"], commission, gross-commission if order_type == "digital" else 0))
+        total = sum(int(r["price_pesewas"])*int(r["qty"]) for r in rows)
+        status = "pending_payment" if order_type == "digital" else "new"
+
+        order = dict(db.execute("""INSERT INTO orders(user_id, type, status, total_pesewas, idempotency_key) VALUES(?,?,?,?,?)
+                                   RETURNING id, total_pesewas""", (user_id, order_type, status, total, idempotency_key)).fetchone())
+        oid = order["id"]
+        db.executemany("""INSERT INTO order_items(order_id, product_id, vendor_id, product_type, name_snapshot, price_pesewas, qty, commission_pesewas, vendor_net_pesewas)
+                          VALUES(?,?,?,?,?,?,?,?,?)""", [(oid, *i) for i in items])
+
+        if order_type == "physical":
+            db.executemany("INSERT OR IGNORE INTO vendor_order_status(order_id, vendor_id, status) VALUES(?,?, 'new')",
+                           [(oid, v) for v in {r["vendor_id"] for r in rows}])
+            d = delivery
+            db.execute("""INSERT INTO order_delivery_details(order_id, full_name, phone, region, city, address, notes)
+                          VALUES(?,?,?,?,?,?,?)""", (oid, d.full_name, d.phone, d.region, d.city, d.address, d.notes))
+            db.execute(f"DELETE FROM cart_items WHERE id IN ({q}) AND cart_id=(SELECT id FROM carts WHERE user_id=?)", (*cart_item_ids, user_id))
+            record_order(db, oid)
+            order["paystack_reference"] = None
+        else:
+            # digital cart items stay until Paystack hands back an authorization_url (see routes/checkout.py)
+            ref = f"ord_{oid}_{user_id}"
+            db.execute("UPDATE orders SET paystack_reference=? WHERE id=?", (ref, oid))
+            db.execute("INSERT INTO payments(purpose, order_id, reference, amount_pesewas, status) VALUES('order',?,?,?,'initiated')", (oid, ref, total))
+            order["paystack_reference"] = ref
+            order["email"] = f"{db.execute('SELECT telegram_id FROM users WHERE id=?', (user_id,)).fetchone()['telegram_id']}@telegram.local"
+    return order, False
@@ -0,0 +1,86 @@
+import argparse
+import sys
+from .db import connect
+
+def cmd_migrate(args):
+    from .init_db import migrate
+    conn = connect()
+    try:
+        applied = migrate(conn)
+    finally:
+        conn.close()
+    print(f"applied: {applied}" if applied else "schema is current")
+
+def cmd_check_query_plans(args):
+    from .query_plans import check
+    failures, skipped = check()
+    for where, sql, detail in failures:
+        print(f"FULL SCAN {where}: {detail}\n    {sql}")
+    if args.verbose:
+        for where in skipped:
+            print(f"skipped (dynamic SQL) {where}")
+    print(f"{len(failures)} full scan(s), {len(skipped)} dynamic statement(s) skipped")
+    return 1 if failures else 0
+
+def cmd_reconcile_wallets(args):
+    from .db import get_db
+    from .wallet import reconcile
+    with get_db(immediate=args.fix) as db:
+        mismatches = reconcile(db, fix=args.fix)
+    for m in mismatches:
+        print(f"vendor {m['vendor_id']}: ledger credited={m['credited']} debited={m['debited']} reserved={m['reserved']}"
+              f" | balance credited={m['credited_pesewas']} debited={m['debited_pesewas']} reserved={m['reserved_pesewas']}")
+    print(f"{len(mismatches)} mismatched balance(s){' fixed' if args.fix and mismatches else ''}")
+    return 1 if mismatches and not args.fix else 0
+
+def cmd_backfill_analytics(args):
+    from .analytics import backfill
+    from .db import get_db
+    with get_db(immediate=True) as db:
+        n = backfill(db, args.start, args.end)
+    print(f"{n} rollup row(s) written for {args.start or 'first order'}..{args.end or 'latest'}")
+
+def cmd_replay_webhooks(args):
+    from .paystack_events import replay
+    n = replay(ids=args.id, reference=args.reference, status=args.status)
+    print(f"{n} event(s) queued for replay")
+
+def cmd_sweep_subscriptions(args):
+    from .settings import settings
+    from .subscriptions import expire_lapsed, pause_over_limit, queue_reminders
+    batch = settings.SUBSCRIPTION_SWEEP_BATCH
+    counts = []
+    for step in (expire_lapsed, pause_over_limit, queue_reminders):
+        total = n = step(batch)
+        while n >= batch:
+            n = step(batch)
+            total += n
+        counts.append(total)
+    print("{} subscription(s) expired, {} listing(s) paused, {} reminder(s) queued".format(*counts))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="apply pending schema migrations").set_defaults(func=cmd_migrate)
+    p = sub.add_parser("check-query-plans", help="fail if a query in app/routes falls back to a full table scan")
+    p.add_argument("-v", "--verbose", action="store_true")
+    p.set_defaults(func=cmd_check_query_plans)
+    p = sub.add_parser("reconcile-wallets", help="check vendor_balances against wallet_ledger and withdrawals")
+    p.add_argument("--fix", action="store_true", help="rewrite mismatched balances from the ledger")
+    p.set_defaults(func=cmd_reconcile_wallets)
+    p = sub.add_parser("backfill-analytics", help="rebuild the daily sales rollups from orders")
+    p.add_argument("--from", dest="start", help="first day to rebuild, YYYY-MM-DD (default: all)")
+    p.add_argument("--to", dest="end", help="last day to rebuild, YYYY-MM-DD (default: all)")
+    p.set_defaults(func=cmd_backfill_analytics)
+    p = sub.add_parser("replay-webhooks", help="re-queue stored Paystack events for processing")
+    p.add_argument("--id", type=int, action="append", help="event id (repeatable)")
+    p.add_argument("--reference", help="only events for this payment reference")
+    p.add_argument("--status", default="failed", help="replay events in this status (default: failed)")
+    p.set_defaults(func=cmd_replay_webhooks)
+    sub.add_parser("sweep-subscriptions", help="expire lapsed subscriptions, pause over-limit listings and queue renewal reminders now"
+                   ).set_defaults(func=cmd_sweep_subscriptions)
+    args = parser.parse_args(argv)
+    return args.func(args) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import gzip
+from starlette.concurrency import run_in_threadpool
+from . import metrics
+from .settings import settings
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it clients get gzip
+    brotli = None
+
+COMPRESSIBLE = ("application/json", "text/", "application/javascript", "image/svg+xml")
+OFFLOAD_BYTES = 64 * 1024  # larger bodies are compressed on the threadpool instead of the event loop
+
+compressed_bytes = metrics.Counter("http_compressed_bytes_total", "Bodies of compressed responses, before (identity) and after compression",
+                                   ("encoding", "stage"))
+
+def _accepted(header: str) -> set[str]:
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+def _encoding(scope) -> str | None:
+    header = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+    accepted = _accepted(header) if header else set()
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESS_GZIP_LEVEL, mtime=0)
+
+class CompressionMiddleware:
+    # pure ASGI: compresses single-message JSON/text responses of at least COMPRESS_MIN_BYTES with br (when the brotli
+    # package is installed) or gzip. Streamed bodies (file downloads) and already-encoded responses pass through.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        encoding = _encoding(scope) if scope["type"] == "http" and settings.COMPRESS_RESPONSES else None
+        if encoding is None:
+            return await self.app(scope, receive, send)
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                return await send(message)
+            pending, start = start, None
+            headers = [(k, v) for k, v in pending["headers"]]
+            body = message.get("body", b"")
+            ctype = next((v.decode("latin-1") for k, v in headers if k == b"content-type"), "")
+            if (message.get("more_body") or len(body) < settings.COMPRESS_MIN_BYTES or pending["status"] in (206, 304)
+                    or any(k == b"content-encoding" for k, _ in headers) or not ctype.startswith(COMPRESSIBLE)):
+                await send(pending)
+                return await send(message)
+            out = await run_in_threadpool(_compress, body, encoding) if len(body) >= OFFLOAD_BYTES else _compress(body, encoding)
+            compressed_bytes.inc(encoding, "in", amount=len(body))
+            compressed_bytes.inc(encoding, "out", amount=len(out))
+            # the ETag becomes weak: same content, different bytes; etag_matches() ignores the W/ prefix on revalidation
+            headers = [(k, b"W/" + v if k == b"etag" and not v.startswith(b"W/") else v) for k, v in headers if k != b"content-length"]
+            vary = [v for k, v in headers if k == b"vary"]
+            headers = [(k, v) for k, v in headers if k != b"vary"]
+            headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(out)).encode()),
+                        (b"vary", b", ".join(vary + [b"Accept-Encoding"]))]
+            await send({**pending, "headers": headers})
+            await send({**message, "body": out})
+
+        await self.app(scope, receive, send_wrapper)
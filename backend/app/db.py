@@ -1,21 +1,375 @@
+import logging
+import queue
+from collections import deque
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
+from . import metrics, query_budget
 from .settings import settings
 
+log = logging.getLogger(__name__)
+
+# execute()/executemany() mark statement boundaries for app/metrics.py. sqlite's own trace callback was too costly here:
+# it hands back expanded SQL for every statement (FTS5 and trigger internals included) and re-takes the GIL each time.
+class Cursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        self.connection.observe(sql)
+        if self.connection.journal is not None and sql.lstrip()[:6].upper() != "SELECT":
+            self.connection.journal.append((sql, params, False))
+        return super().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        self.connection.observe(sql)
+        if self.connection.journal is not None:
+            seq_of_params = list(seq_of_params)
+            self.connection.journal.append((sql, seq_of_params, True))
+        return super().executemany(sql, seq_of_params)
+
+class Connection(sqlite3.Connection):
+    tracer = None
+    recorder = None  # app/query_budget.py, set by get_db() for the duration of a request when QUERY_BUDGETS=1
+    hooks = None  # after_commit() callbacks of the current get_db() block
+    journal = None  # (sql, params, many) written by the current group-commit write unit, for GroupCommitWriter._replay
+
+    def after_commit(self, fn):
+        # runs fn once the current get_db() block has committed (dropped on rollback); immediately outside get_db()
+        if self.hooks is None:
+            fn()
+        else:
+            self.hooks.append(fn)
+
+    def observe(self, sql: str):
+        if self.tracer:
+            self.tracer.trace(sql)
+        if self.recorder is not None:
+            self.recorder.record(sql)
+
+    def cursor(self, factory=Cursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
 def connect():
-    conn = sqlite3.connect(settings.DATABASE_PATH, check_same_thread=False)
+    conn = sqlite3.connect(
+        settings.DATABASE_PATH,
+        check_same_thread=False,
+        timeout=settings.DB_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=settings.DB_STATEMENT_CACHE_SIZE,
+        factory=Connection,
+    )
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute(f"PRAGMA busy_timeout = {int(settings.DB_BUSY_TIMEOUT_MS)};")
+    conn.execute(f"PRAGMA synchronous = {settings.DB_SYNCHRONOUS};")
+    conn.execute(f"PRAGMA mmap_size = {int(settings.DB_MMAP_SIZE)};")
+    conn.execute(f"PRAGMA cache_size = -{int(settings.DB_CACHE_SIZE_KB)};")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    if settings.SQL_METRICS:
+        conn.tracer = metrics.StatementTracer()
+        if settings.SQL_PROGRESS_STEPS:
+            conn.set_progress_handler(conn.tracer.progress, settings.SQL_PROGRESS_STEPS)
     return conn
 
+class ConnectionPool:
+    def __init__(self, size: int, timeout: float, health_check_after: float):
+        self.size = size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._in_use = 0
+        self._stats = {"acquired": 0, "created": 0, "discarded": 0, "waits": 0, "timeouts": 0}
+
+    def _open(self):
+        conn = connect()
+        with self._lock:
+            self._stats["created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._opened -= 1
+            self._stats["discarded"] += 1
+
+    def _healthy(self, conn, idle_since: float) -> bool:
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        while True:
+            try:
+                conn, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._opened < self.size
+                    if can_open:
+                        self._opened += 1
+                if can_open:
+                    try:
+                        conn = self._open()
+                    except Exception:
+                        with self._lock:
+                            self._opened -= 1
+                        raise
+                    break
+                with self._lock:
+                    self._stats["waits"] += 1
+                try:
+                    conn, idle_since = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._stats["timeouts"] += 1
+                    raise RuntimeError("Database connection pool exhausted")
+            if self._healthy(conn, idle_since):
+                break
+            self._discard(conn)
+        with self._lock:
+            self._in_use += 1
+            self._stats["acquired"] += 1
+        return conn
+
+    def release(self, conn, broken: bool = False):
+        with self._lock:
+            self._in_use -= 1
+        if broken or conn.in_transaction:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            return {"size": self.size, "open": self._opened, "in_use": self._in_use, "idle": self._idle.qsize(), **self._stats}
+
+pool = ConnectionPool(settings.DB_POOL_SIZE, settings.DB_POOL_TIMEOUT, settings.DB_HEALTH_CHECK_AFTER)
+
+class _Unit:
+    __slots__ = ("turn", "committed", "error", "broken", "failed", "hooks", "journal")
+
+    def __init__(self):
+        self.turn, self.committed = threading.Event(), threading.Event()
+        self.error = None
+        self.broken = False
+        self.failed = False  # the unit raised and was rolled back to its savepoint; its caller already has the error
+        self.hooks = []
+        self.journal = []
+
+class GroupCommitWriter:
+    # DB_WRITE_QUEUE=1: get_db(immediate=True) units queue for one shared writer connection instead of racing for the
+    # write lock. Units run one at a time, each inside a SAVEPOINT so a failing unit rolls back alone; the unit that
+    # finishes with nobody queued behind it (or the DB_WRITE_BATCH-th) commits for the whole batch, and every caller
+    # returns only after that commit. The connection is handed from unit to unit directly: a separate writer thread
+    # would add a second GIL handoff per unit, which cost more than the commit it saves. Reads stay on the pool.
+    # If the batch is lost anyway (a failed COMMIT, or a unit that left the connection unusable), the statements of the
+    # other units are replayed on a fresh connection rather than failing requests whose work was fine (_replay).
+    def __init__(self, max_batch: int):
+        self.max_batch = max_batch
+        self.conn = None
+        self._probe = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._waiting = deque()
+        self._busy = False
+        self._batch: list[_Unit] = []
+        self._local = threading.local()
+
+    def _acquire(self) -> _Unit:
+        if getattr(self._local, "active", False):
+            raise RuntimeError("nested write unit: get_db(immediate=True) inside another write unit")
+        unit = _Unit()
+        with self._lock:
+            if self._busy:
+                self._waiting.append(unit)
+            else:
+                self._busy = True
+                unit.turn.set()
+        unit.turn.wait()
+        return unit
+
+    def _pass(self):
+        with self._lock:
+            if self._waiting:
+                self._waiting.popleft().turn.set()
+            else:
+                self._busy = False
+
+    def _finish(self, unit: _Unit):
+        # runs in the unit's thread while it still holds the connection
+        self._batch.append(unit)
+        with self._lock:
+            nxt = self._waiting.popleft() if self._waiting and len(self._batch) < self.max_batch and not unit.broken else None
+        if nxt is not None:
+            nxt.turn.set()
+            return
+        batch, self._batch = self._batch, []
+        error = None
+        try:
+            if unit.broken:
+                raise sqlite3.OperationalError("write unit left the connection unusable; batch rolled back")
+            self.conn.commit()
+        except sqlite3.Error as e:
+            error = e
+            try:
+                self.conn.rollback()
+            except sqlite3.Error:
+                pass
+            self.conn.close()
+            self.conn = None
+            if self._replay([u for u in batch if not u.failed]):
+                error = None
+        metrics.db_group_commit_size.observe(value=len(batch))
+        for u in batch:
+            u.error = error
+            u.committed.set()
+        self._pass()
+
+    def _data_version(self) -> int:
+        # PRAGMA data_version on a side connection changes whenever any other connection (the writer included) commits
+        if self._probe is None:
+            self._probe = connect()
+        return self._probe.execute("PRAGMA data_version").fetchone()[0]
+
+    def _replay(self, units: list[_Unit]) -> bool:
+        # re-runs the surviving units' statements in their original order in one new transaction. Only when nothing has
+        # committed since the lost batch began: then every statement sees the database it saw the first time, so ids,
+        # lookups and the decisions the units made from them come out the same.
+        if not units:
+            return True
+        conn = None
+        try:
+            conn = connect()
+            conn.execute("BEGIN IMMEDIATE")
+            if self._data_version() != self._version:
+                raise sqlite3.OperationalError("database changed since the batch began")
+            for u in units:
+                for sql, params, many in u.journal:
+                    (conn.executemany if many else conn.execute)(sql, params)
+            conn.commit()
+        except sqlite3.Error as e:
+            log.error("group commit: replay of %d unit(s) failed: %s", len(units), e)
+            if conn is not None:
+                conn.close()
+            return False
+        log.warning("group commit: batch lost; %d unit(s) replayed on a fresh connection", len(units))
+        self.conn = conn
+        return True
+
+    @contextmanager
+    def unit(self):
+        with metrics.db_lock_wait.time():
+            unit = self._acquire()
+            if not self._batch:
+                try:
+                    if self.conn is None:
+                        self.conn = connect()
+                    self.conn.execute("BEGIN IMMEDIATE")
+                    self._version = self._data_version()
+                except sqlite3.Error:
+                    self._pass()
+                    raise
+        conn = self.conn
+        conn.recorder = query_budget.current.get() if settings.QUERY_BUDGETS else None
+        conn.hooks = unit.hooks
+        self._local.active = True
+        try:
+            conn.execute("SAVEPOINT write_unit")
+            conn.journal = unit.journal
+            yield conn
+            conn.journal = None
+            conn.execute("RELEASE write_unit")
+        except BaseException:
+            conn.journal = None
+            unit.failed = True
+            try:
+                conn.execute("ROLLBACK TO write_unit")
+                conn.execute("RELEASE write_unit")
+            except sqlite3.Error:
+                unit.broken = True
+            raise
+        finally:
+            conn.journal = None
+            self._local.active = False
+            if conn.tracer:
+                conn.tracer.finish()
+            conn.recorder = conn.hooks = None
+            self._finish(unit)
+        unit.committed.wait()
+        if unit.error:
+            raise unit.error
+        for fn in unit.hooks:
+            fn()
+
+    def close(self):
+        unit = self._acquire()
+        for conn in (self.conn, self._probe):
+            if conn is not None:
+                conn.close()
+        self.conn = self._probe = None
+        self._pass()
+
+writer = GroupCommitWriter(settings.DB_WRITE_BATCH)
+
+def fetch_all(db, sql: str, params=()) -> list[dict]:
+    # plain tuples zipped against the column names once; cheaper than sqlite3.Row -> dict per row
+    cur = db.cursor()
+    cur.row_factory = None
+    cur.execute(sql, params)
+    cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, r)) for r in cur.fetchall()]
+
 @contextmanager
-def get_db():
-    conn = connect()
+def get_db(immediate: bool = False):
+    # immediate=True marks a write unit: BEGIN IMMEDIATE on a pooled connection, or the group-commit writer when enabled
+    if immediate and settings.DB_WRITE_QUEUE:
+        with writer.unit() as conn:
+            yield conn
+        return
+    with metrics.db_pool_wait.time():
+        conn = pool.acquire()
+    conn.recorder = query_budget.current.get() if settings.QUERY_BUDGETS else None
+    conn.hooks = hooks = []
+    broken = False
     try:
+        if immediate:
+            with metrics.db_lock_wait.time():
+                conn.execute("BEGIN IMMEDIATE")
         yield conn
         conn.commit()
-    except Exception:
-        conn.rollback()
+    except Exception as e:
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            broken = True
+        if isinstance(e, sqlite3.DatabaseError) and not isinstance(e, (sqlite3.IntegrityError, sqlite3.OperationalError)):
+            broken = True
         raise
     finally:
-        conn.close()
+        if conn.tracer:
+            conn.tracer.finish()
+        conn.recorder = conn.hooks = None
+        pool.release(conn, broken=broken)
+    for fn in hooks:
+        fn()
@@ -0,0 +1,10 @@
+from fastapi import HTTPException
+
+def select_columns(fields: str | None, allowed: tuple[str, ...], prefix: str = "") -> str:
+    # ?fields=id,name,price_pesewas -> "p.id, p.name, p.price_pesewas"; every column in `allowed` when omitted. Only names
+    # from `allowed` ever reach the SQL text.
+    names = allowed if fields is None else tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [n for n in names if n not in allowed]
+    if unknown or not names:
+        raise HTTPException(status_code=422, detail=f"fields must be a comma-separated subset of {', '.join(allowed)}")
+    return ", ".join(prefix + n for n in names)
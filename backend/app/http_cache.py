@@ -0,0 +1,36 @@
+import hashlib
+import orjson
+from fastapi import Request, Response
+from .cache import TTLCache
+from .invalidation import publish, register
+from .settings import settings
+
+# rendered JSON bodies for rarely-changing read endpoints, keyed by e.g. ("plans",) or ("product", id)
+catalog_cache = TTLCache(maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL)
+register("catalog", catalog_cache)
+
+def _render(content) -> tuple[bytes, str]:
+    body = orjson.dumps(content)
+    return body, '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+def cached_json(request: Request, key, loader) -> Response:
+    # loader() may raise HTTPException; errors are never cached
+    entry = catalog_cache.get(key)
+    if entry is None:
+        entry = _render(loader())
+        catalog_cache.set(key, entry)
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+def invalidate_catalog(db=None):
+    publish("catalog", db=db)
@@ -1,18 +1,65 @@
+from contextlib import contextmanager
 from pathlib import Path
 from .db import connect
 from .settings import settings
 
+DB_DIR = Path(__file__).resolve().parent.parent / "db"
+MIGRATIONS_DIR = DB_DIR / "migrations"
+
+def _migration_files():
+    # db/migrations/NNNN_name.sql; version 1 is schema.sql + seed.sql
+    return sorted((int(p.name.split("_", 1)[0]), p) for p in MIGRATIONS_DIR.glob("[0-9]*_*.sql"))
+
+def latest_version() -> int:
+    files = _migration_files()
+    return files[-1][0] if files else 1
+
+def migrate(conn) -> list[int]:
+    current = conn.execute("PRAGMA user_version").fetchone()[0]
+    if current >= latest_version():
+        return []
+    steps = [(1, [DB_DIR / "schema.sql", DB_DIR / "seed.sql"])] + [(v, [p]) for v, p in _migration_files()]
+    applied = []
+    for version, paths in steps:
+        if version <= current:
+            continue
+        sql = "\n".join(p.read_text(encoding="utf-8") for p in paths)
+        try:
+            conn.executescript(f"BEGIN IMMEDIATE;\n{sql}\nPRAGMA user_version = {version};\nCOMMIT;")
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        applied.append(version)
+    return applied
+
+@contextmanager
+def _init_lock():
+    # uvicorn --workers N runs startup in every process; the first one migrates, the others wait and find the schema current
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(f"{settings.DATABASE_PATH}.init.lock", "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
 def init_db():
-    db_path = Path(settings.DATABASE_PATH)
-    if not db_path.exists():
-        db_path.touch()
+    with _init_lock():
+        _init_db()
 
+def _init_db():
     conn = connect()
     try:
-        schema = Path(__file__).resolve().parent.parent / "db" / "schema.sql"
-        seed = Path(__file__).resolve().parent.parent / "db" / "seed.sql"
-        conn.executescript(schema.read_text(encoding="utf-8"))
-        conn.executescript(seed.read_text(encoding="utf-8"))
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if settings.WEB_CONCURRENCY > 1 and mode != "wal":
+            raise RuntimeError(f"WEB_CONCURRENCY={settings.WEB_CONCURRENCY} needs a WAL database, {settings.DATABASE_PATH} is in {mode} mode")
+        if migrate(conn):
+            conn.execute("PRAGMA optimize")
 
         # Seed admins from env (comma-separated telegram IDs)
         if settings.ADMIN_TELEGRAM_IDS.strip():
@@ -0,0 +1,81 @@
+import threading
+from starlette.concurrency import run_in_threadpool
+from .db import connect, get_db
+from .settings import settings
+
+# Cross-process cache invalidation for multi-worker deployments (WEB_CONCURRENCY > 1). publish() drops the entry from
+# this process's cache and appends a cache_invalidations row; every worker replays the rows it has not seen before it
+# handles a request. PRAGMA data_version on a dedicated connection only changes when some other connection committed,
+# so a request that follows no commit at all costs one pragma and no query.
+
+_caches: dict = {}
+_lock = threading.Lock()
+_conn = None
+_version = None
+_last_id = None
+_published = 0
+
+def register(scope: str, cache, make_key=None):
+    # cache: anything with TTLCache.invalidate(); make_key maps the published integer key to the cache key
+    _caches[scope] = (cache, make_key)
+
+def _drop(scope: str, key):
+    cache, make_key = _caches[scope]
+    if key is None:
+        cache.invalidate()
+    else:
+        cache.invalidate(make_key(key) if make_key else key)
+
+def publish(scope: str, key: int | None = None, db=None):
+    # db: the caller's write transaction, so the row commits with the change; otherwise a write unit of its own
+    _drop(scope, key)
+    if settings.WEB_CONCURRENCY <= 1:
+        return
+    if db is None:
+        with get_db(immediate=True) as db:
+            _insert(db, scope, key)
+    else:
+        _insert(db, scope, key)
+
+def _insert(db, scope: str, key):
+    global _published
+    db.execute("INSERT INTO cache_invalidations(scope, key) VALUES(?,?)", (scope, key))
+    _published += 1
+    if _published % 1000 == 0:
+        db.execute("DELETE FROM cache_invalidations WHERE created_at < datetime('now', '-1 day')")
+
+def sync():
+    global _conn, _version, _last_id
+    with _lock:
+        if _conn is None:
+            _conn = connect()
+        version = _conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == _version:
+            return
+        _version = version
+        if _last_id is None:
+            # nothing cached yet that could be stale; start from the current end of the log
+            _last_id = _conn.execute("SELECT COALESCE(MAX(id), 0) FROM cache_invalidations").fetchone()[0]
+            return
+        for row in _conn.execute("SELECT id, scope, key FROM cache_invalidations WHERE id > ? ORDER BY id", (_last_id,)).fetchall():
+            if row["scope"] in _caches:
+                _drop(row["scope"], row["key"])
+            _last_id = row["id"]
+
+def close():
+    global _conn, _version, _last_id
+    with _lock:
+        if _conn is not None:
+            _conn.close()
+        _conn = _version = _last_id = None
+
+class CacheSyncMiddleware:
+    # replays other workers' invalidations before each request, on the threadpool since sync() reads SQLite; a no-op with
+    # a single worker
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and settings.WEB_CONCURRENCY > 1:
+            await run_in_threadpool(sync)
+        await self.app(scope, receive, send)
@@ -1,10 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from .settings import settings
 from .init_db import init_db
-from .routes import auth, plans, me, vendor, products, cart, wishlist, checkout, orders, admin, webhooks, telegram
+from .db import pool, writer
+from . import compression, invalidation, metrics, outbox, query_budget, paystack_events, subscriptions, telegram_updates, workers
+from .routes import auth, plans, me, vendor, products, cart, wishlist, checkout, orders, admin, webhooks, telegram, media
 
-app = FastAPI(title="Ghana Online Market API")
+app = FastAPI(title="Ghana Online Market API", default_response_class=ORJSONResponse)
 
 origins = ["*"] if settings.CORS_ORIGINS == "*" else [o.strip() for o in settings.CORS_ORIGINS.split(",") if o.strip()]
 app.add_middleware(
@@ -14,10 +17,34 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.QUERY_BUDGETS:
+    app.add_middleware(query_budget.QueryBudgetMiddleware)
+app.add_middleware(invalidation.CacheSyncMiddleware)
+app.add_middleware(compression.CompressionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
+metrics.Gauge("db_pool_connections", "Pooled SQLite connections by state", ("state",),
+              collect=lambda: {(k,): v for k, v in pool.stats().items() if k in ("open", "in_use", "idle")})
+metrics.Gauge("db_pool_events", "Connection pool counters since start", ("event",),
+              collect=lambda: {(k,): v for k, v in pool.stats().items() if k in ("acquired", "created", "discarded", "waits", "timeouts")})
 
 @app.on_event("startup")
 def on_startup():
     init_db()
+    if settings.RUN_WORKERS:
+        workers.start_singleton(outbox.sender)
+        workers.start_singleton(subscriptions.sweeper)
+        for w in paystack_events.event_workers:
+            workers.start(w)
+        if settings.TELEGRAM_MODE == "polling":
+            workers.start_singleton(telegram_updates.poller)
+
+@app.on_event("shutdown")
+def on_shutdown():
+    workers.stop_all()
+    writer.close()
+    invalidation.close()
+    pool.close_all()
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(plans.router, prefix="/api", tags=["plans"])
@@ -29,9 +56,16 @@ app.include_router(wishlist.router, prefix="/api", tags=["wishlist"])
 app.include_router(checkout.router, prefix="/api/checkout", tags=["checkout"])
 app.include_router(orders.router, prefix="/api", tags=["orders"])
 app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
+app.include_router(media.router, prefix="/api", tags=["media"])
 app.include_router(webhooks.router, prefix="/api", tags=["webhooks"])
 app.include_router(telegram.router, prefix="/telegram", tags=["telegram"])
 
 @app.get("/health")
 def health():
-    return {"ok": True}
+    return {"ok": True, "db_pool": pool.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+def scrape(authorization: str | None = Header(None)):
+    if settings.METRICS_TOKEN and authorization != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from .settings import settings
+from .telegram_api import call, download, TelegramError
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are optional; without Pillow ?size=thumb serves the original
+    Image = None
+
+log = logging.getLogger(__name__)
+
+class MediaError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+class MediaCache:
+    # Size-bounded on-disk LRU of Telegram files: <root>/<aa>/<sha256(file_id)>.<orig|thumb>.<ext>. A hit refreshes the
+    # file's mtime (at most hourly), and going over max_bytes evicts the oldest mtimes down to 90%. Files are written to a
+    # temp name and renamed into place, so other workers never serve a partial download. Content for a file_id never
+    # changes, which is what makes the long-lived cache headers in routes/media.py safe.
+    touch_after = 3600
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+        self._fetching: dict[str, threading.Lock] = {}
+
+    def _stem(self, file_id: str) -> Path:
+        h = hashlib.sha256(file_id.encode()).hexdigest()
+        return self.root / h[:2] / h
+
+    def _find(self, stem: Path, variant: str) -> Path | None:
+        for p in stem.parent.glob(f"{stem.name}.{variant}.*"):
+            if not p.name.endswith(".tmp"):
+                return p
+        return None
+
+    def _hit(self, path: Path) -> Path:
+        try:
+            if time.time() - path.stat().st_mtime > self.touch_after:
+                os.utime(path)
+        except FileNotFoundError:
+            pass
+        return path
+
+    def get(self, file_id: str, thumb: bool = False) -> Path:
+        stem = self._stem(file_id)
+        variant = "thumb" if thumb and Image is not None else "orig"
+        path = self._find(stem, variant)
+        if path:
+            return self._hit(path)
+        with self._lock:
+            fetch_lock = self._fetching.setdefault(file_id, threading.Lock())
+        with fetch_lock:  # one download per file_id at a time in this process
+            try:
+                orig = self._find(stem, "orig") or self._fetch(file_id, stem)
+                if variant == "orig":
+                    return orig
+                return self._find(stem, "thumb") or self._thumbnail(orig, stem) or self._hit(orig)
+            finally:
+                with self._lock:
+                    self._fetching.pop(file_id, None)
+
+    def _fetch(self, file_id: str, stem: Path) -> Path:
+        try:
+            info = call("getFile", {"file_id": file_id}) or {}
+        except TelegramError as e:
+            raise MediaError(404 if e.status_code == 400 else 502, "File not available" if e.status_code == 400 else "Telegram unavailable")
+        file_path = info.get("file_path")
+        if not file_path:
+            raise MediaError(404, "File not available")
+        if (info.get("file_size") or 0) > settings.MEDIA_MAX_FILE_BYTES:
+            raise MediaError(413, "File too large")
+        stem.parent.mkdir(parents=True, exist_ok=True)
+        final = stem.parent / f"{stem.name}.orig{Path(file_path).suffix.lower() or '.bin'}"
+        fd, tmp = tempfile.mkstemp(dir=stem.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                size = download(file_path, out, settings.MEDIA_MAX_FILE_BYTES)
+            os.replace(tmp, final)
+        except TelegramError as e:
+            os.unlink(tmp)
+            raise MediaError(413 if e.status_code == 413 else 502, "File too large" if e.status_code == 413 else "Telegram unavailable")
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._added(size)
+        self._thumbnail(final, stem)
+        return final
+
+    def _thumbnail(self, orig: Path, stem: Path) -> Path | None:
+        if Image is None:
+            return None
+        final = stem.parent / f"{stem.name}.thumb.jpg"
+        fd, tmp = tempfile.mkstemp(dir=stem.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            with Image.open(orig) as img:
+                img.thumbnail((settings.MEDIA_THUMB_PX, settings.MEDIA_THUMB_PX))
+                img.convert("RGB").save(tmp, "JPEG", quality=80, optimize=True)
+            os.replace(tmp, final)
+        except Exception as e:  # not an image Pillow can read: callers fall back to the original
+            os.unlink(tmp)
+            log.info("media: no thumbnail for %s: %s", orig.name, e)
+            return None
+        self._added(final.stat().st_size)
+        return final
+
+    def _added(self, nbytes: int):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            else:
+                self._size += nbytes
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _scan(self):
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                p = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(p)
+                except FileNotFoundError:
+                    continue
+                yield st.st_mtime, st.st_size, p
+
+    def _evict(self):
+        # rescans the directory, so the tally also catches up with what other workers added
+        files = sorted(self._scan())
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for _, size, p in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(p)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._size = total
+
+def content_type(path: Path) -> str:
+    return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+media_cache = MediaCache(settings.MEDIA_CACHE_DIR, settings.MEDIA_CACHE_MAX_BYTES)
@@ -0,0 +1,226 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from .settings import settings
+
+# Minimal Prometheus text-format registry (counters, gauges, histograms with labels); rendered by GET /metrics.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels=(), collect=None):
+        super().__init__(name, help, labels)
+        self.collect = collect  # optional callable returning {label tuple: value}, read at scrape time
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self):
+        if self.collect:
+            for k, v in self.collect().items():
+                self.set(*k, value=v)
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, *labels, value: float):
+        with self._lock:
+            h = self._values.get(labels)
+            if h is None:
+                h = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            h[0][bisect_left(self.buckets, value)] += 1
+            h[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(*labels, value=time.perf_counter() - t0)
+
+    def render(self):
+        with self._lock:
+            items = [(k, list(h[0]), h[1]) for k, h in self._values.items()]
+        lines = self.header()
+        for k, counts, total in items:
+            cumulative = 0
+            for bound, c in zip((*self.buckets, "+Inf"), counts):
+                cumulative += c
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, k)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, k)} {cumulative}")
+        return lines
+
+registry: list[_Metric] = []
+
+def render() -> str:
+    return "\n".join(line for m in registry for line in m.render()) + "\n"
+
+# HTTP server side (middleware in app/main.py)
+http_requests = Counter("http_requests_total", "HTTP requests by route template and status code", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being handled")
+
+class MetricsMiddleware:
+    # plain ASGI middleware; labels by route template (/api/products/{product_id}) so ids do not explode cardinality
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_latency.observe(scope["method"], path, value=time.perf_counter() - t0)
+            http_requests.inc(scope["method"], path, str(status))
+
+# SQLite (statement hooks installed by app/db.py)
+db_statements = Counter("db_statements_total", "SQL statements executed, by normalized statement", ("statement",))
+db_statement_seconds = Counter("db_statement_seconds_total", "Wall time from statement start until the next statement or release on the same connection", ("statement",))
+db_statement_steps = Counter("db_statement_vm_steps_total", "SQLite VM instructions executed (progress handler granularity, only with SQL_PROGRESS_STEPS), by normalized statement", ("statement",))
+db_statement_latency = Histogram("db_statement_duration_seconds", "SQL statement latency, all statements")
+db_lock_wait = Histogram("db_lock_wait_seconds", "Time spent acquiring the write lock (BEGIN IMMEDIATE, or the writer queue with DB_WRITE_QUEUE)")
+db_pool_wait = Histogram("db_pool_acquire_seconds", "Time spent waiting for a pooled connection")
+db_group_commit_size = Histogram("db_group_commit_units", "Write units per commit (DB_WRITE_QUEUE only)", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+# outbound HTTP (paystack.py, telegram_api.py)
+outbound_latency = Histogram("http_client_request_duration_seconds", "Outbound HTTP call latency", ("service", "operation", "status"))
+
+@contextmanager
+def outbound(service: str, operation: str):
+    # with outbound("paystack", "transaction/initialize") as m: r = ...; m["status"] = r.status_code
+    m = {"status": "error"}
+    t0 = time.perf_counter()
+    try:
+        yield m
+    finally:
+        outbound_latency.observe(service, operation, str(m["status"]), value=time.perf_counter() - t0)
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\bX'[0-9A-Fa-f]*'|(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES = re.compile(r"(\((?:\?|\?, \.\.\.)\))(?:\s*,\s*\1)+")
+MAX_FINGERPRINTS = 500
+_fingerprints: dict[str, str] = {}
+_distinct: set[str] = set()
+_fp_lock = threading.Lock()
+
+def fingerprint(sql: str) -> str:
+    # SQL text -> literal-free, whitespace-collapsed label; cardinality capped
+    hit = _fingerprints.get(sql)
+    if hit is not None:
+        return hit
+    fp = " ".join(_LITERALS.sub("?", _COMMENTS.sub(" ", sql)).split())
+    fp = _VALUES.sub(r"\1, ...", _LISTS.sub("(?, ...)", fp))[:300]
+    with _fp_lock:
+        if fp not in _distinct:
+            if len(_distinct) >= MAX_FINGERPRINTS:
+                fp = "other"
+            else:
+                _distinct.add(fp)
+        if len(_fingerprints) < 10 * MAX_FINGERPRINTS:
+            _fingerprints[sql] = fp
+    return fp
+
+class StatementTracer:
+    # one per connection: each execute marks where a statement starts, the previous one ends there
+    # (sqlite steps lazily while rows are fetched, so a statement's time runs until the next one starts)
+    __slots__ = ("current", "started", "steps")
+
+    def __init__(self):
+        self.current = None
+        self.started = 0.0
+        self.steps = 0
+
+    def trace(self, sql: str):
+        self.finish()
+        self.current = fingerprint(sql)
+        self.started = time.perf_counter()
+
+    def progress(self):
+        self.steps += 1
+        return 0
+
+    def finish(self):
+        if self.current is None:
+            return
+        elapsed = time.perf_counter() - self.started
+        db_statements.inc(self.current)
+        db_statement_seconds.inc(self.current, amount=elapsed)
+        if self.steps:
+            db_statement_steps.inc(self.current, amount=self.steps * settings.SQL_PROGRESS_STEPS)
+        db_statement_latency.observe(value=elapsed)
+        self.current, self.steps = None, 0
@@ -0,0 +1,129 @@
+import json
+import logging
+import threading
+import time
+from .db import get_db
+from .settings import settings
+from .telegram_api import call, TelegramError
+from .workers import Worker
+
+log = logging.getLogger(__name__)
+
+MEDIA_GROUP_MAX = 10
+
+def enqueue(db, chat_id: int, method: str, payload: dict):
+    db.execute("INSERT INTO telegram_outbox(chat_id, method, payload_json) VALUES(?,?,?)", (chat_id, method, json.dumps(payload)))
+    db.after_commit(sender.wake)
+
+def enqueue_message(db, chat_id: int, text: str, reply_markup: dict | None = None):
+    payload = {"chat_id": chat_id, "text": text}
+    if reply_markup:
+        payload["reply_markup"] = reply_markup
+    enqueue(db, chat_id, "sendMessage", payload)
+
+def enqueue_messages(db, messages: list[tuple[int, str]]):
+    # (chat_id, text) pairs in one executemany, for fan-out from bulk actions
+    if messages:
+        db.executemany("INSERT INTO telegram_outbox(chat_id, method, payload_json) VALUES(?, 'sendMessage', ?)",
+                       [(chat_id, json.dumps({"chat_id": chat_id, "text": text})) for chat_id, text in messages])
+        db.after_commit(sender.wake)
+
+def enqueue_documents(db, chat_id: int, documents: list[tuple[str, str]]):
+    # (file_id, caption) pairs, batched into sendMediaGroup calls of up to 10 files
+    for i in range(0, len(documents), MEDIA_GROUP_MAX):
+        chunk = documents[i:i+MEDIA_GROUP_MAX]
+        if len(chunk) == 1:
+            file_id, caption = chunk[0]
+            payload = {"chat_id": chat_id, "document": file_id}
+            if caption:
+                payload["caption"] = caption
+            enqueue(db, chat_id, "sendDocument", payload)
+        else:
+            media = [{"type": "document", "media": fid, **({"caption": cap} if cap else {})} for fid, cap in chunk]
+            enqueue(db, chat_id, "sendMediaGroup", {"chat_id": chat_id, "media": media})
+
+class RateLimiter:
+    # global token bucket plus a minimum gap between messages to the same chat (Bot API limits)
+    def __init__(self, per_second: float, per_chat_interval: float):
+        self.rate = per_second
+        self.per_chat_interval = per_chat_interval
+        self._tokens = per_second
+        self._stamp = time.monotonic()
+        self._last_by_chat: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def chat_delay(self, chat_id: int) -> float:
+        last = self._last_by_chat.get(chat_id)
+        return 0.0 if last is None else max(0.0, last + self.per_chat_interval - time.monotonic())
+
+    def acquire(self, chat_id: int):
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    break
+                time.sleep((1 - self._tokens) / self.rate)
+            self._last_by_chat[chat_id] = time.monotonic()
+            if len(self._last_by_chat) > 10_000:
+                cutoff = time.monotonic() - self.per_chat_interval
+                self._last_by_chat = {c: t for c, t in self._last_by_chat.items() if t > cutoff}
+
+class TelegramSender(Worker):
+    batch_size = 50
+    lease_seconds = 120
+
+    def __init__(self):
+        super().__init__("telegram-outbox")
+        self.limiter = RateLimiter(settings.TELEGRAM_GLOBAL_RATE, settings.TELEGRAM_PER_CHAT_INTERVAL)
+
+    def _claim(self):
+        with get_db(immediate=True) as db:
+            rows = db.execute(f"""UPDATE telegram_outbox SET lease_until=datetime('now', '+{self.lease_seconds} seconds')
+                                  WHERE id IN (SELECT id FROM telegram_outbox
+                                               WHERE status='pending' AND next_attempt_at<=datetime('now')
+                                                 AND (lease_until IS NULL OR lease_until<datetime('now'))
+                                               ORDER BY id LIMIT ?)
+                                  RETURNING id, chat_id, method, payload_json, attempts""", (self.batch_size,)).fetchall()
+        return sorted(rows, key=lambda r: r["id"])
+
+    def run_once(self) -> bool:
+        rows = self._claim()
+        if not rows:
+            return False
+        sent, retry, failed, deferred = [], [], [], []
+        deferred_chats = set()
+        for r in rows:
+            delay = self.limiter.chat_delay(r["chat_id"])
+            # keep per-chat order: once a chat is deferred, everything after it waits too
+            if r["chat_id"] in deferred_chats or delay > 0.5:
+                deferred_chats.add(r["chat_id"])
+                deferred.append((max(1, int(delay + 0.999)), r["id"]))
+                continue
+            if delay:
+                time.sleep(delay)
+            self.limiter.acquire(r["chat_id"])
+            try:
+                call(r["method"], json.loads(r["payload_json"]))
+                sent.append((r["id"],))
+            except TelegramError as e:
+                attempts = r["attempts"] + 1
+                if e.permanent or attempts >= settings.TELEGRAM_OUTBOX_MAX_ATTEMPTS:
+                    failed.append((attempts, str(e)[:500], r["id"]))
+                else:
+                    backoff = e.retry_after or min(2 ** attempts, 300)
+                    retry.append((attempts, str(e)[:500], int(backoff), r["id"]))
+                    if e.retry_after:
+                        deferred_chats.add(r["chat_id"])
+        with get_db(immediate=True) as db:
+            db.executemany("UPDATE telegram_outbox SET status='sent', sent_at=datetime('now'), attempts=attempts+1, lease_until=NULL WHERE id=?", sent)
+            db.executemany("UPDATE telegram_outbox SET status='failed', attempts=?, last_error=?, lease_until=NULL WHERE id=?", failed)
+            db.executemany("UPDATE telegram_outbox SET attempts=?, last_error=?, next_attempt_at=datetime('now', '+' || ? || ' seconds'), lease_until=NULL WHERE id=?", retry)
+            db.executemany("UPDATE telegram_outbox SET next_attempt_at=datetime('now', '+' || ? || ' seconds'), lease_until=NULL WHERE id=?", deferred)
+        if failed:
+            log.warning("telegram outbox: %d message(s) failed permanently", len(failed))
+        return bool(sent or retry or failed)
+
+sender = TelegramSender()
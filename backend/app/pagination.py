@@ -0,0 +1,15 @@
+import base64
+import json
+from fastapi import HTTPException
+
+# opaque keyset cursors: [kind, sort key, last id] as url-safe base64 JSON
+
+def encode_cursor(kind: str, key, last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([kind, key, last_id]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        kind, key, last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return kind, key, int(last_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
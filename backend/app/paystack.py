@@ -1,7 +1,11 @@
 import requests, hmac, hashlib
+from requests.adapters import HTTPAdapter
+from .metrics import outbound
 from .settings import settings
 
-PAYSTACK_BASE = "https://api.paystack.co"
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=settings.PAYSTACK_HTTP_POOL_SIZE))
+_session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=settings.PAYSTACK_HTTP_POOL_SIZE))
 
 def init_transaction(email: str, amount_pesewas: int, reference: str, callback_url: str | None = None, metadata: dict | None = None):
     headers = {"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}", "Content-Type": "application/json"}
@@ -10,7 +14,10 @@ def init_transaction(email: str, amount_pesewas: int, reference: str, callback_u
         payload["callback_url"] = callback_url
     if metadata:
         payload["metadata"] = metadata
-    r = requests.post(f"{PAYSTACK_BASE}/transaction/initialize", json=payload, headers=headers, timeout=30)
+    with outbound("paystack", "transaction/initialize") as m:
+        r = _session.post(f"{settings.PAYSTACK_BASE_URL}/transaction/initialize", json=payload, headers=headers,
+                          timeout=(settings.PAYSTACK_CONNECT_TIMEOUT, settings.PAYSTACK_READ_TIMEOUT))
+        m["status"] = r.status_code
     r.raise_for_status()
     return r.json()
 
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from .analytics import record_order
+from .db import get_db
+from .http_cache import invalidate_catalog
+from .outbox import enqueue_message, enqueue_documents
+from .settings import settings
+from .subscriptions import resume_listings
+from .wallet import post_ledger_entries
+from .workers import Worker
+
+log = logging.getLogger(__name__)
+
+def event_key(raw: bytes, event: dict) -> str:
+    data = event.get("data") or {}
+    ident = data.get("id") or data.get("reference")
+    return f"{event.get('event')}:{ident}" if ident else hashlib.sha256(raw).hexdigest()
+
+def store_event(raw: bytes, event: dict) -> bool:
+    # False when Paystack redelivered an event we already hold
+    data = event.get("data") or {}
+    with get_db(immediate=True) as db:
+        cur = db.execute("INSERT OR IGNORE INTO paystack_events(event_key, event_type, reference, payload_json) VALUES(?,?,?,?)",
+                         (event_key(raw, event), event.get("event") or "", data.get("reference"), raw.decode("utf-8")))
+        stored = cur.rowcount == 1
+    if stored:
+        wake()
+    return stored
+
+def apply_event(db, event: dict):
+    if event.get("event") != "charge.success":
+        return
+    data = event.get("data", {})
+    ref = data.get("reference")
+    if not ref:
+        return
+
+    pay = db.execute("SELECT purpose, order_id, vendor_id, status FROM payments WHERE reference=?", (ref,)).fetchone()
+    if not pay:
+        return
+    if pay["status"] == "success":
+        return
+    db.execute("UPDATE payments SET status='success', raw_event_json=? WHERE reference=?", (json.dumps(event), ref))
+
+    if pay["purpose"] == "order" and pay["order_id"]:
+        oid = pay["order_id"]
+        db.execute("UPDATE orders SET status='paid', paid_at=datetime('now') WHERE id=?", (oid,))
+        record_order(db, oid)
+        items = db.execute("SELECT vendor_id, vendor_net_pesewas FROM order_items WHERE order_id=? AND product_type='digital'", (oid,)).fetchall()
+        post_ledger_entries(db, [(it["vendor_id"], "credit", "sale", it["vendor_net_pesewas"], oid) for it in items])
+
+        user = db.execute("SELECT u.telegram_id FROM orders o JOIN users u ON u.id=o.user_id WHERE o.id=?", (oid,)).fetchone()
+        if user:
+            enqueue_message(db, user["telegram_id"], "✅ Payment successful! Delivering your digital items now…")
+            assets = db.execute("""SELECT a.telegram_file_id, oi.name_snapshot FROM order_items oi
+                                   JOIN product_digital_assets a ON a.product_id=oi.product_id
+                                   WHERE oi.order_id=? AND oi.product_type='digital' ORDER BY oi.id""", (oid,)).fetchall()
+            enqueue_documents(db, user["telegram_id"], [(a["telegram_file_id"], a["name_snapshot"]) for a in assets])
+        return
+
+    if pay["purpose"] == "subscription" and pay["vendor_id"]:
+        meta = (data.get("metadata") or {})
+        plan_id = int(meta.get("plan_id") or 2)
+        billing = meta.get("billing") or "monthly"
+        renews_at = (datetime.utcnow() + timedelta(days=30 if billing=="monthly" else 90)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        db.execute(
+            """INSERT INTO vendor_subscriptions(vendor_id, plan_id, status, started_at, renews_at, paystack_reference)
+               VALUES(?, ?, 'active', datetime('now'), ?, ?)
+               ON CONFLICT(vendor_id) DO UPDATE SET plan_id=excluded.plan_id, status='active', renews_at=excluded.renews_at, paystack_reference=excluded.paystack_reference""",
+            (pay["vendor_id"], plan_id, renews_at, ref),
+        )
+        resumed = resume_listings(db, pay["vendor_id"])
+        if resumed:
+            invalidate_catalog(db)
+        vendor_user = db.execute("SELECT u.telegram_id FROM vendors v JOIN users u ON u.id=v.user_id WHERE v.id=?", (pay["vendor_id"],)).fetchone()
+        if vendor_user:
+            enqueue_message(db, vendor_user["telegram_id"], f"✅ Subscription active. Plan ID: {plan_id}. Renews: {renews_at}"
+                                                            + (f"\n▶️ {resumed} paused listing(s) are live again." if resumed else ""))
+
+class PaystackEventWorker(Worker):
+    lease_seconds = 120
+
+    def _claim(self):
+        # oldest due event whose reference has no earlier unfinished event (per-reference ordering)
+        with get_db(immediate=True) as db:
+            return db.execute(f"""UPDATE paystack_events SET lease_until=datetime('now', '+{self.lease_seconds} seconds'), attempts=attempts+1
+                                  WHERE id=(SELECT e.id FROM paystack_events e
+                                            WHERE e.status='pending' AND e.next_attempt_at<=datetime('now')
+                                              AND (e.lease_until IS NULL OR e.lease_until<datetime('now'))
+                                              AND NOT EXISTS (SELECT 1 FROM paystack_events x WHERE x.reference=e.reference AND x.status='pending' AND x.id<e.id)
+                                            ORDER BY e.id LIMIT 1)
+                                  RETURNING id, payload_json, attempts""").fetchone()
+
+    def run_once(self) -> bool:
+        ev = self._claim()
+        if not ev:
+            return False
+        try:
+            with get_db(immediate=True) as db:
+                apply_event(db, json.loads(ev["payload_json"]))
+                db.execute("UPDATE paystack_events SET status='done', processed_at=datetime('now'), lease_until=NULL, last_error=NULL WHERE id=?", (ev["id"],))
+        except Exception as e:
+            log.exception("paystack event %s failed", ev["id"])
+            give_up = ev["attempts"] >= settings.PAYSTACK_EVENT_MAX_ATTEMPTS
+            with get_db(immediate=True) as db:
+                db.execute("""UPDATE paystack_events SET status=?, last_error=?, lease_until=NULL,
+                                next_attempt_at=datetime('now', '+' || ? || ' seconds') WHERE id=?""",
+                           ("failed" if give_up else "pending", repr(e)[:500], min(2 ** ev["attempts"], 600), ev["id"]))
+        return True
+
+def replay(ids: list[int] | None = None, reference: str | None = None, status: str = "failed") -> int:
+    where, params = ["status=?"], [status]
+    if ids:
+        where.append(f"id IN ({','.join('?' * len(ids))})"); params += ids
+    if reference:
+        where.append("reference=?"); params.append(reference)
+    with get_db(immediate=True) as db:
+        cur = db.execute(f"""UPDATE paystack_events SET status='pending', attempts=0, next_attempt_at=datetime('now'), lease_until=NULL, last_error=NULL
+                             WHERE {' AND '.join(where)}""", params)
+        n = cur.rowcount
+    wake()
+    return n
+
+event_workers = [PaystackEventWorker(f"paystack-events-{i}") for i in range(settings.PAYSTACK_EVENT_WORKERS)]
+
+def wake():
+    for w in event_workers:
+        w.wake()
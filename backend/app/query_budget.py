@@ -0,0 +1,122 @@
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from .metrics import fingerprint
+
+log = logging.getLogger(__name__)
+
+# Statements each request may run, keyed by "METHOD route template". With QUERY_BUDGETS=1, connections handed out by
+# get_db() while a recorder is active report every execute/executemany to it; bench/query_budgets.py drives every
+# route once and fails on a route over budget, an undeclared route, or a statement repeated N_PLUS_ONE times.
+BUDGETS = {
+    "POST /api/auth/telegram": 1,
+    "GET /api/plans": 1,
+    "GET /api/me": 1,
+    "POST /api/vendor/register": 3,
+    "PUT /api/vendor/payout-settings": 1,
+    "GET /api/vendor/uploads": 1,
+    "POST /api/vendor/subscribe/init": 5,
+    "GET /api/vendor/plan/usage": 1,
+    "GET /api/vendor/wallet": 1,
+    "GET /api/vendor/analytics": 1,
+    "POST /api/vendor/withdrawals": 2,
+    "GET /api/categories": 1,
+    "GET /api/products": 2,
+    "GET /api/products/{product_id}": 1,
+    "GET /api/vendor/products": 1,
+    "POST /api/vendor/products": 6,
+    "POST /api/vendor/products/import": 8,
+    "GET /api/cart": 1,
+    "POST /api/cart/items": 2,
+    "POST /api/cart/batch": 5,
+    "DELETE /api/cart/items/{item_id}": 1,
+    "GET /api/wishlist": 1,
+    "POST /api/wishlist": 2,
+    "DELETE /api/wishlist/{product_id}": 1,
+    "POST /api/checkout/physical": 8,
+    "POST /api/checkout/digital/init": 8,
+    "GET /api/orders": 1,
+    "GET /api/orders/{order_id}": 3,
+    "GET /api/vendor/orders": 1,
+    "POST /api/vendor/orders/status": 3,
+    "GET /api/admin/metrics": 3,
+    "GET /api/admin/analytics": 1,
+    "GET /api/admin/analytics/vendors": 1,
+    "GET /api/admin/analytics/categories": 1,
+    "GET /api/admin/withdrawals": 1,
+    "PATCH /api/admin/withdrawals/{withdrawal_id}/approve": 2,
+    "PATCH /api/admin/withdrawals/{withdrawal_id}/mark-paid": 7,
+    "GET /api/media/{file_id}": 1,
+    "POST /api/paystack/webhook": 1,
+    "POST /telegram/webhook": 6,
+    "GET /health": 0,
+    "GET /metrics": 0,
+    # background work, recorded with recording() by the checker
+    "worker paystack charge.success (order)": 12,
+}
+
+N_PLUS_ONE = 3
+_UNCOUNTED = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE")
+
+class QueryRecorder:
+    def __init__(self):
+        self.statements: list[str] = []
+
+    def record(self, sql: str):
+        fp = fingerprint(sql)
+        if not fp.upper().startswith(_UNCOUNTED):
+            self.statements.append(fp)
+
+    def repeated(self) -> dict[str, int]:
+        return {fp: n for fp, n in Counter(self.statements).items() if n >= N_PLUS_ONE}
+
+    def problems(self, key: str) -> list[str]:
+        out = []
+        budget = BUDGETS.get(key)
+        if budget is None:
+            out.append(f"no query budget declared ({len(self.statements)} statement(s))")
+        elif len(self.statements) > budget:
+            out.append(f"{len(self.statements)} statements, budget {budget}")
+        out += [f"N+1: {n}x {fp}" for fp, n in self.repeated().items()]
+        return out
+
+current: ContextVar[QueryRecorder | None] = ContextVar("query_recorder", default=None)
+reports: list[tuple[str, QueryRecorder]] | None = None  # set to a list to collect every request's recorder
+
+@contextmanager
+def recording():
+    rec = QueryRecorder()
+    token = current.set(rec)
+    try:
+        yield rec
+    finally:
+        current.reset(token)
+
+def report(key: str, rec: QueryRecorder):
+    if reports is not None:
+        reports.append((key, rec))
+    problems = rec.problems(key)
+    if problems:
+        log.warning("query budget: %s: %s", key, "; ".join(problems))
+    return problems
+
+class QueryBudgetMiddleware:
+    # installed with QUERY_BUDGETS=1 (dev / CI); adds X-Query-Count and logs routes over budget
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with recording() as rec:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    message.setdefault("headers", [])
+                    message["headers"] = [*message["headers"], (b"x-query-count", str(len(rec.statements)).encode())]
+                await send(message)
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                report(f"{scope['method']} {getattr(route, 'path', 'unmatched')}", rec)
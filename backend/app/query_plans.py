@@ -0,0 +1,69 @@
+import ast
+import re
+import sqlite3
+from pathlib import Path
+from .init_db import migrate
+
+APP_DIR = Path(__file__).resolve().parent
+ROUTES_DIR = APP_DIR / "routes"
+# request-path modules outside routes/ that run SQL on behalf of a route
+EXTRA_MODULES = ("checkout.py",)
+
+# tables small enough (or scanned on purpose) that a full scan is fine
+SMALL_TABLES = {"plans", "categories", "admins", "sqlite_sequence"}
+
+# whole-table aggregates that are accepted for now (admin-only, not on the storefront path)
+KNOWN_SCANS: set[str] = set()
+
+_SCAN = re.compile(r"^SCAN (\w+)\b(?! USING (?:COVERING )?INDEX)(?! VIRTUAL TABLE)")
+
+def _sql_text(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for v in node.values:
+            if isinstance(v, ast.Constant):
+                parts.append(v.value)
+            elif isinstance(v, ast.FormattedValue) and isinstance(v.value, ast.Name) and v.value.id == "q":
+                parts.append("?")  # IN ({q}) placeholder lists
+            else:
+                return None
+        return "".join(parts)
+    return None
+
+def route_queries():
+    for path in [*sorted(ROUTES_DIR.glob("*.py")), *(APP_DIR / m for m in EXTRA_MODULES)]:
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr in ("execute", "executemany") and node.args:
+                sql = _sql_text(node.args[0])
+                if sql is not None:
+                    yield f"{path.relative_to(APP_DIR)}:{node.lineno}", " ".join(sql.split())
+                else:
+                    yield f"{path.relative_to(APP_DIR)}:{node.lineno}", None
+
+def check():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    failures, skipped = [], []
+    for where, sql in route_queries():
+        if sql is None:
+            skipped.append(where)
+            continue
+        if sql in KNOWN_SCANS:
+            continue
+        try:
+            plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * sql.count("?")).fetchall()
+        except sqlite3.Error as e:
+            failures.append((where, sql, f"cannot plan: {e}"))
+            continue
+        for row in plan:
+            m = _SCAN.match(row[3])
+            if m and m.group(1) not in SMALL_TABLES | {"CONSTANT"} and not _is_alias_of_small(sql, m.group(1)):
+                failures.append((where, sql, row[3]))
+    conn.close()
+    return failures, skipped
+
+def _is_alias_of_small(sql: str, alias: str) -> bool:
+    return any(re.search(rf"\b{t}\s+(?:AS\s+)?{alias}\b", sql, re.I) for t in SMALL_TABLES)
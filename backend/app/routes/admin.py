@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from ..analytics import day_range
 from ..auth import require_admin
-from ..db import get_db
-from ..telegram_api import send_message
+from ..db import get_db, fetch_all
+from ..outbox import enqueue_message
+from ..wallet import settle_withdrawal
 
 router = APIRouter()
 
@@ -10,22 +13,47 @@ class MarkPaidIn(BaseModel):
     paid_reference: str
 
 @router.get("/metrics")
-def metrics(admin=Depends(require_admin)):
+def metrics(start: str | None = None, end: str | None = None, admin=Depends(require_admin)):
+    # commission over a day range (default: the last 30 days), a primary-key range read on daily_totals
+    start, end = day_range(start, end)
     with get_db() as db:
         vendors = db.execute("SELECT COUNT(*) AS c FROM vendors").fetchone()["c"]
-        commission = db.execute("SELECT COALESCE(SUM(commission_pesewas),0) AS s FROM order_items").fetchone()["s"]
+        commission = db.execute("SELECT COALESCE(SUM(commission_pesewas),0) AS s FROM daily_totals WHERE day BETWEEN ? AND ?", (start, end)).fetchone()["s"]
         pending = db.execute("SELECT COUNT(*) AS c FROM withdrawal_requests WHERE status='pending'").fetchone()["c"]
-        return {"vendors": int(vendors), "commission_pesewas": int(commission), "withdrawals_pending": int(pending)}
+        return {"vendors": int(vendors), "commission_pesewas": int(commission), "withdrawals_pending": int(pending), "from": start, "to": end}
+
+@router.get("/analytics")
+def analytics(start: str | None = None, end: str | None = None, admin=Depends(require_admin)):
+    start, end = day_range(start, end)
+    with get_db() as db:
+        return ORJSONResponse({"from": start, "to": end, "days": fetch_all(db, """SELECT day, product_type, orders, items, gmv_pesewas, commission_pesewas
+                                                                                 FROM daily_totals WHERE day BETWEEN ? AND ? ORDER BY day, product_type""", (start, end))})
+
+@router.get("/analytics/vendors")
+def analytics_vendors(start: str | None = None, end: str | None = None, limit: int = 20, admin=Depends(require_admin)):
+    start, end = day_range(start, end)
+    with get_db() as db:
+        return ORJSONResponse({"from": start, "to": end, "vendors": fetch_all(db, """SELECT s.vendor_id, v.store_name, SUM(s.items) AS items, SUM(s.gmv_pesewas) AS gmv_pesewas, SUM(s.commission_pesewas) AS commission_pesewas
+                                                                                    FROM daily_sales s JOIN vendors v ON v.id=s.vendor_id
+                                                                                    WHERE s.day BETWEEN ? AND ? GROUP BY s.vendor_id ORDER BY gmv_pesewas DESC LIMIT ?""", (start, end, min(max(limit, 1), 100)))})
+
+@router.get("/analytics/categories")
+def analytics_categories(start: str | None = None, end: str | None = None, admin=Depends(require_admin)):
+    start, end = day_range(start, end)
+    with get_db() as db:
+        return ORJSONResponse({"from": start, "to": end, "categories": fetch_all(db, """SELECT category_slug, product_type, SUM(items) AS items, SUM(gmv_pesewas) AS gmv_pesewas, SUM(commission_pesewas) AS commission_pesewas
+                                                                                       FROM daily_sales WHERE day BETWEEN ? AND ? GROUP BY category_slug, product_type ORDER BY gmv_pesewas DESC""", (start, end))})
 
 @router.get("/withdrawals")
 def withdrawals(status: str="pending", admin=Depends(require_admin)):
     with get_db() as db:
-        return [dict(r) for r in db.execute("SELECT * FROM withdrawal_requests WHERE status=? ORDER BY requested_at ASC", (status,)).fetchall()]
+        return ORJSONResponse(fetch_all(db, """SELECT id, vendor_id, amount_pesewas, status, requested_at, decision_at, decided_by_user_id, paid_reference, paid_at
+                                               FROM withdrawal_requests WHERE status=? ORDER BY requested_at ASC""", (status,)))
 
 @router.patch("/withdrawals/{withdrawal_id}/approve")
 def approve(withdrawal_id: int, admin=Depends(require_admin)):
-    with get_db() as db:
-        w = db.execute("SELECT * FROM withdrawal_requests WHERE id=?", (withdrawal_id,)).fetchone()
+    with get_db(immediate=True) as db:
+        w = db.execute("SELECT status FROM withdrawal_requests WHERE id=?", (withdrawal_id,)).fetchone()
         if not w: raise HTTPException(status_code=404, detail="Not found")
         if w["status"]!="pending": raise HTTPException(status_code=400, detail="Not pending")
         db.execute("UPDATE withdrawal_requests SET status='approved', decision_at=datetime('now'), decided_by_user_id=? WHERE id=?", (admin["user_id"], withdrawal_id))
@@ -33,13 +61,13 @@ def approve(withdrawal_id: int, admin=Depends(require_admin)):
 
 @router.patch("/withdrawals/{withdrawal_id}/mark-paid")
 def mark_paid(withdrawal_id: int, payload: MarkPaidIn, admin=Depends(require_admin)):
-    with get_db() as db:
-        wrow = db.execute("SELECT * FROM withdrawal_requests WHERE id=?", (withdrawal_id,)).fetchone()
+    with get_db(immediate=True) as db:
+        wrow = db.execute("SELECT vendor_id, amount_pesewas, status FROM withdrawal_requests WHERE id=?", (withdrawal_id,)).fetchone()
         if not wrow: raise HTTPException(status_code=404, detail="Not found")
         if wrow["status"]!="approved": raise HTTPException(status_code=400, detail="Must be approved first")
-        db.execute("INSERT INTO wallet_ledger(vendor_id,type,reason,amount_pesewas,withdrawal_id) VALUES(?, 'debit','withdrawal',?,?)", (wrow["vendor_id"], wrow["amount_pesewas"], withdrawal_id))
+        settle_withdrawal(db, wrow["vendor_id"], withdrawal_id, wrow["amount_pesewas"])
         db.execute("UPDATE withdrawal_requests SET status='paid', paid_reference=?, paid_at=datetime('now') WHERE id=?", (payload.paid_reference, withdrawal_id))
         vendor_user = db.execute("SELECT u.telegram_id FROM vendors v JOIN users u ON u.id=v.user_id WHERE v.id=?", (wrow["vendor_id"],)).fetchone()
         if vendor_user:
-            send_message(vendor_user["telegram_id"], f"✅ Withdrawal paid: GHS {wrow['amount_pesewas']/100:.2f}\nRef: {payload.paid_reference}")
+            enqueue_message(db, vendor_user["telegram_id"], f"✅ Withdrawal paid: GHS {wrow['amount_pesewas']/100:.2f}\nRef: {payload.paid_reference}")
         return {"ok": True}
@@ -1,39 +1,90 @@
 from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
 from ..auth import require_user
-from ..db import get_db
+from ..db import get_db, fetch_all
 router = APIRouter()
 
+BATCH_MAX = 100
+MAX_QTY = 999  # per cart line; merges and batch sums are clamped to it
+
 class AddIn(BaseModel):
     product_id: int
-    qty: int = 1
+    qty: int = Field(1, gt=0, le=MAX_QTY)
+
+class CartOp(BaseModel):
+    op: str  # add|set|remove
+    product_id: int
+    qty: int = Field(1, ge=0, le=MAX_QTY)
+
+class BatchIn(BaseModel):
+    ops: list[CartOp] = Field(min_length=1, max_length=BATCH_MAX)
+
+def _items(db, user_id: int):
+    return fetch_all(db, """SELECT ci.id, ci.qty, p.id AS product_id, p.name, p.type, p.price_pesewas
+                            FROM carts c JOIN cart_items ci ON ci.cart_id=c.id JOIN products p ON p.id=ci.product_id
+                            WHERE c.user_id=? ORDER BY ci.id""", (user_id,))
+
+def _cart_id(db, user_id: int) -> int:
+    # creates the cart on first write; reads never need one (no cart reads as an empty cart)
+    return db.execute("INSERT INTO carts(user_id) VALUES(?) ON CONFLICT(user_id) DO UPDATE SET updated_at=datetime('now') RETURNING id",
+                      (user_id,)).fetchone()["id"]
+
+def _fold(ops: list[CartOp]) -> dict[int, tuple[str, int]]:
+    # net effect per product, applied in order: ("add", n) adds n to whatever is in the cart, ("set", n) ends at n (0 removes)
+    net = {}
+    for o in ops:
+        if o.op == "add":
+            mode, n = net.get(o.product_id, ("add", 0))
+            net[o.product_id] = (mode, min(n + o.qty, MAX_QTY))
+        else:
+            net[o.product_id] = ("set", o.qty if o.op == "set" else 0)
+    return net
 
 @router.get("/cart")
 def get_cart(user=Depends(require_user)):
     with get_db() as db:
-        cart = db.execute("SELECT id FROM carts WHERE user_id=?", (user["user_id"],)).fetchone()
-        if not cart:
-            db.execute("INSERT INTO carts(user_id) VALUES(?)", (user["user_id"],))
-            cart = db.execute("SELECT id FROM carts WHERE user_id=?", (user["user_id"],)).fetchone()
-        rows = db.execute("SELECT ci.id, ci.qty, p.id AS product_id, p.name, p.type, p.price_pesewas FROM cart_items ci JOIN products p ON p.id=ci.product_id WHERE ci.cart_id=?", (cart["id"],)).fetchall()
-        return {"items": [dict(r) for r in rows]}
+        return ORJSONResponse({"items": _items(db, user["user_id"])})
 
 @router.post("/cart/items")
 def add_item(payload: AddIn, user=Depends(require_user)):
-    if payload.qty <= 0:
-        raise HTTPException(status_code=400, detail="Invalid qty")
-    with get_db() as db:
-        cart = db.execute("SELECT id FROM carts WHERE user_id=?", (user["user_id"],)).fetchone()
-        if not cart:
-            db.execute("INSERT INTO carts(user_id) VALUES(?)", (user["user_id"],))
-            cart = db.execute("SELECT id FROM carts WHERE user_id=?", (user["user_id"],)).fetchone()
-        if not db.execute("SELECT 1 FROM products WHERE id=? AND is_active=1", (payload.product_id,)).fetchone():
+    with get_db(immediate=True) as db:
+        item = db.execute("""INSERT INTO cart_items(cart_id, product_id, qty) SELECT ?, id, ? FROM products WHERE id=? AND is_active=1
+                             ON CONFLICT(cart_id, product_id) DO UPDATE SET qty=MIN(qty+excluded.qty, ?) RETURNING id, qty""",
+                          (_cart_id(db, user["user_id"]), payload.qty, payload.product_id, MAX_QTY)).fetchone()
+        if not item:
             raise HTTPException(status_code=404, detail="Product not found")
-        db.execute("INSERT INTO cart_items(cart_id, product_id, qty) VALUES(?,?,?)", (cart["id"], payload.product_id, payload.qty))
-        return {"ok": True}
+        return {"ok": True, "id": item["id"], "qty": item["qty"]}
+
+@router.post("/cart/batch")
+def batch(payload: BatchIn, user=Depends(require_user)):
+    # many add/set/remove operations in one transaction, answered with the updated cart; products that are missing or
+    # inactive are left out of the cart and listed under "unavailable"
+    for o in payload.ops:
+        if o.op not in ("add", "set", "remove"):
+            raise HTTPException(status_code=400, detail="Invalid op")
+        if o.op == "add" and o.qty == 0:
+            raise HTTPException(status_code=400, detail="Invalid qty")
+    net = _fold(payload.ops)
+    removes = [pid for pid, (mode, n) in net.items() if mode == "set" and n == 0]
+    upserts = {pid: v for pid, v in net.items() if v[1] > 0}
+    with get_db(immediate=True) as db:
+        cart_id = _cart_id(db, user["user_id"])
+        unavailable = []
+        if upserts:
+            q = ",".join("?" * len(upserts))
+            active = {r["id"] for r in db.execute(f"SELECT id FROM products WHERE id IN ({q}) AND is_active=1", list(upserts)).fetchall()}
+            unavailable = [pid for pid in upserts if pid not in active]
+            db.executemany("""INSERT INTO cart_items(cart_id, product_id, qty) VALUES(?,?,?)
+                              ON CONFLICT(cart_id, product_id) DO UPDATE SET qty=CASE WHEN ? = 'set' THEN excluded.qty ELSE MIN(qty+excluded.qty, ?) END""",
+                           [(cart_id, pid, n, mode, MAX_QTY) for pid, (mode, n) in upserts.items() if pid in active])
+        if removes:
+            q = ",".join("?" * len(removes))
+            db.execute(f"DELETE FROM cart_items WHERE cart_id=? AND product_id IN ({q})", (cart_id, *removes))
+        return ORJSONResponse({"items": _items(db, user["user_id"]), "unavailable": unavailable})
 
 @router.delete("/cart/items/{item_id}")
 def remove(item_id: int, user=Depends(require_user)):
-    with get_db() as db:
+    with get_db(immediate=True) as db:
         db.execute("DELETE FROM cart_items WHERE id=? AND cart_id=(SELECT id FROM carts WHERE user_id=?)", (item_id, user["user_id"]))
         return {"ok": True}
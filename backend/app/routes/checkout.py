@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
+import requests
+from fastapi import APIRouter, Depends, Header, HTTPException
 from pydantic import BaseModel
 from ..auth import require_user
+from ..checkout import place_order
 from ..db import get_db
-from ..settings import settings
 from ..paystack import init_transaction
 
 router = APIRouter()
@@ -23,60 +24,33 @@ class DigitalInitIn(BaseModel):
     cart_item_ids: list[int]
 
 @router.post("/physical")
-def physical(payload: PhysicalIn, user=Depends(require_user)):
-    if not payload.cart_item_ids:
-        raise HTTPException(status_code=400, detail="No items")
-    with get_db() as db:
-        q = ",".join("?"*len(payload.cart_item_ids))
-        rows = db.execute(f"""SELECT ci.id, ci.qty, p.* FROM cart_items ci
-                               JOIN carts c ON c.id=ci.cart_id
-                               JOIN products p ON p.id=ci.product_id
-                               WHERE c.user_id=? AND ci.id IN ({q})""", (user["user_id"], *payload.cart_item_ids)).fetchall()
-        if not rows:
-            raise HTTPException(status_code=400, detail="No items")
-        if any(r["type"]!="physical" for r in rows):
-            raise HTTPException(status_code=400, detail="Physical checkout must contain physical items only")
-        total = sum(int(r["price_pesewas"])*int(r["qty"]) for r in rows)
-        db.execute("INSERT INTO orders(user_id,type,status,total_pesewas) VALUES(?, 'physical','new',?)", (user["user_id"], total))
-        oid = db.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
-        for r in rows:
-            db.execute("""INSERT INTO order_items(order_id, product_id, vendor_id, product_type, name_snapshot, price_pesewas, qty)
-                          VALUES(?,?,?,?,?,?,?)""", (oid, r["id"], r["vendor_id"], "physical", r["name"], r["price_pesewas"], r["qty"]))
-            db.execute("INSERT OR REPLACE INTO vendor_order_status(order_id, vendor_id, status) VALUES(?,?, 'new')", (oid, r["vendor_id"]))
-        d = payload.delivery
-        db.execute("""INSERT INTO order_delivery_details(order_id, full_name, phone, region, city, address, notes)
-                      VALUES(?,?,?,?,?,?,?)""", (oid, d.full_name, d.phone, d.region, d.city, d.address, d.notes))
-        db.execute(f"DELETE FROM cart_items WHERE id IN ({q}) AND cart_id=(SELECT id FROM carts WHERE user_id=?)", (*payload.cart_item_ids, user["user_id"]))
-        return {"order_id": oid, "payment_method": "pay_on_delivery", "warnings": ["PAY ON DELIVERY ONLY (physical items).", "Do not send money to vendors outside the platform."]}
+def physical(payload: PhysicalIn, user=Depends(require_user), idempotency_key: str | None = Header(None, max_length=128)):
+    order, _ = place_order(user["user_id"], "physical", payload.cart_item_ids, idempotency_key, payload.delivery)
+    return {"order_id": order["id"], "payment_method": "pay_on_delivery", "warnings": ["PAY ON DELIVERY ONLY (physical items).", "Do not send money to vendors outside the platform."]}
 
 @router.post("/digital/init")
-def digital_init(payload: DigitalInitIn, user=Depends(require_user)):
-    if not payload.cart_item_ids:
-        raise HTTPException(status_code=400, detail="No items")
-    with get_db() as db:
-        q = ",".join("?"*len(payload.cart_item_ids))
-        rows = db.execute(f"""SELECT ci.id, ci.qty, p.* FROM cart_items ci
-                               JOIN carts c ON c.id=ci.cart_id
-                               JOIN products p ON p.id=ci.product_id
-                               WHERE c.user_id=? AND ci.id IN ({q})""", (user["user_id"], *payload.cart_item_ids)).fetchall()
-        if not rows:
-            raise HTTPException(status_code=400, detail="No items")
-        if any(r["type"]!="digital" for r in rows):
-            raise HTTPException(status_code=400, detail="Digital checkout must contain digital items only")
-        total = sum(int(r["price_pesewas"])*int(r["qty"]) for r in rows)
-        db.execute("INSERT INTO orders(user_id,type,status,total_pesewas) VALUES(?, 'digital','pending_payment',?)", (user["user_id"], total))
-        oid = db.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
-        ref = f"ord_{oid}_{user['user_id']}"
-        db.execute("UPDATE orders SET paystack_reference=? WHERE id=?", (ref, oid))
-        for r in rows:
-            gross = int(r["price_pesewas"])*int(r["qty"])
-            commission = int(round(gross*settings.COMMISSION_RATE))
-            net = gross-commission
-            db.execute("""INSERT INTO order_items(order_id, product_id, vendor_id, product_type, name_snapshot, price_pesewas, qty, commission_pesewas, vendor_net_pesewas)
-                      VALUES(?,?,?,?,?,?,?,?,?)""", (oid, r["id"], r["vendor_id"], "digital", r["name"], r["price_pesewas"], r["qty"], commission, net))
-        u = db.execute("SELECT telegram_id FROM users WHERE id=?", (user["user_id"],)).fetchone()
-        email = f"{u['telegram_id']}@telegram.local"
-        resp = init_transaction(email=email, amount_pesewas=total, reference=ref, metadata={"purpose":"order","order_id":oid})
-        db.execute("INSERT INTO payments(purpose, order_id, reference, amount_pesewas, status) VALUES('order',?,?,?,'initiated')", (oid, ref, total))
+def digital_init(payload: DigitalInitIn, user=Depends(require_user), idempotency_key: str | None = Header(None, max_length=128)):
+    order, replayed = place_order(user["user_id"], "digital", payload.cart_item_ids, idempotency_key)
+    oid, ref = order["id"], order["paystack_reference"]
+    if replayed:
+        if order["authorization_url"]:
+            return {"order_id": oid, "reference": ref, "authorization_url": order["authorization_url"]}
+        if order["payment_status"] == "initiated":
+            raise HTTPException(status_code=409, detail="Checkout already in progress")
+        raise HTTPException(status_code=409, detail="Previous checkout with this Idempotency-Key failed, use a new key")
+
+    # the pending order is committed; talk to Paystack without holding the write lock
+    try:
+        resp = init_transaction(email=order["email"], amount_pesewas=order["total_pesewas"], reference=ref, metadata={"purpose":"order","order_id":oid})
+        auth_url = resp["data"]["authorization_url"]
+    except (requests.RequestException, KeyError, ValueError):
+        with get_db(immediate=True) as db:
+            db.execute("UPDATE payments SET status='init_failed' WHERE reference=?", (ref,))
+            db.execute("UPDATE orders SET status='cancelled' WHERE id=?", (oid,))
+        raise HTTPException(status_code=502, detail="Payment provider unavailable, please retry")
+
+    q = ",".join("?"*len(payload.cart_item_ids))
+    with get_db(immediate=True) as db:
+        db.execute("UPDATE payments SET authorization_url=? WHERE reference=?", (auth_url, ref))
         db.execute(f"DELETE FROM cart_items WHERE id IN ({q}) AND cart_id=(SELECT id FROM carts WHERE user_id=?)", (*payload.cart_item_ids, user["user_id"]))
-        return {"order_id": oid, "reference": ref, "authorization_url": resp["data"]["authorization_url"]}
+    return {"order_id": oid, "reference": ref, "authorization_url": auth_url}
@@ -6,14 +6,17 @@ router = APIRouter()
 @router.get("/me")
 def me(user=Depends(require_user)):
     with get_db() as db:
-        u = db.execute("SELECT * FROM users WHERE id=?", (user["user_id"],)).fetchone()
-        v = db.execute("SELECT * FROM vendors WHERE user_id=?", (user["user_id"],)).fetchone()
-        sub = None
-        if v:
-            sub = db.execute(
-                """SELECT vs.status, vs.renews_at, p.*
-                   FROM vendor_subscriptions vs JOIN plans p ON p.id=vs.plan_id
-                   WHERE vs.vendor_id=?""",
-                (v["id"],),
-            ).fetchone()
-        return {"id": u["id"], "role": u["role"], "is_vendor": v is not None, "vendor_id": v["id"] if v else None, "plan": dict(sub) if sub else None}
+        r = db.execute(
+            """SELECT u.id, u.role, v.id AS vendor_id, vs.status, vs.renews_at, p.id AS plan_id, p.name, p.billing, p.price_pesewas, p.max_active_listings
+               FROM users u
+               LEFT JOIN vendors v ON v.user_id=u.id
+               LEFT JOIN vendor_subscriptions vs ON vs.vendor_id=v.id
+               LEFT JOIN plans p ON p.id=vs.plan_id
+               WHERE u.id=?""",
+            (user["user_id"],),
+        ).fetchone()
+    sub = None
+    if r["status"] is not None:
+        sub = {"status": r["status"], "renews_at": r["renews_at"], "id": r["plan_id"], "name": r["name"], "billing": r["billing"],
+               "price_pesewas": r["price_pesewas"], "max_active_listings": r["max_active_listings"]}
+    return {"id": r["id"], "role": r["role"], "is_vendor": r["vendor_id"] is not None, "vendor_id": r["vendor_id"], "plan": sub}
@@ -0,0 +1,66 @@
+import re
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from ..cache import TTLCache
+from ..db import get_db
+from ..http_cache import etag_matches
+from ..media import MediaError, content_type, media_cache
+
+router = APIRouter()
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+# file_ids known to be catalog images; digital product files are never proxied
+_known = TTLCache(maxsize=50_000, ttl=3600)
+
+def _is_catalog_image(file_id: str) -> bool:
+    if _known.get(file_id):
+        return True
+    with get_db() as db:
+        ok = db.execute("""SELECT EXISTS(SELECT 1 FROM product_images WHERE telegram_file_id=?)
+                               OR EXISTS(SELECT 1 FROM products WHERE cover_image_file_id=?)
+                               OR EXISTS(SELECT 1 FROM vendor_uploads WHERE telegram_file_id=? AND kind='image') AS ok""",
+                        (file_id, file_id, file_id)).fetchone()["ok"]
+    if ok:
+        _known.set(file_id, True)
+    return bool(ok)
+
+def _byte_range(header: str | None, size: int):
+    # single "bytes=a-b" / "bytes=a-" / "bytes=-n" range -> (start, end) inclusive; None serves the whole file
+    m = _RANGE.match(header.strip()) if header else None
+    if not m or m.group(1) == m.group(2) == "":
+        return None
+    if m.group(1) == "":
+        start, end = max(0, size - int(m.group(2))), size - 1
+    else:
+        start, end = int(m.group(1)), min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+@router.get("/media/{file_id}")
+def media(file_id: str, request: Request, size: str | None = None):
+    # ?size=thumb: precomputed MEDIA_THUMB_PX JPEG for catalog grids (the original when Pillow is not installed)
+    if size not in (None, "thumb"):
+        raise HTTPException(status_code=422, detail="size must be thumb")
+    if len(file_id) > 256 or not _is_catalog_image(file_id):
+        raise HTTPException(status_code=404, detail="Not found")
+    try:
+        path = media_cache.get(file_id, thumb=size == "thumb")
+    except MediaError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    total = path.stat().st_size
+    etag = f'"{path.name.split(".")[0][:32]}.{path.name.split(".")[1]}-{total:x}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE, "Accept-Ranges": "bytes"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    if_range = request.headers.get("if-range")
+    rng = _byte_range(request.headers.get("range"), total) if not if_range or if_range == etag else None
+    if rng is None:
+        return FileResponse(path, media_type=content_type(path), headers=headers)
+    start, end = rng
+    with open(path, "rb") as f:
+        f.seek(start)
+        body = f.read(end - start + 1)
+    return Response(body, status_code=206, media_type=content_type(path), headers={**headers, "Content-Range": f"bytes {start}-{end}/{total}"})
@@ -1,19 +1,89 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException
-from ..auth import require_user
-from ..db import get_db
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
+from ..auth import require_user, require_vendor
+from ..db import get_db, fetch_all
+from ..fields import select_columns
+from ..outbox import enqueue_messages
+from ..pagination import encode_cursor, decode_cursor
 router = APIRouter()
 
+# vendor fulfilment: target status -> statuses it may be reached from
+TRANSITIONS = {"processing": ("new",), "shipped": ("new", "processing"), "delivered": ("shipped",)}
+STATUSES = ("new", "processing", "shipped", "delivered")
+BUYER_NOTICES = {"shipped": "🚚 Your order #{order_id} from {store} has shipped.", "delivered": "📦 Your order #{order_id} from {store} was delivered."}
+BULK_MAX = 200
+ORDER_FIELDS = ("id", "user_id", "type", "status", "total_pesewas", "paystack_reference", "created_at", "paid_at")
+
+class StatusUpdateIn(BaseModel):
+    order_ids: list[int] = Field(min_length=1, max_length=BULK_MAX)
+    status: str
+
 @router.get("/orders")
-def list_orders(user=Depends(require_user)):
+def list_orders(fields: str | None = None, user=Depends(require_user)):
+    cols = select_columns(fields, ORDER_FIELDS)
     with get_db() as db:
-        return [dict(r) for r in db.execute("SELECT * FROM orders WHERE user_id=? ORDER BY created_at DESC", (user["user_id"],)).fetchall()]
+        return ORJSONResponse(fetch_all(db, f"SELECT {cols} FROM orders WHERE user_id=? ORDER BY created_at DESC", (user["user_id"],)))
 
 @router.get("/orders/{order_id}")
 def detail(order_id: int, user=Depends(require_user)):
     with get_db() as db:
-        o = db.execute("SELECT * FROM orders WHERE id=? AND user_id=?", (order_id, user["user_id"])).fetchone()
+        o = db.execute("SELECT id, user_id, type, status, total_pesewas, paystack_reference, created_at, paid_at FROM orders WHERE id=? AND user_id=?", (order_id, user["user_id"])).fetchone()
         if not o:
             raise HTTPException(status_code=404, detail="Not found")
-        items = db.execute("SELECT * FROM order_items WHERE order_id=?", (order_id,)).fetchall()
-        d = db.execute("SELECT * FROM order_delivery_details WHERE order_id=?", (order_id,)).fetchone()
-        return {"order": dict(o), "items": [dict(i) for i in items], "delivery": dict(d) if d else None}
+        items = fetch_all(db, """SELECT id, order_id, product_id, vendor_id, product_type, name_snapshot, price_pesewas, qty, commission_pesewas, vendor_net_pesewas, created_at
+                                 FROM order_items WHERE order_id=?""", (order_id,))
+        d = db.execute("SELECT order_id, full_name, phone, region, city, address, notes, created_at FROM order_delivery_details WHERE order_id=?", (order_id,)).fetchone()
+        return ORJSONResponse({"order": dict(o), "items": items, "delivery": dict(d) if d else None})
+
+@router.get("/vendor/orders")
+def vendor_orders(status: str = "new", page_size: int = 50, cursor: str | None = None, vendor=Depends(require_vendor)):
+    # oldest first within a status, keyset on (updated_at, order_id) via idx_vendor_order_status_inbox
+    if status not in STATUSES:
+        raise HTTPException(status_code=422, detail=f"status must be one of {', '.join(STATUSES)}")
+    page_size = min(max(page_size, 1), 100)
+    where, params = "", [vendor["vendor_id"], status]
+    if cursor:
+        kind, key, last_id = decode_cursor(cursor)
+        if kind != status:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        where, params = "AND (s.updated_at, s.order_id) > (?, ?)", params + [key, last_id]
+    with get_db() as db:
+        rows = db.execute(f"""SELECT s.order_id, s.status, s.updated_at, o.created_at,
+                                     d.full_name, d.phone, d.region, d.city, d.address, d.notes,
+                                     (SELECT json_group_array(json_object('id', i.id, 'product_id', i.product_id, 'name', i.name_snapshot,
+                                                                          'price_pesewas', i.price_pesewas, 'qty', i.qty, 'vendor_net_pesewas', i.vendor_net_pesewas))
+                                      FROM order_items i WHERE i.order_id=s.order_id AND i.vendor_id=s.vendor_id) AS items_json
+                              FROM vendor_order_status s
+                              JOIN orders o ON o.id=s.order_id
+                              LEFT JOIN order_delivery_details d ON d.order_id=s.order_id
+                              WHERE s.vendor_id=? AND s.status=? {where}
+                              ORDER BY s.updated_at, s.order_id LIMIT ?""", (*params, page_size+1)).fetchall()
+    next_cursor = encode_cursor(status, rows[page_size-1]["updated_at"], rows[page_size-1]["order_id"]) if len(rows) > page_size else None
+    items = [{"order_id": r["order_id"], "status": r["status"], "updated_at": r["updated_at"], "created_at": r["created_at"],
+              "items": json.loads(r["items_json"]),
+              "delivery": {"full_name": r["full_name"], "phone": r["phone"], "region": r["region"], "city": r["city"], "address": r["address"], "notes": r["notes"]} if r["full_name"] is not None else None}
+             for r in rows[:page_size]]
+    return ORJSONResponse({"items": items, "page_size": page_size, "next_cursor": next_cursor})
+
+@router.post("/vendor/orders/status")
+def vendor_orders_status(payload: StatusUpdateIn, vendor=Depends(require_vendor)):
+    # one transaction for the whole batch; orders not in an allowed source status are reported back, not failed.
+    # unary + keeps the planner on the (order_id, vendor_id) key instead of walking the vendor's slice of the inbox index
+    sources = TRANSITIONS.get(payload.status)
+    if not sources:
+        raise HTTPException(status_code=422, detail=f"status must be one of {', '.join(TRANSITIONS)}")
+    ids = list(dict.fromkeys(payload.order_ids))
+    q = ",".join("?" * len(ids))
+    with get_db(immediate=True) as db:
+        updated = [r["order_id"] for r in db.execute(f"""UPDATE vendor_order_status SET status=?, updated_at=datetime('now')
+                                                         WHERE order_id IN ({q}) AND +vendor_id=? AND +status IN ({",".join("?" * len(sources))})
+                                                         RETURNING order_id""", (payload.status, *ids, vendor["vendor_id"], *sources)).fetchall()]
+        notice = BUYER_NOTICES.get(payload.status)
+        if updated and notice:
+            buyers = db.execute(f"""SELECT o.id, u.telegram_id, v.store_name FROM orders o JOIN users u ON u.id=o.user_id JOIN vendors v ON v.id=?
+                                    WHERE o.id IN ({",".join("?" * len(updated))})""", (vendor["vendor_id"], *updated)).fetchall()
+            enqueue_messages(db, [(b["telegram_id"], notice.format(order_id=b["id"], store=b["store_name"])) for b in buyers])
+    done = set(updated)
+    return {"status": payload.status, "updated": sorted(done), "skipped": [i for i in ids if i not in done]}
@@ -1,9 +1,12 @@
-from fastapi import APIRouter
-from ..db import get_db
+from fastapi import APIRouter, Request
+from ..db import get_db, fetch_all
+from ..http_cache import cached_json
 router = APIRouter()
 
-@router.get("/plans")
-def list_plans():
+def _plans():
     with get_db() as db:
-        rows = db.execute("SELECT * FROM plans ORDER BY id").fetchall()
-        return [dict(r) for r in rows]
+        return fetch_all(db, "SELECT id, name, billing, price_pesewas, max_active_listings FROM plans ORDER BY id")
+
+@router.get("/plans")
+def list_plans(request: Request):
+    return cached_json(request, ("plans",), _plans)
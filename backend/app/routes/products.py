@@ -1,11 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, Field
+import csv, json, re
+from collections import deque
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional, List
-from ..db import get_db
+from ..db import get_db, fetch_all
+from ..fields import select_columns
 from ..auth import require_vendor
+from ..cache import TTLCache
+from ..pagination import encode_cursor, decode_cursor
+from ..http_cache import cached_json
+from ..settings import settings
+from ..subscriptions import require_active
 
 router = APIRouter()
 
+PRODUCT_FIELDS = ("id", "vendor_id", "type", "name", "short_description", "long_description", "category_slug", "price_pesewas", "is_active",
+                  "stock_status", "cover_image_file_id", "created_at", "updated_at")
+
+_count_cache = TTLCache(maxsize=1024, ttl=settings.CATALOG_COUNT_TTL)
+
 class ProductCreateIn(BaseModel):
     type: str
     name: str
@@ -18,89 +33,342 @@ class ProductCreateIn(BaseModel):
     image_file_ids: List[str] = Field(default_factory=list)
     digital_file_upload_id: Optional[int] = None
 
-def _require_active_subscription(db, vendor_id: int):
-    sub = db.execute("SELECT * FROM vendor_subscriptions WHERE vendor_id=?", (vendor_id,)).fetchone()
-    if not sub or sub["status"] != "active":
-        raise HTTPException(status_code=403, detail="Active subscription required")
-    plan = db.execute("SELECT * FROM plans WHERE id=?", (sub["plan_id"],)).fetchone()
-    return plan
+def _categories():
+    with get_db() as db:
+        return fetch_all(db, "SELECT slug, name FROM categories ORDER BY name")
+
+def _product_error(payload: ProductCreateIn, sell_type: Optional[str] = None) -> Optional[str]:
+    # sell_type=None runs only the checks that need no DB
+    if payload.type not in ("physical","digital"):
+        return "Invalid type"
+    if len(payload.image_file_ids) > 3:
+        return "Max 3 images"
+    if sell_type is None:
+        return None
+    if payload.type == "digital" and sell_type not in ("digital","both"):
+        return "Not allowed to sell digital"
+    if payload.type == "physical" and sell_type not in ("physical","both"):
+        return "Not allowed to sell physical"
+    if payload.type == "digital" and not payload.digital_file_upload_id:
+        return "Upload digital file via bot first"
+    return None
 
 @router.get("/categories")
-def categories():
-    with get_db() as db:
-        return [dict(r) for r in db.execute("SELECT * FROM categories ORDER BY name").fetchall()]
+def categories(request: Request):
+    return cached_json(request, ("categories",), _categories)
+
+def _fts_query(q: str) -> Optional[str]:
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    # quoted terms, last one as a prefix for type-ahead
+    return " ".join([f'"{t}"' for t in terms[:-1]] + [f'"{terms[-1]}"*'])
 
 @router.get("/products")
-def list_products(q: Optional[str]=None, type: Optional[str]=None, category: Optional[str]=None, page: int=1, page_size: int=20):
-    offset = (page-1)*page_size
+def list_products(q: Optional[str]=None, type: Optional[str]=None, category: Optional[str]=None, page: int=1, page_size: int=20, cursor: Optional[str]=None, include_total: Optional[bool]=None):
+    # cursor mode (?cursor= for the first page) seeks instead of offsetting and skips the count unless asked
+    if page < 1:
+        raise HTTPException(status_code=422, detail="page must be >= 1")
+    page_size = min(max(page_size, 1), 100)
+    keyset = cursor is not None
+    if include_total is None:
+        include_total = not keyset
     where = ["p.is_active=1"]
     params = []
-    if q:
-        where.append("(p.name LIKE ? OR p.short_description LIKE ?)")
-        params += [f"%{q}%", f"%{q}%"]
     if type in ("physical","digital"):
         where.append("p.type=?"); params.append(type)
     if category:
         where.append("p.category_slug=?"); params.append(category)
+    match = _fts_query(q) if q else None
+    if match:
+        kind = "r"
+        from_sql = "products_fts JOIN products p ON p.id=products_fts.rowid"
+        where.insert(0, "products_fts MATCH ?"); params.insert(0, match)
+        sort_key = "bm25(products_fts, 10.0, 4.0, 1.0, 2.0)"
+        order_sql = f"{sort_key}, p.id"
+        snippet_sql = "snippet(products_fts, -1, '<mark>', '</mark>', '…', 12)"
+    else:
+        kind = "c"
+        from_sql = "products p"
+        sort_key = "p.created_at"
+        order_sql = "p.created_at DESC, p.id DESC"
+        snippet_sql = "NULL"
     where_sql = " AND ".join(where)
+
+    page_where, page_params = list(where), list(params)
+    if keyset:
+        if cursor:
+            ckind, ckey, cid = decode_cursor(cursor)
+            if ckind != kind:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            if kind == "r":
+                page_where.append(f"({sort_key} > ? OR ({sort_key} = ? AND p.id > ?))"); page_params += [ckey, ckey, cid]
+            else:
+                page_where.append("(p.created_at, p.id) < (?, ?)"); page_params += [ckey, cid]
+        limit_sql, limit_params = "LIMIT ?", [page_size+1]
+    else:
+        limit_sql, limit_params = "LIMIT ? OFFSET ?", [page_size+1, (page-1)*page_size]
+
     with get_db() as db:
-        rows = db.execute(f"""SELECT p.*, v.store_name FROM products p JOIN vendors v ON v.id=p.vendor_id
-                             WHERE {where_sql} ORDER BY p.created_at DESC LIMIT ? OFFSET ?""", (*params, page_size, offset)).fetchall()
-        total = db.execute(f"SELECT COUNT(*) AS c FROM products p WHERE {where_sql}", params).fetchone()["c"]
-        items = [{"id": r["id"], "type": r["type"], "name": r["name"], "short_description": r["short_description"], "price_pesewas": r["price_pesewas"], "cover_image_file_id": r["cover_image_file_id"], "vendor": {"id": r["vendor_id"], "store_name": r["store_name"]}} for r in rows]
-        return {"items": items, "page": page, "page_size": page_size, "total": total}
+        rows = db.execute(f"""SELECT p.id, p.type, p.name, p.short_description, p.price_pesewas, p.cover_image_file_id, p.vendor_id,
+                                    v.store_name, {snippet_sql} AS snippet, {sort_key} AS sort_key
+                             FROM {from_sql} JOIN vendors v ON v.id=p.vendor_id
+                             WHERE {" AND ".join(page_where)} ORDER BY {order_sql} {limit_sql}""", (*page_params, *limit_params)).fetchall()
+        total = None
+        if include_total:
+            total = _count_cache.get_or_set((from_sql, where_sql, tuple(params)), lambda: db.execute(f"SELECT COUNT(*) AS c FROM {from_sql} WHERE {where_sql}", params).fetchone()["c"])
+    next_cursor = encode_cursor(kind, rows[page_size-1]["sort_key"], rows[page_size-1]["id"]) if len(rows) > page_size else None
+    items = [{"id": r["id"], "type": r["type"], "name": r["name"], "short_description": r["short_description"], "price_pesewas": r["price_pesewas"], "cover_image_file_id": r["cover_image_file_id"], "snippet": r["snippet"], "vendor": {"id": r["vendor_id"], "store_name": r["store_name"]}} for r in rows[:page_size]]
+    return {"items": items, "page": None if keyset else page, "page_size": page_size, "total": total, "next_cursor": next_cursor}
 
-@router.get("/products/{product_id}")
-def detail(product_id: int):
+def _detail(product_id: int):
     with get_db() as db:
-        p = db.execute("""SELECT p.*, v.store_name FROM products p JOIN vendors v ON v.id=p.vendor_id WHERE p.id=?""", (product_id,)).fetchone()
+        p = db.execute("""SELECT p.id, p.vendor_id, p.type, p.name, p.short_description, p.long_description, p.category_slug, p.price_pesewas,
+                                 p.is_active, p.stock_status, p.cover_image_file_id, v.store_name,
+                                 (SELECT json_group_array(telegram_file_id) FROM
+                                   (SELECT telegram_file_id FROM product_images WHERE product_id=p.id ORDER BY sort_order)) AS images_json
+                          FROM products p JOIN vendors v ON v.id=p.vendor_id WHERE p.id=?""", (product_id,)).fetchone()
         if not p or not p["is_active"]:
             raise HTTPException(status_code=404, detail="Not found")
-        imgs = db.execute("SELECT telegram_file_id FROM product_images WHERE product_id=? ORDER BY sort_order", (product_id,)).fetchall()
-        return {"id": p["id"], "type": p["type"], "name": p["name"], "short_description": p["short_description"], "long_description": p["long_description"], "price_pesewas": p["price_pesewas"], "category_slug": p["category_slug"], "stock_status": p["stock_status"], "cover_image_file_id": p["cover_image_file_id"], "images": [i["telegram_file_id"] for i in imgs], "vendor": {"id": p["vendor_id"], "store_name": p["store_name"]}, "policy": {"physical_pay_on_delivery_only": True, "do_not_pay_vendor_outside_platform": True}}
+        return {"id": p["id"], "type": p["type"], "name": p["name"], "short_description": p["short_description"], "long_description": p["long_description"], "price_pesewas": p["price_pesewas"], "category_slug": p["category_slug"], "stock_status": p["stock_status"], "cover_image_file_id": p["cover_image_file_id"], "images": json.loads(p["images_json"]), "vendor": {"id": p["vendor_id"], "store_name": p["store_name"]}, "policy": {"physical_pay_on_delivery_only": True, "do_not_pay_vendor_outside_platform": True}}
+
+@router.get("/products/{product_id}")
+def detail(product_id: int, request: Request):
+    return cached_json(request, ("product", product_id), lambda: _detail(product_id))
 
 @router.get("/vendor/products")
-def vendor_products(vendor=Depends(require_vendor)):
+def vendor_products(fields: Optional[str] = None, vendor=Depends(require_vendor)):
+    cols = select_columns(fields, PRODUCT_FIELDS)
     with get_db() as db:
-        return [dict(r) for r in db.execute("SELECT * FROM products WHERE vendor_id=? ORDER BY created_at DESC", (vendor["vendor_id"],)).fetchall()]
+        return ORJSONResponse(fetch_all(db, f"SELECT {cols} FROM products WHERE vendor_id=? ORDER BY created_at DESC", (vendor["vendor_id"],)))
 
 @router.post("/vendor/products")
 def create(payload: ProductCreateIn, vendor=Depends(require_vendor)):
-    if payload.type not in ("physical","digital"):
-        raise HTTPException(status_code=400, detail="Invalid type")
-    if len(payload.image_file_ids) > 3:
-        raise HTTPException(status_code=400, detail="Max 3 images")
+    err = _product_error(payload)
+    if err:
+        raise HTTPException(status_code=400, detail=err)
 
-    with get_db() as db:
-        plan = _require_active_subscription(db, vendor["vendor_id"])
-        used = db.execute("SELECT COUNT(*) AS c FROM products WHERE vendor_id=? AND is_active=1", (vendor["vendor_id"],)).fetchone()["c"]
-        if int(used) >= int(plan["max_active_listings"]):
+    with get_db(immediate=True) as db:
+        sub = require_active(db, vendor["vendor_id"])
+        if sub["active_listings"] >= sub["max_active_listings"]:
             raise HTTPException(status_code=409, detail="PLAN_LIMIT_REACHED")
 
-        v = db.execute("SELECT * FROM vendors WHERE id=?", (vendor["vendor_id"],)).fetchone()
-        if payload.type == "digital" and v["sell_type"] not in ("digital","both"):
-            raise HTTPException(status_code=400, detail="Not allowed to sell digital")
-        if payload.type == "physical" and v["sell_type"] not in ("physical","both"):
-            raise HTTPException(status_code=400, detail="Not allowed to sell physical")
+        err = _product_error(payload, sub["sell_type"])
+        if err:
+            raise HTTPException(status_code=400, detail=err)
 
         digital_file_id = None
         if payload.type == "digital":
-            if not payload.digital_file_upload_id:
-                raise HTTPException(status_code=400, detail="Upload digital file via bot first")
-            up = db.execute("SELECT * FROM vendor_uploads WHERE id=? AND vendor_id=? AND kind='digital' AND used_in_product_id IS NULL", (payload.digital_file_upload_id, vendor["vendor_id"])).fetchone()
+            up = db.execute("SELECT telegram_file_id FROM vendor_uploads WHERE id=? AND vendor_id=? AND kind='digital' AND used_in_product_id IS NULL", (payload.digital_file_upload_id, vendor["vendor_id"])).fetchone()
             if not up:
                 raise HTTPException(status_code=400, detail="Invalid upload id")
             digital_file_id = up["telegram_file_id"]
 
-        db.execute("""INSERT INTO products(vendor_id,type,name,short_description,long_description,category_slug,price_pesewas,stock_status,cover_image_file_id)
-                      VALUES(?,?,?,?,?,?,?,?,?)""", (vendor["vendor_id"], payload.type, payload.name, payload.short_description, payload.long_description, payload.category_slug, payload.price_pesewas, payload.stock_status if payload.type=="physical" else "in_stock", payload.cover_image_file_id))
-        pid = db.execute("SELECT last_insert_rowid() AS id").fetchone()["id"]
-
-        for idx, fid in enumerate(payload.image_file_ids, start=1):
-            db.execute("INSERT INTO product_images(product_id, telegram_file_id, sort_order) VALUES(?,?,?)", (pid, fid, idx))
+        pid = db.execute("""INSERT INTO products(vendor_id,type,name,short_description,long_description,category_slug,price_pesewas,stock_status,cover_image_file_id)
+                            VALUES(?,?,?,?,?,?,?,?,?) RETURNING id""", (vendor["vendor_id"], payload.type, payload.name, payload.short_description, payload.long_description, payload.category_slug, payload.price_pesewas, payload.stock_status if payload.type=="physical" else "in_stock", payload.cover_image_file_id)).fetchone()["id"]
+        db.executemany("INSERT INTO product_images(product_id, telegram_file_id, sort_order) VALUES(?,?,?)",
+                       [(pid, fid, idx) for idx, fid in enumerate(payload.image_file_ids, start=1)])
 
         if payload.type == "digital":
             db.execute("INSERT INTO product_digital_assets(product_id, telegram_file_id) VALUES(?,?)", (pid, digital_file_id))
             db.execute("UPDATE vendor_uploads SET used_in_product_id=? WHERE id=?", (pid, payload.digital_file_upload_id))
 
-        return {"id": pid}
+    # inserts leave every cached body valid (404s are never cached); only this worker's listing counts are refreshed early,
+    # other workers catch up within CATALOG_COUNT_TTL
+    _count_cache.invalidate()
+    return {"id": pid}
+
+IMPORT_OPTIONAL = ("category_slug", "cover_image_file_id", "digital_file_upload_id")
+
+def _import_context(vendor_id: int):
+    with get_db() as db:
+        sub = require_active(db, vendor_id)
+        categories = {r["slug"] for r in db.execute("SELECT slug FROM categories").fetchall()}
+    return sub["max_active_listings"] - sub["active_listings"], sub["sell_type"], categories
+
+def _insert_import_chunk(vendor_id: int, chunk: list, remaining: int):
+    # chunk: [(line_no, ProductCreateIn)]; returns (created ids, errors, remaining)
+    errors, ids = [], []
+    with get_db(immediate=True) as db:
+        upload_ids = [p.digital_file_upload_id for _, p in chunk if p.type == "digital"]
+        uploads = {}
+        if upload_ids:
+            q = ",".join("?" * len(upload_ids))
+            uploads = {r["id"]: r["telegram_file_id"] for r in db.execute(
+                f"SELECT id, telegram_file_id FROM vendor_uploads WHERE vendor_id=? AND kind='digital' AND used_in_product_id IS NULL AND id IN ({q})",
+                (vendor_id, *upload_ids)).fetchall()}
+
+        # ids are assigned here, under the write lock, so every child row can go through executemany
+        next_id = db.execute("""SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name='products'), 0),
+                                           COALESCE((SELECT MAX(id) FROM products), 0)) + 1 AS id""").fetchone()["id"]
+        products, images, assets, used_uploads = [], [], [], []
+        for line, p in chunk:
+            if remaining <= 0:
+                errors.append({"line": line, "error": "PLAN_LIMIT_REACHED"})
+                continue
+            if p.type == "digital":
+                file_id = uploads.pop(p.digital_file_upload_id, None)
+                if not file_id:
+                    errors.append({"line": line, "error": "Invalid upload id"})
+                    continue
+                assets.append((next_id, file_id))
+                used_uploads.append((next_id, p.digital_file_upload_id))
+            products.append((next_id, vendor_id, p.type, p.name, p.short_description, p.long_description, p.category_slug, p.price_pesewas,
+                             p.stock_status if p.type=="physical" else "in_stock", p.cover_image_file_id))
+            images += [(next_id, fid, idx) for idx, fid in enumerate(p.image_file_ids, start=1)]
+            ids.append(next_id)
+            next_id += 1
+            remaining -= 1
+
+        db.executemany("""INSERT INTO products(id,vendor_id,type,name,short_description,long_description,category_slug,price_pesewas,stock_status,cover_image_file_id)
+                          VALUES(?,?,?,?,?,?,?,?,?,?)""", products)
+        db.executemany("INSERT INTO product_images(product_id, telegram_file_id, sort_order) VALUES(?,?,?)", images)
+        db.executemany("INSERT INTO product_digital_assets(product_id, telegram_file_id) VALUES(?,?)", assets)
+        db.executemany("UPDATE vendor_uploads SET used_in_product_id=? WHERE id=?", used_uploads)
+    return ids, errors, remaining
+
+class _NeedMore(Exception):
+    pass
+
+class _CsvLines:
+    # line source for csv.reader fed from the request stream. Running dry in the middle of a record raises _NeedMore, and
+    # the record's lines are put back to be parsed again once the next chunk has arrived.
+    def __init__(self):
+        self.ready = deque()  # (line_no, text with its "\n")
+        self.taken = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.ready:
+            raise _NeedMore
+        item = self.ready.popleft()
+        self.taken.append(item)
+        return item[1]
+
+def _csv_records(src: _CsvLines, reader):
+    # (first line_no, fields | ValueError) for every complete record buffered so far
+    while src.ready:
+        src.taken = []
+        try:
+            record = next(reader)
+        except _NeedMore:
+            src.ready.extendleft(reversed(src.taken))
+            return
+        except csv.Error as e:
+            record = ValueError(f"Invalid CSV: {e}")
+        yield src.taken[0][0], record
+
+async def _body_lines(request: Request):
+    # the body as one list of (line_no, text) per network chunk; a ValueError in place of the text ends the stream once
+    # the body passes IMPORT_MAX_BYTES or a line passes IMPORT_MAX_RECORD_BYTES
+    buf, size, line_no = b"", 0, 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > settings.IMPORT_MAX_BYTES:
+            yield [(line_no + 1, ValueError(f"Import body exceeds {settings.IMPORT_MAX_BYTES} bytes"))]
+            return
+        *complete, rest = chunk.split(b"\n")
+        if complete:
+            complete[0], buf = buf + complete[0], rest
+        else:
+            buf += rest
+        batch = []
+        for raw in complete:
+            line_no += 1
+            batch.append((line_no, raw.decode("utf-8-sig" if line_no == 1 else "utf-8", errors="replace").rstrip("\r")))
+        if len(buf) > settings.IMPORT_MAX_RECORD_BYTES:
+            batch.append((line_no + 1, ValueError(f"Line exceeds {settings.IMPORT_MAX_RECORD_BYTES} bytes")))
+            yield batch
+            return
+        if batch:
+            yield batch
+    if buf:
+        line_no += 1
+        yield [(line_no, buf.decode("utf-8-sig" if line_no == 1 else "utf-8", errors="replace").rstrip("\r"))]
+
+def _csv_row(header: list, record: list) -> dict:
+    row = dict(zip(header, record))
+    row["image_file_ids"] = [f for f in (row.get("image_file_ids") or "").split("|") if f]
+    for k in IMPORT_OPTIONAL:
+        if row.get(k) == "":
+            row[k] = None
+    return row
+
+async def _import_records(request: Request):
+    # yields (line_no, dict | ValueError) from a JSON-lines or CSV body without buffering the whole upload
+    is_csv = "csv" in request.headers.get("content-type", "")
+    src = _CsvLines()
+    reader = csv.reader(src)
+    header = None
+
+    async for batch in _body_lines(request):
+        for line_no, text in batch:
+            if isinstance(text, ValueError):
+                yield line_no, text
+                return
+            if not is_csv:
+                if text.strip():
+                    try:
+                        yield line_no, json.loads(text)
+                    except ValueError:
+                        yield line_no, ValueError("Invalid JSON")
+                continue
+            src.ready.append((line_no, text + "\n"))
+        # a quoted CSV field may span lines and chunks; whatever is left in src.ready is the start of an open record
+        for line_no, record in _csv_records(src, reader):
+            if isinstance(record, ValueError):
+                yield line_no, record
+            elif not "".join(record).strip():
+                continue
+            elif header is None:
+                header = [h.strip() for h in record]
+            else:
+                yield line_no, _csv_row(header, record)
+        if sum(len(text) for _, text in src.ready) > settings.IMPORT_MAX_RECORD_BYTES:
+            yield src.ready[0][0], ValueError(f"Record exceeds {settings.IMPORT_MAX_RECORD_BYTES} bytes")
+            return
+    if src.ready:
+        yield src.ready[0][0], ValueError("Unterminated quoted field")
+
+@router.post("/vendor/products/import")
+async def import_products(request: Request, vendor=Depends(require_vendor)):
+    vendor_id = vendor["vendor_id"]
+    remaining, sell_type, categories = await run_in_threadpool(_import_context, vendor_id)
+    created, errors, chunk, total = [], [], [], 0
+
+    async def flush():
+        nonlocal remaining, chunk
+        if chunk:
+            ids, errs, remaining = await run_in_threadpool(_insert_import_chunk, vendor_id, chunk, remaining)
+            created.extend(ids); errors.extend(errs)
+            chunk = []
+
+    async for line, obj in _import_records(request):
+        total += 1
+        if total > settings.IMPORT_MAX_ROWS:
+            errors.append({"line": line, "error": f"Import limited to {settings.IMPORT_MAX_ROWS} rows"})
+            break
+        if isinstance(obj, Exception) or not isinstance(obj, dict):
+            errors.append({"line": line, "error": str(obj) if isinstance(obj, Exception) else "Expected an object"})
+            continue
+        try:
+            p = ProductCreateIn(**obj)
+        except ValidationError as e:
+            errors.append({"line": line, "error": "; ".join(f"{'.'.join(map(str, x['loc']))}: {x['msg']}" for x in e.errors())})
+            continue
+        err = _product_error(p, sell_type)
+        if not err and p.category_slug is not None and p.category_slug not in categories:
+            err = "Unknown category"
+        if err:
+            errors.append({"line": line, "error": err})
+            continue
+        chunk.append((line, p))
+        if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+            await flush()
+    await flush()
+    if created:
+        _count_cache.invalidate()
+    errors.sort(key=lambda e: e["line"])
+    return {"created": len(created), "ids": created, "errors": errors, "remaining_listings": max(remaining, 0)}
@@ -5,11 +5,60 @@ class Settings(BaseModel):
     BOT_TOKEN: str = os.getenv("BOT_TOKEN", "")
     JWT_SECRET: str = os.getenv("JWT_SECRET", "change_me")
     PAYSTACK_SECRET_KEY: str = os.getenv("PAYSTACK_SECRET_KEY", "")
+    PAYSTACK_BASE_URL: str = os.getenv("PAYSTACK_BASE_URL", "https://api.paystack.co")
+    PAYSTACK_CONNECT_TIMEOUT: float = float(os.getenv("PAYSTACK_CONNECT_TIMEOUT", "3"))
+    PAYSTACK_READ_TIMEOUT: float = float(os.getenv("PAYSTACK_READ_TIMEOUT", "10"))
+    PAYSTACK_EVENT_WORKERS: int = int(os.getenv("PAYSTACK_EVENT_WORKERS", "2"))
+    PAYSTACK_EVENT_MAX_ATTEMPTS: int = int(os.getenv("PAYSTACK_EVENT_MAX_ATTEMPTS", "10"))
+    PAYSTACK_HTTP_POOL_SIZE: int = int(os.getenv("PAYSTACK_HTTP_POOL_SIZE", "16"))
     COMMISSION_RATE: float = float(os.getenv("COMMISSION_RATE", "0.20"))
     DATABASE_PATH: str = os.getenv("DATABASE_PATH", "db.sqlite3")
     BASE_WEBAPP_URL: str = os.getenv("BASE_WEBAPP_URL", "")
     PLATFORM_NAME: str = os.getenv("PLATFORM_NAME", "Ghana Online Market")
     ADMIN_TELEGRAM_IDS: str = os.getenv("ADMIN_TELEGRAM_IDS", "")
     CORS_ORIGINS: str = os.getenv("CORS_ORIGINS", "*")
+    WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1"))  # uvicorn --workers reads the same variable
+    RUN_WORKERS: bool = os.getenv("RUN_WORKERS", "1").lower() in ("1", "true", "yes")
+    TELEGRAM_MODE: str = os.getenv("TELEGRAM_MODE", "webhook")
+    TELEGRAM_API_BASE: str = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+    TELEGRAM_CONNECT_TIMEOUT: float = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "5"))
+    TELEGRAM_READ_TIMEOUT: float = float(os.getenv("TELEGRAM_READ_TIMEOUT", "30"))
+    TELEGRAM_HTTP_POOL_SIZE: int = int(os.getenv("TELEGRAM_HTTP_POOL_SIZE", "8"))
+    TELEGRAM_GLOBAL_RATE: float = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+    TELEGRAM_PER_CHAT_INTERVAL: float = float(os.getenv("TELEGRAM_PER_CHAT_INTERVAL", "1.0"))
+    TELEGRAM_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("TELEGRAM_OUTBOX_MAX_ATTEMPTS", "8"))
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "40"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_HEALTH_CHECK_AFTER: float = float(os.getenv("DB_HEALTH_CHECK_AFTER", "60"))
+    DB_BUSY_TIMEOUT_MS: int = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    DB_SYNCHRONOUS: str = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+    DB_WRITE_QUEUE: bool = os.getenv("DB_WRITE_QUEUE", "0") == "1"
+    DB_WRITE_BATCH: int = int(os.getenv("DB_WRITE_BATCH", "64"))
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "512"))
+    DB_MMAP_SIZE: int = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SUBSCRIPTION_GRACE_HOURS: float = float(os.getenv("SUBSCRIPTION_GRACE_HOURS", "24"))
+    SUBSCRIPTION_REMIND_DAYS: float = float(os.getenv("SUBSCRIPTION_REMIND_DAYS", "3"))
+    SUBSCRIPTION_SWEEP_INTERVAL: float = float(os.getenv("SUBSCRIPTION_SWEEP_INTERVAL", "300"))
+    SUBSCRIPTION_SWEEP_BATCH: int = int(os.getenv("SUBSCRIPTION_SWEEP_BATCH", "500"))
+    IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+    IMPORT_MAX_ROWS: int = int(os.getenv("IMPORT_MAX_ROWS", "50000"))
+    IMPORT_MAX_BYTES: int = int(os.getenv("IMPORT_MAX_BYTES", str(64 * 1024 * 1024)))
+    IMPORT_MAX_RECORD_BYTES: int = int(os.getenv("IMPORT_MAX_RECORD_BYTES", str(1024 * 1024)))
+    SQL_METRICS: bool = os.getenv("SQL_METRICS", "1") == "1"
+    SQL_PROGRESS_STEPS: int = int(os.getenv("SQL_PROGRESS_STEPS", "0"))
+    QUERY_BUDGETS: bool = os.getenv("QUERY_BUDGETS", "0") == "1"
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    MEDIA_CACHE_DIR: str = os.getenv("MEDIA_CACHE_DIR", "media_cache")
+    MEDIA_CACHE_MAX_BYTES: int = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+    MEDIA_MAX_FILE_BYTES: int = int(os.getenv("MEDIA_MAX_FILE_BYTES", str(20 * 1024 * 1024)))  # Bot API getFile limit
+    MEDIA_THUMB_PX: int = int(os.getenv("MEDIA_THUMB_PX", "320"))
+    COMPRESS_RESPONSES: bool = os.getenv("COMPRESS_RESPONSES", "1") == "1"
+    COMPRESS_MIN_BYTES: int = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    COMPRESS_GZIP_LEVEL: int = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BROTLI_QUALITY: int = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+    CATALOG_CACHE_SIZE: int = int(os.getenv("CATALOG_CACHE_SIZE", "10000"))
+    CATALOG_CACHE_TTL: float = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+    CATALOG_COUNT_TTL: float = float(os.getenv("CATALOG_COUNT_TTL", "30"))
+    DB_CACHE_SIZE_KB: int = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
 
 settings = Settings()
@@ -0,0 +1,104 @@
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from .db import get_db
+from .http_cache import invalidate_catalog
+from .outbox import enqueue_messages
+from .settings import settings
+from .workers import Worker
+
+log = logging.getLogger(__name__)
+
+# vendor_subscriptions.renews_at is written by paystack_events.py in this format, so plain string comparison orders it
+TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+def _ts(delta: timedelta = timedelta()) -> str:
+    return (datetime.utcnow() + delta).strftime(TS_FORMAT)
+
+def _cutoff() -> str:
+    return _ts(-timedelta(hours=settings.SUBSCRIPTION_GRACE_HOURS))
+
+def require_active(db, vendor_id: int):
+    # the whole plan check for request paths: one row with the status, the plan limit and the trigger-maintained
+    # vendors.active_listings counter (migration 0013). A lapsed subscription is refused even before the sweeper expires it.
+    sub = db.execute("""SELECT s.status, s.renews_at, p.id AS plan_id, p.name AS plan_name, p.max_active_listings, v.active_listings, v.sell_type
+                        FROM vendor_subscriptions s JOIN plans p ON p.id=s.plan_id JOIN vendors v ON v.id=s.vendor_id
+                        WHERE s.vendor_id=?""", (vendor_id,)).fetchone()
+    if not sub or sub["status"] != "active" or (sub["renews_at"] and sub["renews_at"] < _cutoff()):
+        raise HTTPException(status_code=403, detail="Active subscription required")
+    return sub
+
+def resume_listings(db, vendor_id: int) -> int:
+    # re-activates listings the sweeper paused, oldest first, up to the plan's free slots; none without an active subscription
+    return db.execute("""UPDATE products SET is_active=1, paused_by_plan=0 WHERE id IN (
+                           SELECT id FROM products WHERE vendor_id=? AND is_active=0 AND paused_by_plan=1 ORDER BY created_at, id
+                           LIMIT MAX(0, COALESCE((SELECT p.max_active_listings - v.active_listings FROM vendor_subscriptions s
+                                                  JOIN plans p ON p.id=s.plan_id JOIN vendors v ON v.id=s.vendor_id
+                                                  WHERE s.vendor_id=? AND s.status='active'), 0)))""", (vendor_id, vendor_id)).rowcount
+
+def _vendor_chats(db, vendor_ids) -> dict[int, int]:
+    ids = list(vendor_ids)
+    q = ",".join("?" * len(ids))
+    return {r["id"]: r["telegram_id"] for r in db.execute(
+        f"SELECT v.id, u.telegram_id FROM vendors v JOIN users u ON u.id=v.user_id WHERE v.id IN ({q})", ids).fetchall()}
+
+def expire_lapsed(limit: int) -> int:
+    with get_db(immediate=True) as db:
+        rows = db.execute("""UPDATE vendor_subscriptions SET status='expired' WHERE id IN (
+                               SELECT id FROM vendor_subscriptions WHERE status='active' AND renews_at < ? LIMIT ?)
+                             RETURNING vendor_id""", (_cutoff(), limit)).fetchall()
+        if rows:
+            chats = _vendor_chats(db, {r["vendor_id"] for r in rows})
+            enqueue_messages(db, [(chat, "⚠️ Your subscription has expired and your listings are paused. Renew to bring them back.")
+                                  for chat in chats.values()])
+    return len(rows)
+
+def pause_over_limit(limit: int) -> int:
+    # vendors over their plan's max_active_listings (0 once the subscription is no longer active) keep their oldest
+    # listings; the newest are deactivated, at most `limit` per transaction
+    with get_db(immediate=True) as db:
+        rows = db.execute("""UPDATE products SET is_active=0, paused_by_plan=1 WHERE id IN (
+                               SELECT id FROM (
+                                 SELECT pr.id, o.allowed, ROW_NUMBER() OVER (PARTITION BY pr.vendor_id ORDER BY pr.created_at, pr.id) AS n
+                                 FROM (SELECT v.id AS vendor_id, CASE WHEN s.status='active' THEN p.max_active_listings ELSE 0 END AS allowed
+                                       FROM vendors v JOIN vendor_subscriptions s ON s.vendor_id=v.id JOIN plans p ON p.id=s.plan_id
+                                       WHERE v.active_listings > CASE WHEN s.status='active' THEN p.max_active_listings ELSE 0 END) o
+                                 JOIN products pr ON pr.vendor_id=o.vendor_id AND pr.is_active=1)
+                               WHERE n > allowed LIMIT ?)
+                             RETURNING vendor_id""", (limit,)).fetchall()
+        if rows:
+            paused = Counter(r["vendor_id"] for r in rows)
+            chats = _vendor_chats(db, paused)
+            enqueue_messages(db, [(chats[vid], f"⏸ {n} listing(s) paused: your plan's active listing limit was exceeded.")
+                                  for vid, n in paused.items() if vid in chats])
+    if rows:
+        invalidate_catalog()
+    return len(rows)
+
+def queue_reminders(limit: int) -> int:
+    with get_db(immediate=True) as db:
+        rows = db.execute("""SELECT s.id, s.renews_at, u.telegram_id FROM vendor_subscriptions s
+                             JOIN vendors v ON v.id=s.vendor_id JOIN users u ON u.id=v.user_id
+                             WHERE s.status='active' AND s.renews_at BETWEEN ? AND ? AND s.reminded_for IS NOT s.renews_at
+                             LIMIT ?""", (_cutoff(), _ts(timedelta(days=settings.SUBSCRIPTION_REMIND_DAYS)), limit)).fetchall()
+        enqueue_messages(db, [(r["telegram_id"], f"⏰ Your subscription ends on {r['renews_at'][:10]}. Renew to keep your listings live.")
+                              for r in rows])
+        db.executemany("UPDATE vendor_subscriptions SET reminded_for=renews_at WHERE id=?", [(r["id"],) for r in rows])
+    return len(rows)
+
+class SubscriptionSweeper(Worker):
+    # one batch of each step per pass; a full batch means there may be more, so the loop goes again without sleeping
+    interval = settings.SUBSCRIPTION_SWEEP_INTERVAL
+
+    def __init__(self, batch: int):
+        super().__init__("subscriptions.sweeper")
+        self.batch = batch
+
+    def run_once(self) -> bool:
+        done = [expire_lapsed(self.batch), pause_over_limit(self.batch), queue_reminders(self.batch)]
+        if any(done):
+            log.info("subscriptions: %d expired, %d listing(s) paused, %d reminder(s) queued", *done)
+        return max(done) >= self.batch
+
+sweeper = SubscriptionSweeper(settings.SUBSCRIPTION_SWEEP_BATCH)
@@ -1,17 +1,71 @@
 import requests
+from requests.adapters import HTTPAdapter
+from .metrics import outbound
 from .settings import settings
 
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=settings.TELEGRAM_HTTP_POOL_SIZE))
+_session.mount("http://", HTTPAdapter(pool_connections=2, pool_maxsize=settings.TELEGRAM_HTTP_POOL_SIZE))
+
+class TelegramError(Exception):
+    def __init__(self, description: str, status_code: int | None = None, retry_after: int | None = None):
+        super().__init__(description)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def permanent(self) -> bool:
+        # bad request / bot blocked by the user: retrying will not help
+        return self.status_code in (400, 403)
+
 def tg_api(method: str) -> str:
-    return f"https://api.telegram.org/bot{settings.BOT_TOKEN}/{method}"
+    return f"{settings.TELEGRAM_API_BASE}/bot{settings.BOT_TOKEN}/{method}"
+
+def call(method: str, payload: dict, timeout: float | None = None):
+    with outbound("telegram", method) as m:
+        try:
+            r = _session.post(tg_api(method), json=payload, timeout=(settings.TELEGRAM_CONNECT_TIMEOUT, timeout or settings.TELEGRAM_READ_TIMEOUT))
+        except requests.RequestException as e:
+            raise TelegramError(str(e))
+        m["status"] = r.status_code
+    try:
+        body = r.json()
+    except ValueError:
+        body = {}
+    if r.status_code == 200 and body.get("ok"):
+        return body.get("result")
+    params = body.get("parameters") or {}
+    raise TelegramError(body.get("description") or f"HTTP {r.status_code}", r.status_code, params.get("retry_after"))
+
+def file_url(file_path: str) -> str:
+    return f"{settings.TELEGRAM_API_BASE}/file/bot{settings.BOT_TOKEN}/{file_path}"
+
+def download(file_path: str, out, max_bytes: int) -> int:
+    # streams a getFile path into the open binary file `out`; returns the byte count
+    n = 0
+    with outbound("telegram", "file") as m:
+        try:
+            with _session.get(file_url(file_path), stream=True, timeout=(settings.TELEGRAM_CONNECT_TIMEOUT, settings.TELEGRAM_READ_TIMEOUT)) as r:
+                m["status"] = r.status_code
+                if r.status_code != 200:
+                    raise TelegramError(f"HTTP {r.status_code}", r.status_code)
+                for chunk in r.iter_content(64 * 1024):
+                    n += len(chunk)
+                    if n > max_bytes:
+                        raise TelegramError(f"file larger than {max_bytes} bytes", 413)
+                    out.write(chunk)
+        except requests.RequestException as e:
+            raise TelegramError(str(e))
+    return n
 
 def send_message(chat_id: int, text: str, reply_markup: dict | None = None):
     payload = {"chat_id": chat_id, "text": text}
     if reply_markup:
         payload["reply_markup"] = reply_markup
-    requests.post(tg_api("sendMessage"), json=payload, timeout=30)
+    return call("sendMessage", payload)
 
 def send_document(chat_id: int, file_id: str, caption: str = ""):
     payload = {"chat_id": chat_id, "document": file_id}
     if caption:
         payload["caption"] = caption
-    requests.post(tg_api("sendDocument"), json=payload, timeout=60)
+    return call("sendDocument", payload, timeout=60)
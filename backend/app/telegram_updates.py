@@ -0,0 +1,179 @@
+import logging
+import threading
+from .cache import TTLCache
+from .db import get_db
+from .invalidation import publish, register
+from .outbox import enqueue_message
+from .settings import settings
+from .telegram_api import call, TelegramError
+from .workers import Worker
+
+log = logging.getLogger(__name__)
+
+_MISS = object()
+
+def webapp_button(url: str, text: str = "🛍️ Open Market"):
+    return {"inline_keyboard": [[{"text": text, "web_app": {"url": url}}]]}
+
+class UploadStates:
+    # pending /upload_* command per chat; memory first, written through to upload_states
+    def __init__(self):
+        self._kinds = TTLCache(maxsize=100_000, ttl=24 * 3600)
+        register("upload_states", self._kinds)
+
+    def get(self, db, telegram_id: int):
+        kind = self._kinds.get(telegram_id, _MISS)
+        if kind is _MISS:
+            row = db.execute("SELECT kind FROM upload_states WHERE telegram_id=?", (telegram_id,)).fetchone()
+            kind = row["kind"] if row else None
+            self._kinds.set(telegram_id, kind)
+        return kind
+
+    def set(self, db, telegram_id: int, kind: str):
+        db.execute("INSERT OR REPLACE INTO upload_states(telegram_id, kind) VALUES(?,?)", (telegram_id, kind))
+        publish("upload_states", telegram_id, db)
+        self._kinds.set(telegram_id, kind)
+
+    def clear(self, db, telegram_id: int):
+        db.execute("DELETE FROM upload_states WHERE telegram_id=?", (telegram_id,))
+        publish("upload_states", telegram_id, db)
+        self._kinds.set(telegram_id, None)
+
+    def invalidate(self):
+        self._kinds.invalidate()
+
+upload_states = UploadStates()
+
+# telegram_id -> vendor_id; only vendors are cached since a vendor never stops being one
+vendor_ids = TTLCache(maxsize=50_000, ttl=600)
+
+def _vendor_id(db, telegram_id: int):
+    vid = vendor_ids.get(telegram_id)
+    if vid is None:
+        db.execute("INSERT OR IGNORE INTO users(telegram_id, role) VALUES(?, 'customer')", (telegram_id,))
+        row = db.execute("SELECT v.id FROM users u JOIN vendors v ON v.user_id=u.id WHERE u.telegram_id=?", (telegram_id,)).fetchone()
+        if row:
+            vid = row["id"]
+            vendor_ids.set(telegram_id, vid)
+    return vid
+
+def _handle(db, update: dict, uploads: list):
+    msg = update.get("message") or update.get("edited_message")
+    if not msg:
+        return
+
+    chat_id = (msg.get("chat") or {}).get("id")
+    if chat_id is None:
+        return
+    text = (msg.get("text") or "").strip()
+    doc = msg.get("document")
+    web_url = settings.BASE_WEBAPP_URL.strip() or "https://example.com"
+
+    if text.startswith("/start"):
+        enqueue_message(db, chat_id,
+            f"Welcome to {settings.PLATFORM_NAME}!\n\n"
+            "✅ Digital products: Pay online and receive instantly.\n"
+            "🚚 Physical products: PAY ON DELIVERY ONLY.\n"
+            "⚠️ Never send money to vendors outside the platform for physical items.",
+            reply_markup=webapp_button(web_url)
+        )
+        return
+
+    if text.startswith("/upload_digital"):
+        enqueue_message(db, chat_id, "Send the digital file now (PDF/ZIP/etc).")
+        upload_states.set(db, chat_id, "digital")
+        return
+
+    if text.startswith("/upload_image"):
+        enqueue_message(db, chat_id, "Send the product image now (as a document).")
+        upload_states.set(db, chat_id, "image")
+        return
+
+    if doc and doc.get("file_id"):
+        vid = _vendor_id(db, chat_id)
+        if not vid:
+            enqueue_message(db, chat_id, "Register as a vendor in the Web App first (Open Market).")
+            return
+        kind = upload_states.get(db, chat_id)
+        if kind not in ("digital","image"):
+            enqueue_message(db, chat_id, "Use /upload_digital or /upload_image first, then send the file.")
+            return
+        uploads.append((vid, kind, doc.get("file_id"), doc.get("file_name"), doc.get("mime_type"), doc.get("file_size")))
+        upload_states.clear(db, chat_id)
+        enqueue_message(db, chat_id, f"✅ Saved {kind} upload. You can select it in your Vendor dashboard.")
+        return
+
+    if text.startswith("/help"):
+        enqueue_message(db, chat_id, "Commands:\n/start\n/upload_digital\n/upload_image")
+
+def process_updates(updates: list[dict]) -> int:
+    # one transaction per batch: dedupe by update_id, handle in order, bulk-insert the uploads. Each update runs in its own
+    # savepoint, so one that fails is logged, rolled back and still marked seen instead of taking the batch down with it
+    # (the poller would otherwise fetch the same batch forever).
+    handled = 0
+    try:
+        with get_db(immediate=True) as db:
+            uploads = []
+            for update in updates:
+                update_id = update.get("update_id")
+                if update_id is not None and db.execute("INSERT OR IGNORE INTO telegram_updates_seen(update_id) VALUES(?)", (update_id,)).rowcount == 0:
+                    continue
+                queued = len(uploads)
+                db.execute("SAVEPOINT telegram_update")
+                try:
+                    _handle(db, update, uploads)
+                except Exception:
+                    log.exception("telegram update %s failed; skipped", update_id)
+                    db.execute("ROLLBACK TO telegram_update")
+                    del uploads[queued:]
+                    upload_states.invalidate()
+                else:
+                    handled += 1
+                db.execute("RELEASE telegram_update")
+            db.executemany("INSERT INTO vendor_uploads(vendor_id, kind, telegram_file_id, file_name, mime_type, file_size) VALUES(?,?,?,?,?,?)", uploads)
+    except Exception:
+        upload_states.invalidate()
+        raise
+    _maybe_prune()
+    return handled
+
+_batches = 0
+_batches_lock = threading.Lock()
+
+def _maybe_prune(every: int = 1000, days: int = 3):
+    global _batches
+    with _batches_lock:
+        _batches += 1
+        due = _batches % every == 0
+    if due:
+        with get_db(immediate=True) as db:
+            db.execute("DELETE FROM telegram_updates_seen WHERE received_at < datetime('now', ?)", (f"-{days} days",))
+
+class TelegramPoller(Worker):
+    # getUpdates long-poll runner, used instead of the webhook when TELEGRAM_MODE=polling
+    interval = 5.0
+    poll_timeout = 25
+
+    def __init__(self):
+        super().__init__("telegram-poller")
+        self.offset = None
+        self._webhook_cleared = False
+
+    def run_once(self) -> bool:
+        if not self._webhook_cleared:
+            call("deleteWebhook", {"drop_pending_updates": False})
+            self._webhook_cleared = True
+        payload = {"timeout": self.poll_timeout, "allowed_updates": ["message", "edited_message"], "limit": 100}
+        if self.offset is not None:
+            payload["offset"] = self.offset
+        try:
+            updates = call("getUpdates", payload, timeout=self.poll_timeout + 10) or []
+        except TelegramError as e:
+            log.warning("getUpdates failed: %s", e)
+            return False
+        if updates:
+            process_updates(updates)
+            self.offset = max(u["update_id"] for u in updates) + 1
+        return True
+
+poller = TelegramPoller()
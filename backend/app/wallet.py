@@ -0,0 +1,68 @@
+from fastapi import HTTPException
+
+# vendor_balances mirrors wallet_ledger; reserved_pesewas holds withdrawals that are requested but not yet paid.
+# Callers should hold the write lock (get_db(immediate=True)) so the ledger row and the balance change commit together.
+
+def post_ledger_entry(db, vendor_id: int, type: str, reason: str, amount_pesewas: int, order_id: int | None = None, withdrawal_id: int | None = None):
+    db.execute("INSERT INTO wallet_ledger(vendor_id,type,reason,amount_pesewas,order_id,withdrawal_id) VALUES(?,?,?,?,?,?)",
+               (vendor_id, type, reason, amount_pesewas, order_id, withdrawal_id))
+    credit, debit = (amount_pesewas, 0) if type == "credit" else (0, amount_pesewas)
+    db.execute("""INSERT INTO vendor_balances(vendor_id, credited_pesewas, debited_pesewas) VALUES(?,?,?)
+                  ON CONFLICT(vendor_id) DO UPDATE SET
+                    credited_pesewas=credited_pesewas+excluded.credited_pesewas,
+                    debited_pesewas=debited_pesewas+excluded.debited_pesewas,
+                    updated_at=datetime('now')""", (vendor_id, credit, debit))
+
+def post_ledger_entries(db, entries: list[tuple[int, str, str, int, int | None]]):
+    # (vendor_id, type, reason, amount_pesewas, order_id) rows; one ledger executemany and one balance upsert per vendor
+    db.executemany("INSERT INTO wallet_ledger(vendor_id,type,reason,amount_pesewas,order_id) VALUES(?,?,?,?,?)", entries)
+    totals = {}
+    for vendor_id, type, _, amount, _ in entries:
+        t = totals.setdefault(vendor_id, [0, 0])
+        t[0 if type == "credit" else 1] += amount
+    db.executemany("""INSERT INTO vendor_balances(vendor_id, credited_pesewas, debited_pesewas) VALUES(?,?,?)
+                      ON CONFLICT(vendor_id) DO UPDATE SET
+                        credited_pesewas=credited_pesewas+excluded.credited_pesewas,
+                        debited_pesewas=debited_pesewas+excluded.debited_pesewas,
+                        updated_at=datetime('now')""", [(v, c, d) for v, (c, d) in totals.items()])
+
+def get_balance(db, vendor_id: int):
+    b = db.execute("SELECT credited_pesewas, debited_pesewas, reserved_pesewas FROM vendor_balances WHERE vendor_id=?", (vendor_id,)).fetchone()
+    if not b:
+        return {"available_pesewas": 0, "pending_withdrawal_pesewas": 0}
+    return {"available_pesewas": int(b["credited_pesewas"]) - int(b["debited_pesewas"]) - int(b["reserved_pesewas"]), "pending_withdrawal_pesewas": int(b["reserved_pesewas"])}
+
+def reserve_withdrawal(db, vendor_id: int, amount_pesewas: int):
+    if amount_pesewas <= 0:
+        raise HTTPException(status_code=400, detail="Invalid amount")
+    cur = db.execute("""UPDATE vendor_balances SET reserved_pesewas=reserved_pesewas+?, updated_at=datetime('now')
+                        WHERE vendor_id=? AND credited_pesewas-debited_pesewas-reserved_pesewas >= ?""", (amount_pesewas, vendor_id, amount_pesewas))
+    if cur.rowcount != 1:
+        raise HTTPException(status_code=400, detail="Invalid amount")
+
+def settle_withdrawal(db, vendor_id: int, withdrawal_id: int, amount_pesewas: int):
+    post_ledger_entry(db, vendor_id, "debit", "withdrawal", amount_pesewas, withdrawal_id=withdrawal_id)
+    db.execute("UPDATE vendor_balances SET reserved_pesewas=MAX(reserved_pesewas-?, 0) WHERE vendor_id=?", (amount_pesewas, vendor_id))
+
+def reconcile(db, fix: bool = False):
+    rows = db.execute("""WITH expected AS (
+                           SELECT v.id AS vendor_id, COALESCE(l.credited, 0) AS credited, COALESCE(l.debited, 0) AS debited, COALESCE(w.reserved, 0) AS reserved
+                           FROM vendors v
+                           LEFT JOIN (SELECT vendor_id,
+                                             SUM(CASE WHEN type='credit' THEN amount_pesewas ELSE 0 END) AS credited,
+                                             SUM(CASE WHEN type='debit' THEN amount_pesewas ELSE 0 END) AS debited
+                                      FROM wallet_ledger GROUP BY vendor_id) l ON l.vendor_id=v.id
+                           LEFT JOIN (SELECT vendor_id, SUM(amount_pesewas) AS reserved
+                                      FROM withdrawal_requests WHERE status IN ('pending','approved') GROUP BY vendor_id) w ON w.vendor_id=v.id)
+                         SELECT e.vendor_id, e.credited, e.debited, e.reserved,
+                                b.credited_pesewas, b.debited_pesewas, b.reserved_pesewas
+                         FROM expected e LEFT JOIN vendor_balances b ON b.vendor_id=e.vendor_id
+                         WHERE (b.vendor_id IS NULL AND (e.credited OR e.debited OR e.reserved))
+                            OR b.credited_pesewas != e.credited OR b.debited_pesewas != e.debited OR b.reserved_pesewas != e.reserved""").fetchall()
+    mismatches = [dict(r) for r in rows]
+    if fix and mismatches:
+        db.executemany("""INSERT INTO vendor_balances(vendor_id, credited_pesewas, debited_pesewas, reserved_pesewas) VALUES(?,?,?,?)
+                          ON CONFLICT(vendor_id) DO UPDATE SET credited_pesewas=excluded.credited_pesewas, debited_pesewas=excluded.debited_pesewas,
+                            reserved_pesewas=excluded.reserved_pesewas, updated_at=datetime('now')""",
+                       [(m["vendor_id"], m["credited"], m["debited"], m["reserved"]) for m in mismatches])
+    return mismatches
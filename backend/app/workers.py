@@ -0,0 +1,83 @@
+import logging
+import threading
+from .settings import settings
+
+try:
+    import fcntl
+except ImportError:  # no flock (Windows): singletons run in every process
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+class Worker(threading.Thread):
+    # run_once() returns True when it did work, so the loop goes again without sleeping
+    interval = 1.0
+
+    def __init__(self, name: str):
+        super().__init__(name=name, daemon=True)
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+
+    def run_once(self) -> bool:
+        raise NotImplementedError
+
+    def run(self):
+        while not self._stopping.is_set():
+            try:
+                busy = self.run_once()
+            except Exception:
+                log.exception("%s failed", self.name)
+                busy = False
+            if not busy:
+                self._wakeup.wait(self.interval)
+                self._wakeup.clear()
+
+    def wake(self):
+        self._wakeup.set()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+_running: list[Worker] = []
+
+def start(worker: Worker):
+    if not worker.is_alive():
+        worker.start()
+        _running.append(worker)
+
+class _Standby(Worker):
+    # leader election for workers that must run once per database (WEB_CONCURRENCY > 1): whichever process holds the
+    # flock on <DATABASE_PATH>.<worker>.lock runs the worker; the OS drops the lock when that process dies and a
+    # standby takes over within `interval`
+    interval = 5.0
+
+    def __init__(self, worker: Worker):
+        super().__init__(f"{worker.name}-standby")
+        self.worker = worker
+        self.lockfile = None
+
+    def run_once(self) -> bool:
+        f = open(f"{settings.DATABASE_PATH}.{self.worker.name}.lock", "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self.lockfile = f  # held for the life of the process
+        log.info("%s: this process is the leader", self.worker.name)
+        start(self.worker)
+        self.stop()
+        return False
+
+def start_singleton(worker: Worker):
+    if settings.WEB_CONCURRENCY <= 1 or fcntl is None:
+        return start(worker)
+    start(_Standby(worker))
+
+def stop_all(timeout: float = 5.0):
+    for w in list(_running):
+        w.stop()
+    for w in _running:
+        w.join(timeout)
+    _running.clear()
@@ -0,0 +1,89 @@
+"""Concurrent physical checkouts through the shared checkout engine: every buyer refills a cart and checks out
+in a loop, retrying each checkout once with the same Idempotency-Key; fails on lock errors or duplicate orders.
+
+    python bench/checkout_concurrency.py --buyers 64 --checkouts 20 --items 8
+"""
+import argparse, os, random, sys, tempfile, threading, time, uuid
+from pathlib import Path
+
+def pct(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))] if samples else 0.0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--buyers", type=int, default=64)
+    parser.add_argument("--checkouts", type=int, default=20, help="checkouts per buyer")
+    parser.add_argument("--items", type=int, default=8, help="cart lines per checkout")
+    parser.add_argument("--products", type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_PATH"] = str(Path(tempfile.mkdtemp()) / "checkout_bench.sqlite3")
+    os.environ.setdefault("DB_POOL_SIZE", str(args.buyers + 4))
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from app.init_db import init_db
+    from app.db import get_db
+    from app.routes.checkout import physical, PhysicalIn, DeliveryIn
+
+    init_db()
+    buyers = range(100, 100 + args.buyers)
+    with get_db(immediate=True) as db:
+        db.executemany("INSERT INTO users(id, telegram_id, role) VALUES(?,?, 'vendor')", [(i, 1000 + i) for i in range(1, 11)])
+        db.executemany("INSERT INTO vendors(id, user_id, store_name, sell_type) VALUES(?,?,?, 'physical')", [(i, i, f"v{i}") for i in range(1, 11)])
+        db.executemany("INSERT INTO products(vendor_id, type, name, short_description, long_description, price_pesewas) VALUES(?, 'physical', ?, 's', 'l', ?)",
+                       [(1 + i % 10, f"p{i}", 100 + i) for i in range(args.products)])
+        db.executemany("INSERT INTO users(id, telegram_id) VALUES(?,?)", [(b, 1000 + b) for b in buyers])
+        db.executemany("INSERT INTO carts(user_id) VALUES(?)", [(b,) for b in buyers])
+
+    delivery = DeliveryIn(full_name="Bench", phone="0200000000", region="GA", city="Accra", address="1 Bench St")
+    latencies, errors, orders = [], [], set()
+    lock = threading.Lock()
+    start = threading.Barrier(args.buyers)
+
+    def buyer(uid):
+        rnd = random.Random(uid)
+        start.wait()
+        for _ in range(args.checkouts):
+            with get_db() as db:
+                cart_id = db.execute("SELECT id FROM carts WHERE user_id=?", (uid,)).fetchone()["id"]
+                db.executemany("INSERT INTO cart_items(cart_id, product_id, qty) VALUES(?,?,?) ON CONFLICT(cart_id, product_id) DO UPDATE SET qty=qty+excluded.qty",
+                               [(cart_id, rnd.randint(1, args.products), rnd.randint(1, 3)) for _ in range(args.items)])
+                ids = [r["id"] for r in db.execute("SELECT id FROM cart_items WHERE cart_id=?", (cart_id,)).fetchall()]
+            key = uuid.uuid4().hex
+            payload = PhysicalIn(cart_item_ids=ids, delivery=delivery)
+            user = {"user_id": uid, "role": "customer"}
+            for attempt in range(2):
+                t0 = time.perf_counter()
+                try:
+                    oid = physical(payload, user=user, idempotency_key=key)["order_id"]
+                except Exception as e:
+                    with lock: errors.append(repr(e))
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - t0)
+                    if attempt == 0:
+                        orders.add(oid)
+                    elif oid not in orders:
+                        errors.append(f"retry with key {key} created order {oid}")
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=buyer, args=(b,)) for b in buyers]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - t0
+
+    with get_db() as db:
+        created = db.execute("SELECT COUNT(*) AS c FROM orders").fetchone()["c"]
+        lines = db.execute("SELECT COUNT(*) AS c FROM order_items").fetchone()["c"]
+        leftover = db.execute("SELECT COUNT(*) AS c FROM cart_items").fetchone()["c"]
+
+    latencies.sort()
+    expected = args.buyers * args.checkouts
+    print(f"{args.buyers} buyers, {len(latencies)} checkout calls ({created} orders, {lines} order lines) in {elapsed:.2f}s")
+    print(f"throughput {created / elapsed:.0f} orders/s; latency ms p50 {pct(latencies, 50)*1000:.1f} p95 {pct(latencies, 95)*1000:.1f} p99 {pct(latencies, 99)*1000:.1f}")
+    print(f"errors: {len(errors)}, duplicate orders: {created - len(orders)}, cart lines left: {leftover}")
+    if errors:
+        print("first error:", errors[0])
+    return 1 if errors or created != expected or leftover else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
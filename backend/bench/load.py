@@ -0,0 +1,336 @@
+"""End-to-end load run against the real app: seeds (or copies) a database, starts uvicorn in a subprocess with
+stub Paystack and Telegram servers, drives scripted scenarios over HTTP and reports throughput and p50/p95/p99
+per route. Results are written as JSON so runs can be compared across commits.
+
+    python bench/load.py --scale 0.02 --concurrency 32 --duration 15 --out results.json
+    python bench/load.py --db /tmp/full.sqlite3 --scenarios browse,checkout --compare results.json
+"""
+import argparse, hashlib, hmac, json, os, platform, random, shutil, socket, sqlite3, subprocess, sys, tempfile, threading, time, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+JWT_SECRET = "bench-jwt-secret"
+PAYSTACK_SECRET = "sk_bench"
+BOT_TOKEN = "123:bench"
+
+os.environ["JWT_SECRET"] = JWT_SECRET
+from app.auth import create_jwt
+
+class StubHandler(BaseHTTPRequestHandler):
+    # Paystack /transaction/initialize and any Telegram Bot API method, with an optional fixed delay
+    delay = 0.0
+    calls = {"paystack": 0, "telegram": 0}
+
+    def log_message(self, *a):
+        pass
+
+    def _reply(self, body: dict):
+        out = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.delay:
+            time.sleep(self.delay)
+        if self.path.endswith("/transaction/initialize"):
+            StubHandler.calls["paystack"] += 1
+            ref = body.get("reference")
+            return self._reply({"status": True, "data": {"authorization_url": f"https://checkout.stub/{ref}", "reference": ref}})
+        StubHandler.calls["telegram"] += 1
+        self._reply({"ok": True, "result": {"message_id": 1}})
+
+    do_GET = do_POST
+
+def start_stub(delay: float):
+    StubHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def token(user_id: int, role: str, vendor_id=None) -> str:
+    return create_jwt(user_id, role, vendor_id)
+
+def signed_charge(reference: str, amount: int, duplicate_id: int | None = None):
+    event = {"event": "charge.success", "data": {"id": duplicate_id or random.getrandbits(40), "reference": reference, "amount": amount, "metadata": {}}}
+    raw = json.dumps(event).encode()
+    return raw, {"Content-Type": "application/json", "x-paystack-signature": hmac.new(PAYSTACK_SECRET.encode(), raw, hashlib.sha512).hexdigest()}
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.client_errors: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def call(self, session, label: str, method: str, url: str, **kw):
+        t0 = time.perf_counter()
+        try:
+            r = session.request(method, url, timeout=30, **kw)
+        except requests.RequestException:
+            with self._lock:
+                self.errors[label] = self.errors.get(label, 0) + 1
+            return None
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self.samples.setdefault(label, []).append(elapsed)
+            if r.status_code >= 500:
+                self.errors[label] = self.errors.get(label, 0) + 1
+            elif r.status_code >= 400:
+                self.client_errors[label] = self.client_errors.get(label, 0) + 1
+        return r
+
+def pct(samples, p):
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))] if samples else 0.0
+
+class Context:
+    def __init__(self, base: str, db_path: str):
+        self.base = base
+        db = sqlite3.connect(db_path)
+        ids = lambda sql: [r[0] for r in db.execute(sql)]
+        self.physical = ids("SELECT id FROM products WHERE is_active=1 AND type='physical' LIMIT 50000")
+        self.digital = ids("SELECT id FROM products WHERE is_active=1 AND type='digital' AND id IN (SELECT product_id FROM product_digital_assets) LIMIT 50000")
+        self.products = self.physical + self.digital
+        self.categories = ids("SELECT slug FROM categories")
+        self.vendors = ids("SELECT vendor_id FROM vendor_subscriptions WHERE status='active' LIMIT 5000")
+        self.buyers = ids("SELECT id FROM users WHERE role='customer' LIMIT 20000")
+        self.pending = db.execute("SELECT reference, amount_pesewas FROM payments WHERE status='initiated' AND purpose='order' LIMIT 50000").fetchall()
+        db.close()
+        from seed import WORDS
+        self.words = WORDS
+        self.admin = {"Authorization": f"Bearer {token(1, 'admin')}"}
+        self._pending_lock = threading.Lock()
+
+    def buyer(self, rnd):
+        return {"Authorization": f"Bearer {token(rnd.choice(self.buyers), 'customer')}"}
+
+    def next_pending(self):
+        with self._pending_lock:
+            return self.pending.pop() if self.pending else None
+
+def browse(s, ctx, rnd, rec):
+    b = ctx.base
+    rec.call(s, "GET /api/products", "GET", f"{b}/api/products", params={"page_size": 20})
+    rec.call(s, "GET /api/products?category", "GET", f"{b}/api/products", params={"category": rnd.choice(ctx.categories), "page_size": 20})
+    q = rnd.choice(ctx.words)
+    r = rec.call(s, "GET /api/products?q", "GET", f"{b}/api/products", params={"q": q, "page_size": 20})
+    if r is not None and r.ok and r.json().get("next_cursor"):
+        rec.call(s, "GET /api/products?q&cursor", "GET", f"{b}/api/products", params={"q": q, "cursor": r.json()["next_cursor"], "page_size": 20})
+    rec.call(s, "GET /api/products/{id}", "GET", f"{b}/api/products/{rnd.choice(ctx.products)}")
+    rec.call(s, "GET /api/categories", "GET", f"{b}/api/categories")
+    rec.call(s, "GET /api/plans", "GET", f"{b}/api/plans")
+
+def cart(s, ctx, rnd, rec):
+    b, h = ctx.base, ctx.buyer(rnd)
+    for _ in range(rnd.randint(1, 3)):
+        rec.call(s, "POST /api/cart/items", "POST", f"{b}/api/cart/items", json={"product_id": rnd.choice(ctx.physical), "qty": rnd.randint(1, 2)}, headers=h)
+    r = rec.call(s, "GET /api/cart", "GET", f"{b}/api/cart", headers=h)
+    if r is not None and r.ok and r.json()["items"]:
+        rec.call(s, "DELETE /api/cart/items/{id}", "DELETE", f"{b}/api/cart/items/{r.json()['items'][0]['id']}", headers=h)
+    rec.call(s, "POST /api/cart/batch", "POST", f"{b}/api/cart/batch", headers=h,
+             json={"ops": [{"op": "add", "product_id": rnd.choice(ctx.physical)}, {"op": "set", "product_id": rnd.choice(ctx.physical), "qty": rnd.randint(1, 3)}]})
+    rec.call(s, "POST /api/wishlist", "POST", f"{b}/api/wishlist", json={"product_id": rnd.choice(ctx.physical)}, headers=h)
+    rec.call(s, "GET /api/wishlist", "GET", f"{b}/api/wishlist", headers=h)
+
+def checkout(s, ctx, rnd, rec):
+    b, h = ctx.base, ctx.buyer(rnd)
+    digital = rnd.random() < 0.5
+    pool = ctx.digital if digital else ctx.physical
+    for _ in range(rnd.randint(1, 4)):
+        rec.call(s, "POST /api/cart/items", "POST", f"{b}/api/cart/items", json={"product_id": rnd.choice(pool), "qty": 1}, headers=h)
+    r = rec.call(s, "GET /api/cart", "GET", f"{b}/api/cart", headers=h)
+    if r is None or not r.ok:
+        return
+    ids = [i["id"] for i in r.json()["items"] if i["type"] == ("digital" if digital else "physical")]
+    if not ids:
+        return
+    h = {**h, "Idempotency-Key": uuid.uuid4().hex}
+    if not digital:
+        rec.call(s, "POST /api/checkout/physical", "POST", f"{b}/api/checkout/physical", headers=h,
+                 json={"cart_item_ids": ids, "delivery": {"full_name": "Bench", "phone": "0200000000", "region": "GA", "city": "Accra", "address": "1 Bench St"}})
+        rec.call(s, "GET /api/orders", "GET", f"{b}/api/orders", headers=h)
+        return
+    r = rec.call(s, "POST /api/checkout/digital/init", "POST", f"{b}/api/checkout/digital/init", json={"cart_item_ids": ids}, headers=h)
+    if r is not None and r.ok:
+        raw, sig = signed_charge(r.json()["reference"], 0)
+        rec.call(s, "POST /api/paystack/webhook", "POST", f"{b}/api/paystack/webhook", data=raw, headers=sig)
+
+def webhook_burst(s, ctx, rnd, rec):
+    # one in five deliveries is a Paystack retry of the same event
+    pending = ctx.next_pending()
+    if not pending:
+        return
+    event_id = rnd.getrandbits(40)
+    for _ in range(2 if rnd.random() < 0.2 else 1):
+        raw, sig = signed_charge(pending[0], pending[1], event_id)
+        rec.call(s, "POST /api/paystack/webhook", "POST", f"{ctx.base}/api/paystack/webhook", data=raw, headers=sig)
+
+def vendor_dashboard(s, ctx, rnd, rec):
+    vid = rnd.choice(ctx.vendors)
+    b, h = ctx.base, {"Authorization": f"Bearer {token(vid, 'vendor', vid)}"}
+    rec.call(s, "GET /api/me", "GET", f"{b}/api/me", headers=h)
+    rec.call(s, "GET /api/vendor/products", "GET", f"{b}/api/vendor/products", headers=h)
+    rec.call(s, "GET /api/vendor/wallet", "GET", f"{b}/api/vendor/wallet", headers=h)
+    rec.call(s, "GET /api/vendor/plan/usage", "GET", f"{b}/api/vendor/plan/usage", headers=h)
+    rec.call(s, "GET /api/vendor/uploads", "GET", f"{b}/api/vendor/uploads", headers=h)
+
+def admin(s, ctx, rnd, rec):
+    rec.call(s, "GET /api/admin/metrics", "GET", f"{ctx.base}/api/admin/metrics", headers=ctx.admin)
+    rec.call(s, "GET /api/admin/withdrawals", "GET", f"{ctx.base}/api/admin/withdrawals", headers=ctx.admin)
+
+SCENARIOS = {"browse": browse, "cart": cart, "checkout": checkout, "webhooks": webhook_burst, "vendor": vendor_dashboard, "admin": admin}
+
+def run_scenario(fn, ctx, concurrency: int, duration: float):
+    rec = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def client(seed):
+        rnd = random.Random(seed)
+        with requests.Session() as s:
+            while time.perf_counter() < deadline:
+                fn(s, ctx, rnd, rec)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    return rec, time.perf_counter() - t0
+
+def wait_for_inbox(db_path: str, timeout: float = 120.0) -> float:
+    t0 = time.perf_counter()
+    db = sqlite3.connect(db_path)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            if not db.execute("SELECT COUNT(*) FROM paystack_events WHERE status='pending'").fetchone()[0]:
+                break
+            time.sleep(0.1)
+    finally:
+        db.close()
+    return time.perf_counter() - t0
+
+def summarize(rec: Recorder, elapsed: float) -> dict:
+    out = {}
+    for label, samples in sorted(rec.samples.items()):
+        samples.sort()
+        out[label] = {"count": len(samples), "rps": round(len(samples) / elapsed, 1),
+                      "p50_ms": round(pct(samples, 50) * 1000, 2), "p95_ms": round(pct(samples, 95) * 1000, 2),
+                      "p99_ms": round(pct(samples, 99) * 1000, 2), "max_ms": round(samples[-1] * 1000, 2),
+                      "errors": rec.errors.get(label, 0), "client_errors": rec.client_errors.get(label, 0)}
+    return out
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: dict, baseline_path: str):
+    baseline = json.loads(Path(baseline_path).read_text())
+    print(f"\np99 vs {baseline_path} ({baseline['meta'].get('commit')}):")
+    for scenario, routes in current["scenarios"].items():
+        for label, stats in routes["routes"].items():
+            old = baseline["scenarios"].get(scenario, {}).get("routes", {}).get(label)
+            if old:
+                delta = (stats["p99_ms"] - old["p99_ms"]) / old["p99_ms"] * 100 if old["p99_ms"] else 0.0
+                print(f"  {scenario:<9} {label:<34} {old['p99_ms']:>9.1f} -> {stats['p99_ms']:>9.1f} ms  ({delta:+.0f}%)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", help="seeded database to copy (see bench/seed.py); seeded fresh at --scale when omitted")
+    parser.add_argument("--scale", type=float, default=0.02)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per scenario")
+    parser.add_argument("--stub-delay", type=float, default=0.05, help="seconds each stub Paystack/Telegram call takes")
+    parser.add_argument("--app-args", default="", help="extra uvicorn arguments, e.g. '--workers 4'")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON from an earlier run to diff p99 against")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-load-"))
+    db_path = workdir / "load.sqlite3"
+    if args.db:
+        src, dst = sqlite3.connect(args.db), sqlite3.connect(db_path)
+        src.backup(dst)
+        src.close(); dst.close()
+    else:
+        from seed import FULL_SCALE, seed
+        from app.init_db import migrate
+        db = sqlite3.connect(db_path)
+        db.execute("PRAGMA journal_mode = WAL")
+        migrate(db)
+        seed(db, {k: max(1, int(v * args.scale)) for k, v in FULL_SCALE.items()})
+        db.close()
+
+    stub = start_stub(args.stub_delay)
+    port = free_port()
+    env = {**os.environ, "DATABASE_PATH": str(db_path), "JWT_SECRET": JWT_SECRET, "BOT_TOKEN": BOT_TOKEN,
+           "PAYSTACK_SECRET_KEY": PAYSTACK_SECRET, "PAYSTACK_BASE_URL": stub, "TELEGRAM_API_BASE": stub,
+           "TELEGRAM_MODE": "webhook", "RUN_WORKERS": "1", "ADMIN_TELEGRAM_IDS": ""}
+    app = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+                            "--log-level", "warning", "--no-access-log", *args.app_args.split()], cwd=BACKEND, env=env)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(300):
+            try:
+                if requests.get(f"{base}/health", timeout=1).ok:
+                    break
+            except requests.RequestException:
+                time.sleep(0.1)
+        else:
+            sys.exit("app did not start")
+
+        ctx = Context(base, str(db_path))
+        results = {"meta": {"commit": git_commit(), "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                            "concurrency": args.concurrency, "duration": args.duration, "stub_delay": args.stub_delay,
+                            "app_args": args.app_args, "db": args.db or f"scale={args.scale}", "python": platform.python_version(),
+                            "sqlite": sqlite3.sqlite_version, "rows": {}}, "scenarios": {}}
+        db = sqlite3.connect(db_path)
+        for t in ("vendors", "products", "orders", "order_items", "wallet_ledger"):
+            results["meta"]["rows"][t] = db.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+        db.close()
+
+        for name in args.scenarios.split(","):
+            rec, elapsed = run_scenario(SCENARIOS[name], ctx, args.concurrency, args.duration)
+            routes = summarize(rec, elapsed)
+            scenario = {"seconds": round(elapsed, 2), "requests": sum(r["count"] for r in routes.values()),
+                        "rps": round(sum(r["count"] for r in routes.values()) / elapsed, 1), "routes": routes}
+            if name in ("webhooks", "checkout"):
+                scenario["inbox_drain_seconds"] = round(wait_for_inbox(str(db_path)), 2)
+            results["scenarios"][name] = scenario
+            print(f"\n{name}: {scenario['requests']} requests in {elapsed:.1f}s ({scenario['rps']} req/s)"
+                  + (f", inbox drained {scenario['inbox_drain_seconds']}s after" if "inbox_drain_seconds" in scenario else ""))
+            print(f"  {'route':<34} {'count':>7} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'5xx':>5} {'4xx':>5}")
+            for label, r in routes.items():
+                print(f"  {label:<34} {r['count']:>7} {r['rps']:>7.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['errors']:>5} {r['client_errors']:>5}")
+        results["meta"]["stub_calls"] = dict(StubHandler.calls)
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2))
+        print(f"\nwrote {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+    shutil.rmtree(workdir, ignore_errors=True)
+    failed = sum(r["errors"] for s in results["scenarios"].values() for r in s["routes"].values())
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Query budgets: drives every route once against a throwaway database, with Paystack and Telegram replaced by a local
+stub, and fails on a route over its budget in app/query_budget.py, an undeclared route, a statement repeated N+1 style,
+or a response with an unexpected status. Needs httpx (fastapi.testclient): pip install -r requirements-dev.txt
+
+    python bench/query_budgets.py
+    python bench/query_budgets.py -v    # every request's statements
+"""
+import argparse, hashlib, hmac, json, os, sys, tempfile, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlencode
+
+BOT_TOKEN, PAYSTACK_SECRET_KEY = "1:budget", "sk_budget"
+
+class Stub(BaseHTTPRequestHandler):
+    # Paystack transaction/initialize plus Telegram getFile and file downloads
+    def log_message(self, *a):
+        pass
+
+    def _send(self, out: bytes):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_GET(self):
+        self._send(b"\xff\xd8budget-image" * 64)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if self.path.endswith("/getFile"):
+            self._send(json.dumps({"ok": True, "result": {"file_id": body.get("file_id"), "file_path": "photos/file_1.jpg"}}).encode())
+        else:
+            self._send(json.dumps({"status": True, "data": {"authorization_url": "https://checkout.stub/" + str(body.get("reference"))}}).encode())
+
+def init_data(telegram_id: int) -> str:
+    pairs = {"auth_date": str(int(time.time())), "user": json.dumps({"id": telegram_id, "first_name": "Budget"})}
+    check = "\n".join(f"{k}={pairs[k]}" for k in sorted(pairs))
+    secret = hashlib.sha256(BOT_TOKEN.encode()).digest()
+    return urlencode({**pairs, "hash": hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()})
+
+def scenario(c):
+    from app.db import get_db
+    from app.paystack_events import apply_event
+    from app.query_budget import recording, report
+    from app.wallet import post_ledger_entry
+
+    def call(method, path, status=200, token=None, **kw):
+        if token:
+            kw["headers"] = {"Authorization": f"Bearer {token}", **kw.get("headers", {})}
+        r = c.request(method, path, **kw)
+        if r.status_code != status:
+            raise AssertionError(f"{method} {path}: {r.status_code} (expected {status}): {r.text[:200]}")
+        return r
+
+    get, post = (lambda path, status=200, **kw: call("GET", path, status, **kw)), (lambda path, status=200, **kw: call("POST", path, status, **kw))
+    login = lambda tid: post("/api/auth/telegram", json={"initData": init_data(tid)}).json()["token"]
+    A, V, B = login(900), login(901), login(902)
+    V = post("/api/vendor/register", token=V, json={"store_name": "Budget Store", "sell_type": "both"}).json()["token"]
+    with get_db(immediate=True) as db:
+        vid = db.execute("SELECT id FROM vendors").fetchone()["id"]
+        db.execute("INSERT INTO vendor_subscriptions(vendor_id, plan_id, status, renews_at) VALUES(?, 3, 'active', '2099-01-01T00:00:00Z')", (vid,))
+        db.executemany("INSERT INTO vendor_uploads(vendor_id, kind, telegram_file_id) VALUES(?, 'digital', ?)", [(vid, f"BQ{i}") for i in range(4)])
+        post_ledger_entry(db, vid, "credit", "sale", 50_000)
+    product = lambda **kw: {"type": "physical", "name": "Budget lamp", "short_description": "s", "long_description": "l",
+                            "price_pesewas": 1000, "category_slug": "electronics", "image_file_ids": ["a", "b", "c"], **kw}
+    physical = [post("/api/vendor/products", token=V, json=product()).json()["id"] for _ in range(3)]
+    digital = [post("/api/vendor/products", token=V, json=product(type="digital", name="Budget guide", category_slug="ebooks", digital_file_upload_id=1)).json()["id"]]
+    body = "\n".join(json.dumps(product(type="digital", name=f"Guide {i}", digital_file_upload_id=i)) for i in (2, 3, 4))
+    post("/api/vendor/products/import", token=V, content=body)
+    digital += [r["id"] for r in get("/api/vendor/products", token=V).json() if r["type"] == "digital" and r["id"] not in digital]
+
+    get("/api/plans"); get("/api/me", token=V); get("/api/categories")
+    call("PUT", "/api/vendor/payout-settings", token=V, json={"method": "momo", "momo": {"number": "0240000000", "network": "MTN"}})
+    get("/api/vendor/uploads", token=V); get("/api/vendor/plan/usage", token=V); get("/api/vendor/wallet", token=V)
+    post("/api/vendor/subscribe/init", token=V, json={"plan_id": 4})
+    get("/api/products"); get("/api/products", params={"q": "budget"}); get(f"/api/products/{physical[0]}")
+    get("/api/media/a", params={"size": "thumb"}); get("/api/media/a", 206, headers={"Range": "bytes=0-99"})
+    for pid in physical + digital:
+        post("/api/cart/items", token=B, json={"product_id": pid, "qty": 2})
+        post("/api/wishlist", token=B, json={"product_id": pid})
+    get("/api/wishlist", token=B); call("DELETE", f"/api/wishlist/{physical[0]}", token=B)
+    post("/api/cart/batch", token=B, json={"ops": [{"op": "add", "product_id": physical[1]}, {"op": "set", "product_id": physical[2], "qty": 3},
+                                                   {"op": "remove", "product_id": digital[-1]}, {"op": "add", "product_id": 10**9}]})
+    items = get("/api/cart", token=B).json()["items"]
+    call("DELETE", f"/api/cart/items/{items[0]['id']}", token=B)
+    delivery = {"full_name": "B", "phone": "0", "region": "GA", "city": "Accra", "address": "x"}
+    order = post("/api/checkout/physical", token=B, json={"cart_item_ids": [i["id"] for i in items[1:] if i["type"] == "physical"], "delivery": delivery}).json()
+    ref = post("/api/checkout/digital/init", token=B, json={"cart_item_ids": [i["id"] for i in items if i["type"] == "digital"]}).json()["reference"]
+    get("/api/orders", token=B); get(f"/api/orders/{order['order_id']}", token=B)
+    get("/api/vendor/orders", token=V)
+    post("/api/vendor/orders/status", token=V, json={"order_ids": [order["order_id"]], "status": "shipped"})
+
+    event = {"event": "charge.success", "data": {"id": 1, "reference": ref}}
+    raw = json.dumps(event).encode()
+    post("/api/paystack/webhook", content=raw, headers={"x-paystack-signature": hmac.new(PAYSTACK_SECRET_KEY.encode(), raw, hashlib.sha512).hexdigest()})
+    with recording() as rec:
+        with get_db(immediate=True) as db:
+            apply_event(db, event)
+    report("worker paystack charge.success (order)", rec)
+
+    wid = post("/api/vendor/withdrawals", token=V, json={"amount_pesewas": 1000}).json()["withdrawal_id"]
+    get("/api/admin/metrics", token=A); get("/api/admin/withdrawals", token=A)
+    get("/api/admin/analytics", token=A); get("/api/admin/analytics/vendors", token=A)
+    get("/api/admin/analytics/categories", token=A); get("/api/vendor/analytics", token=V)
+    call("PATCH", f"/api/admin/withdrawals/{wid}/approve", token=A)
+    call("PATCH", f"/api/admin/withdrawals/{wid}/mark-paid", token=A, json={"paid_reference": "MOMO-1"})
+    post("/telegram/webhook", json={"update_id": 1, "message": {"chat": {"id": 901}, "from": {"id": 901}, "text": "/upload_digital"}})
+    post("/telegram/webhook", json={"update_id": 2, "message": {"chat": {"id": 901}, "from": {"id": 901}, "document": {"file_id": "BQ9", "file_name": "x.pdf"}}})
+    get("/health"); get("/metrics")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+    try:
+        import httpx  # noqa: F401  (fastapi.testclient)
+    except ImportError:
+        print("query budgets need httpx: pip install -r requirements-dev.txt", file=sys.stderr)
+        return 2
+
+    tmp = tempfile.TemporaryDirectory()
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    os.environ.update({
+        "DATABASE_PATH": str(Path(tmp.name) / "budget.sqlite3"), "MEDIA_CACHE_DIR": str(Path(tmp.name) / "media"),
+        "QUERY_BUDGETS": "1", "RUN_WORKERS": "0", "TELEGRAM_MODE": "webhook",
+        "WEB_CONCURRENCY": "1",  # budgets are per single-process deployment; WEB_CONCURRENCY adds cache_invalidations writes
+        "BOT_TOKEN": BOT_TOKEN, "PAYSTACK_SECRET_KEY": PAYSTACK_SECRET_KEY, "ADMIN_TELEGRAM_IDS": "900",
+        "PAYSTACK_BASE_URL": f"http://127.0.0.1:{stub.server_address[1]}", "TELEGRAM_API_BASE": f"http://127.0.0.1:{stub.server_address[1]}",
+    })
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from fastapi.testclient import TestClient
+    from app import query_budget
+    from app.db import pool, writer
+    from app.main import app
+    from app.query_budget import BUDGETS
+
+    reports = []
+    query_budget.reports = reports
+    try:
+        with TestClient(app) as c:
+            scenario(c)
+    finally:
+        writer.close()
+        pool.close_all()
+        stub.shutdown()
+        tmp.cleanup()
+
+    failed = 0
+    for key, rec in reports:
+        problems = rec.problems(key)
+        if problems:
+            failed += 1
+            print(f"OVER {key}: " + "; ".join(problems))
+        if args.verbose:
+            print(f"{len(rec.statements):>3}  {key}")
+            for fp in rec.statements:
+                print(f"       {fp[:160]}")
+    seen = {key for key, _ in reports}
+    for key in sorted(k for k in BUDGETS if k not in seen):
+        print(f"not exercised: {key}")
+    print(f"{len(reports)} request(s) checked, {failed} over budget or N+1")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
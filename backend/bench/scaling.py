@@ -0,0 +1,63 @@
+"""Throughput vs worker processes: runs bench/load.py once per --workers value against copies of one seeded database
+and prints requests/s per scenario next to the single-worker figure.
+
+    python bench/scaling.py --workers 1,2,4 --scale 0.02 --duration 10
+    python bench/scaling.py --db /tmp/full.sqlite3 --scenarios browse,cart --concurrency 64
+"""
+import argparse, json, os, sqlite3, subprocess, sys, tempfile
+from pathlib import Path
+
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH.parent))
+sys.path.insert(0, str(BENCH))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--db", help="seeded database (see bench/seed.py); seeded once at --scale when omitted")
+    parser.add_argument("--scale", type=float, default=0.02)
+    parser.add_argument("--scenarios", default="browse,cart,checkout,vendor")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--out", help="write {workers: load.py results} JSON here")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-scaling-"))
+    db = args.db
+    if not db:
+        from seed import FULL_SCALE, seed
+        from app.init_db import migrate
+        db = str(workdir / "seed.sqlite3")
+        conn = sqlite3.connect(db)
+        conn.execute("PRAGMA journal_mode = WAL")
+        migrate(conn)
+        seed(conn, {k: max(1, int(v * args.scale)) for k, v in FULL_SCALE.items()})
+        conn.close()
+
+    runs = {}
+    for n in [int(w) for w in args.workers.split(",")]:
+        out = workdir / f"workers-{n}.json"
+        print(f"--- {n} worker(s)", flush=True)
+        subprocess.run([sys.executable, str(BENCH / "load.py"), "--db", db, "--scenarios", args.scenarios,
+                        "--concurrency", str(args.concurrency), "--duration", str(args.duration),
+                        "--app-args", f"--workers {n}", "--out", str(out)],
+                       check=True, env={**os.environ, "WEB_CONCURRENCY": str(n)}, stdout=subprocess.DEVNULL)
+        runs[n] = json.loads(out.read_text())
+
+    counts = sorted(runs)
+    base = runs[counts[0]]["scenarios"]
+    print(f"\n{'scenario':<10}" + "".join(f" {f'{n}w req/s':>11} {'x':>5}" for n in counts) + f" {'p99 ms (' + str(counts[-1]) + 'w)':>15}")
+    for name in args.scenarios.split(","):
+        row = f"{name:<10}"
+        for n in counts:
+            s = runs[n]["scenarios"][name]
+            row += f" {s['rps']:>11.1f} {s['rps'] / base[name]['rps']:>5.2f}"
+        worst = max(r["p99_ms"] for r in runs[counts[-1]]["scenarios"][name]["routes"].values())
+        print(row + f" {worst:>15.1f}")
+    errors = {n: sum(r["errors"] for s in runs[n]["scenarios"].values() for r in s["routes"].values()) for n in counts}
+    print("5xx per run: " + ", ".join(f"{n}w={e}" for n, e in errors.items()))
+    if args.out:
+        Path(args.out).write_text(json.dumps(runs, indent=2))
+
+if __name__ == "__main__":
+    main()
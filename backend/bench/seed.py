@@ -0,0 +1,149 @@
+"""Build a SQLite database at realistic scale for benchmarks. Rows are generated inside SQLite with recursive
+CTEs, so even --scale 1 (10k vendors, 500k products, 2M order_items, 5M wallet_ledger rows) takes minutes, not hours.
+
+    python bench/seed.py --db /tmp/bench.sqlite3 --scale 0.02
+    python bench/seed.py --db /tmp/full.sqlite3 --scale 1 --ledger 5000000
+"""
+import argparse, sqlite3, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.init_db import MIGRATIONS_DIR, migrate
+
+FULL_SCALE = {"vendors": 10_000, "buyers": 200_000, "products": 500_000, "orders": 600_000, "order_items": 2_000_000, "ledger": 5_000_000}
+
+WORDS = ("solar lamp charger wireless earbuds leather wallet kente scarf shea butter mathematics physics chemistry biology "
+         "past questions waec bece novel guide template resume invoice logo design laptop stand phone case speaker "
+         "sneakers backpack notebook calculator router cable adapter portrait canvas braids wig perfume rice cooker").split()
+
+def _series(n: int) -> str:
+    return f"WITH RECURSIVE s(i) AS (SELECT 0 UNION ALL SELECT i+1 FROM s WHERE i < {int(n) - 1})"
+
+def _step(label: str, db, sql: str, params=()):
+    t0 = time.perf_counter()
+    db.execute(sql, params)
+    n = db.execute("SELECT changes()").fetchone()[0]
+    db.commit()
+    print(f"  {label:<26} {n:>10,} rows  {time.perf_counter() - t0:6.1f}s", flush=True)
+
+def seed(db, counts: dict, commission_rate: float = 0.10):
+    V, B, P, O, N, L = (int(counts[k]) for k in ("vendors", "buyers", "products", "orders", "order_items", "ledger"))
+    db.execute("PRAGMA synchronous = OFF")
+    db.execute("PRAGMA foreign_keys = OFF")
+    db.execute("CREATE TEMP TABLE bench_words(id INTEGER PRIMARY KEY, w TEXT)")
+    db.executemany("INSERT INTO bench_words(id, w) VALUES(?,?)", list(enumerate(WORDS)))
+    db.execute("CREATE TEMP TABLE bench_categories AS SELECT slug FROM categories ORDER BY slug")
+    nw, nc = len(WORDS), db.execute("SELECT COUNT(*) FROM bench_categories").fetchone()[0]
+
+    _step("users", db, f"""{_series(V + B)}
+        INSERT INTO users(id, telegram_id, first_name, role, created_at)
+        SELECT i+1, 5000000+i, 'user'||i, CASE WHEN i < {V} THEN 'vendor' ELSE 'customer' END,
+               datetime('now', '-' || (abs(random()) % 31536000) || ' seconds') FROM s""")
+    _step("vendors", db, f"""{_series(V)}
+        INSERT INTO vendors(id, user_id, store_name, sell_type, phone, location)
+        SELECT i+1, i+1, 'Store '||i||' '||(SELECT w FROM bench_words WHERE id=i % {nw}),
+               CASE i % 3 WHEN 0 THEN 'physical' WHEN 1 THEN 'digital' ELSE 'both' END, '024'||(1000000+i), 'Accra' FROM s""")
+    _step("vendor_subscriptions", db, f"""{_series(V)}
+        INSERT INTO vendor_subscriptions(vendor_id, plan_id, status, renews_at)
+        SELECT i+1, 4 + (i % 2), CASE WHEN i % 20 = 0 THEN 'inactive' ELSE 'active' END,
+               strftime('%Y-%m-%dT%H:%M:%SZ', 'now', '+' || (i % 30) || ' days') FROM s""")
+    # vendor sell_type decides product type: i % V is the vendor index, so i % V % 3 is its sell_type
+    _step("products", db, f"""{_series(P)}
+        INSERT INTO products(id, vendor_id, type, name, short_description, long_description, category_slug, price_pesewas,
+                             is_active, cover_image_file_id, created_at)
+        SELECT i+1, i % {V} + 1,
+               CASE (i % {V}) % 3 WHEN 0 THEN 'physical' WHEN 1 THEN 'digital' ELSE CASE i % 2 WHEN 0 THEN 'physical' ELSE 'digital' END END,
+               (SELECT w FROM bench_words WHERE id=(i * 7) % {nw}) || ' ' || (SELECT w FROM bench_words WHERE id=(i * 13 + 5) % {nw}) || ' ' || i,
+               'Short description for item ' || i,
+               'Long description for item ' || i || '. ' || (SELECT w FROM bench_words WHERE id=(i * 3) % {nw}) || ' quality guaranteed.',
+               (SELECT slug FROM bench_categories WHERE rowid=1 + i % {nc}),
+               100 + abs(random()) % 50000, CASE WHEN i % 25 = 0 THEN 0 ELSE 1 END, 'AgACAgQAAxk' || hex(i),
+               datetime('now', '-' || (abs(random()) % 31536000) || ' seconds') FROM s""")
+    _step("product_images", db, "INSERT INTO product_images(product_id, telegram_file_id, sort_order) SELECT id, 'AgACimg'||hex(id), 1 FROM products WHERE id % 2 = 0")
+    _step("product_digital_assets", db, "INSERT INTO product_digital_assets(product_id, telegram_file_id) SELECT id, 'BQACAgQ'||hex(id) FROM products WHERE type='digital'")
+
+    # pick lists so every order only gets items of its own type; odd order ids are digital
+    db.execute("CREATE TEMP TABLE bench_physical AS SELECT id FROM products WHERE type='physical' ORDER BY id")
+    db.execute("CREATE TEMP TABLE bench_digital AS SELECT id FROM products WHERE type='digital' ORDER BY id")
+    nphys = max(1, db.execute("SELECT COUNT(*) FROM bench_physical").fetchone()[0])
+    ndig = max(1, db.execute("SELECT COUNT(*) FROM bench_digital").fetchone()[0])
+
+    _step("orders", db, f"""{_series(O)}
+        INSERT INTO orders(id, user_id, type, status, created_at, paid_at)
+        SELECT i+1, {V} + 1 + abs(random()) % {B}, CASE WHEN (i+1) % 2 THEN 'digital' ELSE 'physical' END,
+               CASE WHEN (i+1) % 2 THEN CASE WHEN i % 10 = 0 THEN 'pending_payment' ELSE 'paid' END ELSE 'new' END,
+               c, CASE WHEN (i+1) % 2 AND i % 10 != 0 THEN c END
+        FROM (SELECT i, datetime('now', '-' || (abs(random()) % 31536000) || ' seconds') AS c FROM s)""")
+    _step("order_items", db, f"""{_series(N)}
+        INSERT INTO order_items(order_id, product_id, vendor_id, product_type, name_snapshot, price_pesewas, qty,
+                                commission_pesewas, vendor_net_pesewas, created_at)
+        SELECT x.o, p.id, p.vendor_id, p.type, p.name, p.price_pesewas, x.q,
+               CASE p.type WHEN 'digital' THEN CAST(round(p.price_pesewas * x.q * {commission_rate}) AS INTEGER) ELSE 0 END,
+               CASE p.type WHEN 'digital' THEN p.price_pesewas * x.q - CAST(round(p.price_pesewas * x.q * {commission_rate}) AS INTEGER) ELSE 0 END,
+               o.created_at
+        FROM (SELECT 1 + i % {O} AS o, 1 + abs(random()) % 3 AS q, abs(random()) AS r FROM s) x
+        JOIN orders o ON o.id = x.o
+        JOIN products p ON p.id = CASE WHEN x.o % 2 THEN (SELECT id FROM bench_digital WHERE rowid = 1 + x.r % {ndig})
+                                                    ELSE (SELECT id FROM bench_physical WHERE rowid = 1 + x.r % {nphys}) END""")
+    _step("order totals", db, """UPDATE orders SET total_pesewas=(SELECT COALESCE(SUM(price_pesewas*qty), 0) FROM order_items WHERE order_id=orders.id),
+                                                  paystack_reference=CASE type WHEN 'digital' THEN 'ord_'||id||'_'||user_id END""")
+    _step("payments", db, """INSERT INTO payments(purpose, order_id, reference, amount_pesewas, status, created_at)
+                             SELECT 'order', id, paystack_reference, total_pesewas, CASE status WHEN 'paid' THEN 'success' ELSE 'initiated' END, created_at
+                             FROM orders WHERE type='digital'""")
+    _step("vendor_order_status", db, "INSERT OR IGNORE INTO vendor_order_status(order_id, vendor_id, status, updated_at) SELECT order_id, vendor_id, 'new', created_at FROM order_items WHERE product_type='physical'")
+    _step("order_delivery_details", db, "INSERT INTO order_delivery_details(order_id, full_name, phone, region, city, address) SELECT id, 'Buyer '||user_id, '0200000000', 'Greater Accra', 'Accra', 'House '||id FROM orders WHERE type='physical'")
+
+    # sale credits for paid digital items first, then withdrawal debits and adjustments until the ledger reaches L rows
+    _step("wallet_ledger (sales)", db, f"""INSERT INTO wallet_ledger(vendor_id, type, reason, amount_pesewas, order_id, created_at)
+        SELECT oi.vendor_id, 'credit', 'sale', oi.vendor_net_pesewas, oi.order_id, o.paid_at
+        FROM order_items oi JOIN orders o ON o.id=oi.order_id WHERE o.status='paid' AND oi.product_type='digital' LIMIT {L}""")
+    rest = L - db.execute("SELECT COUNT(*) FROM wallet_ledger").fetchone()[0]
+    if rest > 0:
+        _step("wallet_ledger (filler)", db, f"""{_series(rest)}
+            INSERT INTO wallet_ledger(vendor_id, type, reason, amount_pesewas, created_at)
+            SELECT 1 + abs(random()) % {V}, CASE WHEN i % 5 = 0 THEN 'debit' ELSE 'credit' END,
+                   CASE WHEN i % 5 = 0 THEN 'withdrawal' ELSE 'adjustment' END,
+                   CASE WHEN i % 5 = 0 THEN 100 + abs(random()) % 1000 ELSE 500 + abs(random()) % 5000 END,
+                   datetime('now', '-' || (abs(random()) % 31536000) || ' seconds') FROM s""")
+    _step("withdrawal_requests", db, f"""{_series(max(1, V // 10))}
+        INSERT INTO withdrawal_requests(vendor_id, amount_pesewas, status, requested_at)
+        SELECT 1 + (i * 10) % {V}, 500 + abs(random()) % 2000, CASE WHEN i % 3 = 0 THEN 'approved' ELSE 'pending' END,
+               datetime('now', '-' || (abs(random()) % 604800) || ' seconds') FROM s""")
+
+    t0 = time.perf_counter()
+    db.executescript((MIGRATIONS_DIR / "0003_vendor_balances.sql").read_text(encoding="utf-8"))
+    print(f"  {'vendor_balances':<26} {V:>10,} rows  {time.perf_counter() - t0:6.1f}s")
+    for t in ("bench_words", "bench_categories", "bench_physical", "bench_digital"):
+        db.execute(f"DROP TABLE temp.{t}")
+    t0 = time.perf_counter()
+    db.execute("ANALYZE")
+    db.commit()
+    print(f"  {'ANALYZE':<26} {'':>10}       {time.perf_counter() - t0:6.1f}s")
+    db.execute("PRAGMA foreign_keys = ON")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", required=True)
+    parser.add_argument("--scale", type=float, default=0.02, help="fraction of the full-scale row counts")
+    for k in FULL_SCALE:
+        parser.add_argument(f"--{k.replace('_', '-')}", type=int, help=f"override row count (full scale: {FULL_SCALE[k]:,})")
+    args = parser.parse_args()
+
+    counts = {k: getattr(args, k) or max(1, int(v * args.scale)) for k, v in FULL_SCALE.items()}
+    path = Path(args.db)
+    if path.exists():
+        sys.exit(f"{path} exists; seed into a fresh file")
+
+    from app.settings import settings
+
+    db = sqlite3.connect(str(path))
+    db.execute("PRAGMA journal_mode = WAL")
+    migrate(db)
+    print("seeding", ", ".join(f"{k}={v:,}" for k, v in counts.items()))
+    t0 = time.perf_counter()
+    seed(db, counts, settings.COMMISSION_RATE)
+    db.close()
+    print(f"done in {time.perf_counter() - t0:.1f}s, {path.stat().st_size / 1e6:.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Per-1k-row cost of building list responses: sqlite3.Row + dict() + jsonable_encoder + json
+(the previous path) against fetch_all() + orjson (the ORJSONResponse path), and the same path with a list-view ?fields=
+projection. Each result also reports the body size after gzip (and br when the brotli package is installed).
+
+    python bench/serialization.py --rows 1000 --repeat 200
+"""
+import argparse, json, sqlite3, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from app.db import fetch_all
+    from app.init_db import migrate
+    from app.compression import _compress, brotli
+    from app.fields import select_columns
+    from app.routes.products import PRODUCT_FIELDS
+
+    db = sqlite3.connect(":memory:")
+    db.row_factory = sqlite3.Row
+    migrate(db)
+    db.execute("INSERT INTO users(id, telegram_id) VALUES(1, 1)")
+    db.execute("INSERT INTO vendors(id, user_id, store_name, sell_type) VALUES(1, 1, 'Bench Store', 'both')")
+    db.executemany("INSERT INTO products(vendor_id, type, name, short_description, long_description, category_slug, price_pesewas, cover_image_file_id) VALUES(1,'digital',?,?,?,'ebooks',?,?)",
+                   [(f"Product {i}", "A short description of the item", "A much longer description. " * 20, 1000 + i, f"AgACAgQAAxkBAAI{i:08d}") for i in range(args.rows)])
+
+    def before():
+        rows = [dict(r) for r in db.execute("SELECT * FROM products WHERE vendor_id=? ORDER BY created_at DESC", (1,)).fetchall()]
+        return json.dumps(jsonable_encoder(rows), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+    def after():
+        return orjson.dumps(fetch_all(db, f"SELECT {select_columns(None, PRODUCT_FIELDS)} FROM products WHERE vendor_id=? ORDER BY created_at DESC", (1,)))
+
+    def sparse():
+        cols = select_columns("id,name,price_pesewas,stock_status,cover_image_file_id", PRODUCT_FIELDS)
+        return orjson.dumps(fetch_all(db, f"SELECT {cols} FROM products WHERE vendor_id=? ORDER BY created_at DESC", (1,)))
+
+    results = {}
+    for name, fn in (("before", before), ("after", after), ("sparse", sparse)):
+        fn()
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            body = fn()
+        per_call = (time.perf_counter() - t0) / args.repeat
+        results[name] = {"ms_per_1k_rows": per_call * 1000 * 1000 / args.rows, "bytes": len(body), "gzip_bytes": len(_compress(body, "gzip"))}
+        if brotli is not None:
+            results[name]["br_bytes"] = len(_compress(body, "br"))
+    results["speedup"] = results["before"]["ms_per_1k_rows"] / results["after"]["ms_per_1k_rows"]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
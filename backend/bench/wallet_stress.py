@@ -0,0 +1,72 @@
+"""Concurrent withdrawal stress: many threads race to withdraw from one vendor wallet; fails on overdraft.
+
+    python bench/wallet_stress.py --threads 50 --requests 2000
+"""
+import argparse, os, random, sys, tempfile, threading, time
+from pathlib import Path
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--vendors", type=int, default=3)
+    parser.add_argument("--credit", type=int, default=100_000)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_PATH"] = str(Path(tempfile.mkdtemp()) / "wallet_stress.sqlite3")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from fastapi import HTTPException
+    from app.init_db import init_db
+    from app.db import get_db
+    from app.wallet import post_ledger_entry, reconcile, settle_withdrawal
+    from app.routes.vendor import request_withdrawal, WithdrawalCreateIn
+
+    init_db()
+    with get_db(immediate=True) as db:
+        for i in range(1, args.vendors + 1):
+            db.execute("INSERT INTO users(id, telegram_id, role) VALUES(?,?, 'vendor')", (i, 1000 + i))
+            db.execute("INSERT INTO vendors(id, user_id, store_name, sell_type) VALUES(?,?,?, 'digital')", (i, i, f"v{i}"))
+            post_ledger_entry(db, i, "credit", "sale", args.credit)
+
+    ok, rejected, errors = [0], [0], []
+    lock = threading.Lock()
+    per_thread = args.requests // args.threads
+
+    def worker():
+        rnd = random.Random()
+        for _ in range(per_thread):
+            vid = rnd.randint(1, args.vendors)
+            try:
+                request_withdrawal(WithdrawalCreateIn(amount_pesewas=rnd.randint(100, 5_000)), vendor={"user_id": vid, "role": "vendor", "vendor_id": vid})
+                with lock: ok[0] += 1
+            except HTTPException:
+                with lock: rejected[0] += 1
+            except Exception as e:
+                with lock: errors.append(repr(e))
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - t0
+
+    # pay out a slice so settled debits are exercised too
+    with get_db(immediate=True) as db:
+        for w in db.execute("SELECT id, vendor_id, amount_pesewas FROM withdrawal_requests ORDER BY id LIMIT 50").fetchall():
+            settle_withdrawal(db, w["vendor_id"], w["id"], w["amount_pesewas"])
+            db.execute("UPDATE withdrawal_requests SET status='paid', paid_at=datetime('now') WHERE id=?", (w["id"],))
+
+    with get_db() as db:
+        overdrawn = db.execute("""SELECT b.vendor_id, b.credited_pesewas - COALESCE(SUM(w.amount_pesewas), 0) AS left_over
+                                  FROM vendor_balances b LEFT JOIN withdrawal_requests w ON w.vendor_id=b.vendor_id
+                                  GROUP BY b.vendor_id HAVING left_over < 0""").fetchall()
+        mismatches = reconcile(db)
+
+    print(f"{ok[0]} accepted, {rejected[0]} rejected, {len(errors)} errors in {elapsed:.2f}s ({(ok[0]+rejected[0])/elapsed:.0f} req/s)")
+    print(f"overdrawn vendors: {len(overdrawn)}, reconcile mismatches: {len(mismatches)}")
+    if errors:
+        print("first error:", errors[0])
+    return 1 if overdrawn or mismatches or errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Write-burst throughput: small write units (cart add, wishlist toggle, upload record) from many threads, comparing
+deferred transactions (the old route behaviour), BEGIN IMMEDIATE on pooled connections and the group-commit writer
+(DB_WRITE_QUEUE=1). Each mode runs in its own process against a fresh database; readers run alongside the writers.
+
+    python bench/write_queue.py --threads 64 --seconds 10
+    python bench/write_queue.py --modes immediate,queue --synchronous FULL
+"""
+import argparse, json, os, random, subprocess, sys, tempfile, threading, time
+from pathlib import Path
+
+MODES = ("deferred", "immediate", "queue")
+
+def _pct(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+def child(args):
+    os.environ["DATABASE_PATH"] = str(Path(tempfile.mkdtemp()) / "write_queue.sqlite3")
+    os.environ["DB_WRITE_QUEUE"] = "1" if args.mode == "queue" else "0"
+    os.environ["DB_SYNCHRONOUS"] = args.synchronous
+    os.environ["DB_POOL_SIZE"] = str(args.threads + args.readers + 4)
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    import sqlite3
+    from app.init_db import init_db
+    from app.db import get_db, writer
+    from app import metrics
+
+    init_db()
+    with get_db(immediate=True) as db:
+        db.execute("INSERT INTO users(id, telegram_id, role) VALUES(1, 1, 'vendor')")
+        db.execute("INSERT INTO vendors(id, user_id, store_name, sell_type) VALUES(1, 1, 'bench', 'both')")
+        db.executemany("INSERT INTO users(id, telegram_id) VALUES(?, ?)", [(i, i) for i in range(2, args.users + 2)])
+        db.executemany("""INSERT INTO products(vendor_id, type, name, short_description, long_description, category_slug, price_pesewas)
+                          VALUES(1, 'physical', ?, 's', 'l', 'electronics', 1000)""", [(f"p{i}",) for i in range(200)])
+
+    write = lambda: get_db() if args.mode == "deferred" else get_db(immediate=True)
+
+    def cart_add(rnd):
+        uid = rnd.randint(2, args.users + 1)
+        with write() as db:
+            cart = db.execute("INSERT INTO carts(user_id) VALUES(?) ON CONFLICT(user_id) DO UPDATE SET updated_at=datetime('now') RETURNING id", (uid,)).fetchone()
+            db.execute("""INSERT INTO cart_items(cart_id, product_id, qty) SELECT ?, id, 1 FROM products WHERE id=? AND is_active=1
+                          ON CONFLICT(cart_id, product_id) DO UPDATE SET qty=qty+excluded.qty""", (cart["id"], rnd.randint(1, 200)))
+
+    def wishlist_toggle(rnd):
+        uid, pid = rnd.randint(2, args.users + 1), rnd.randint(1, 200)
+        with write() as db:
+            if db.execute("DELETE FROM wishlists WHERE user_id=? AND product_id=?", (uid, pid)).rowcount == 0:
+                db.execute("INSERT OR IGNORE INTO wishlists(user_id, product_id) VALUES(?,?)", (uid, pid))
+
+    def upload_record(rnd):
+        with write() as db:
+            db.execute("INSERT INTO vendor_uploads(vendor_id, kind, telegram_file_id) VALUES(1, 'image', ?)", (f"AgAD{rnd.random()}",))
+
+    ops = (cart_add, wishlist_toggle, upload_record)
+    stop = threading.Event()
+    lock = threading.Lock()
+    write_lat, read_lat, errors = [], [], {}
+
+    def writer_thread(seed):
+        rnd, lat = random.Random(seed), []
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                rnd.choice(ops)(rnd)
+                lat.append(time.perf_counter() - t0)
+            except sqlite3.OperationalError as e:
+                with lock:
+                    errors[str(e)] = errors.get(str(e), 0) + 1
+        with lock:
+            write_lat.extend(lat)
+
+    def reader_thread(seed):
+        rnd, lat = random.Random(seed), []
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            with get_db() as db:
+                db.execute("SELECT id, name, price_pesewas FROM products WHERE category_slug='electronics' AND is_active=1 LIMIT 20 OFFSET ?",
+                           (rnd.randint(0, 150),)).fetchall()
+            lat.append(time.perf_counter() - t0)
+        with lock:
+            read_lat.extend(lat)
+
+    threads = [threading.Thread(target=writer_thread, args=(i,)) for i in range(args.threads)]
+    threads += [threading.Thread(target=reader_thread, args=(-i,)) for i in range(1, args.readers + 1)]
+    t0 = time.perf_counter()
+    for t in threads: t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - t0
+    writer.close()
+
+    write_lat.sort(); read_lat.sort()
+    batches = metrics.db_group_commit_size._values.get(())
+    commits = sum(batches[0]) if batches else None
+    print(json.dumps({"mode": args.mode, "synchronous": args.synchronous, "writes": len(write_lat), "writes_per_s": len(write_lat) / elapsed,
+                      "write_p50_ms": _pct(write_lat, 0.5) * 1000, "write_p99_ms": _pct(write_lat, 0.99) * 1000,
+                      "reads_per_s": len(read_lat) / elapsed, "read_p99_ms": _pct(read_lat, 0.99) * 1000,
+                      "errors": errors, "units_per_commit": len(write_lat) / commits if commits else None}))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--modes", default=",".join(MODES), help=f"comma-separated subset of {', '.join(MODES)}")
+    parser.add_argument("--threads", type=int, default=64, help="writer threads")
+    parser.add_argument("--readers", type=int, default=8, help="reader threads running alongside")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--synchronous", default="NORMAL", help="PRAGMA synchronous for the run (NORMAL, FULL)")
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        return child(args)
+
+    results = []
+    for mode in args.modes.split(","):
+        cmd = [sys.executable, __file__, "--mode", mode, "--threads", str(args.threads), "--readers", str(args.readers),
+               "--users", str(args.users), "--seconds", str(args.seconds), "--synchronous", args.synchronous]
+        results.append(json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout.strip().splitlines()[-1]))
+    print(f"{'mode':<10} {'writes/s':>9} {'w p50 ms':>9} {'w p99 ms':>9} {'reads/s':>9} {'r p99 ms':>9} {'units/commit':>12}  errors")
+    for r in results:
+        upc = f"{r['units_per_commit']:.1f}" if r["units_per_commit"] else "-"
+        print(f"{r['mode']:<10} {r['writes_per_s']:>9.0f} {r['write_p50_ms']:>9.1f} {r['write_p99_ms']:>9.1f} {r['reads_per_s']:>9.0f} {r['read_p99_ms']:>9.1f} {upc:>12}  {sum(r['errors'].values())}")
+        for msg, n in r["errors"].items():
+            print(f"{'':<10} {n}x {msg}")
+
+if __name__ == "__main__":
+    main()
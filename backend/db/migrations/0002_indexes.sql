@@ -0,0 +1,12 @@
+-- secondary indexes for the hot lookups in app/routes
+CREATE INDEX IF NOT EXISTS idx_products_vendor_active ON products(vendor_id, is_active, created_at);
+CREATE INDEX IF NOT EXISTS idx_products_category_type_active ON products(category_slug, type, is_active);
+CREATE INDEX IF NOT EXISTS idx_product_images_product ON product_images(product_id, sort_order);
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_vendor ON order_items(vendor_id);
+CREATE INDEX IF NOT EXISTS idx_wallet_ledger_vendor_type ON wallet_ledger(vendor_id, type);
+CREATE INDEX IF NOT EXISTS idx_cart_items_cart ON cart_items(cart_id);
+CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_withdrawal_requests_status ON withdrawal_requests(status, requested_at);
+CREATE INDEX IF NOT EXISTS idx_payments_order ON payments(order_id);
+CREATE INDEX IF NOT EXISTS idx_vendor_uploads_vendor ON vendor_uploads(vendor_id, kind, created_at);
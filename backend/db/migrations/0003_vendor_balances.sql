@@ -0,0 +1,19 @@
+-- materialized wallet balances, maintained alongside every wallet_ledger insert (see app/wallet.py)
+CREATE TABLE IF NOT EXISTS vendor_balances (
+  vendor_id INTEGER PRIMARY KEY,
+  credited_pesewas INTEGER NOT NULL DEFAULT 0,
+  debited_pesewas INTEGER NOT NULL DEFAULT 0,
+  reserved_pesewas INTEGER NOT NULL DEFAULT 0,
+  updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+  FOREIGN KEY (vendor_id) REFERENCES vendors(id) ON DELETE CASCADE
+);
+
+INSERT OR REPLACE INTO vendor_balances(vendor_id, credited_pesewas, debited_pesewas, reserved_pesewas)
+SELECT v.id, COALESCE(l.credited, 0), COALESCE(l.debited, 0), COALESCE(w.reserved, 0)
+FROM vendors v
+LEFT JOIN (SELECT vendor_id,
+                  SUM(CASE WHEN type='credit' THEN amount_pesewas ELSE 0 END) AS credited,
+                  SUM(CASE WHEN type='debit' THEN amount_pesewas ELSE 0 END) AS debited
+           FROM wallet_ledger GROUP BY vendor_id) l ON l.vendor_id=v.id
+LEFT JOIN (SELECT vendor_id, SUM(amount_pesewas) AS reserved
+           FROM withdrawal_requests WHERE status IN ('pending','approved') GROUP BY vendor_id) w ON w.vendor_id=v.id;
@@ -0,0 +1,2 @@
+-- checkout commits the payment row before calling Paystack and records the URL afterwards
+ALTER TABLE payments ADD COLUMN authorization_url TEXT;
@@ -0,0 +1,18 @@
+-- verified Paystack webhook events, stored by the webhook and applied by app/paystack_events.py workers
+CREATE TABLE IF NOT EXISTS paystack_events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  event_key TEXT NOT NULL UNIQUE,
+  event_type TEXT NOT NULL,
+  reference TEXT,
+  payload_json TEXT NOT NULL,
+  status TEXT NOT NULL DEFAULT 'pending',
+  attempts INTEGER NOT NULL DEFAULT 0,
+  next_attempt_at TEXT NOT NULL DEFAULT (datetime('now')),
+  lease_until TEXT,
+  last_error TEXT,
+  received_at TEXT NOT NULL DEFAULT (datetime('now')),
+  processed_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_paystack_events_due ON paystack_events(status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_paystack_events_reference ON paystack_events(reference, status);
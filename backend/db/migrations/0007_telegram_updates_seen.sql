@@ -0,0 +1,7 @@
+-- update_ids already handled, so redelivered webhook/getUpdates batches are skipped
+CREATE TABLE IF NOT EXISTS telegram_updates_seen (
+  update_id INTEGER PRIMARY KEY,
+  received_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_telegram_updates_seen_received ON telegram_updates_seen(received_at);
@@ -0,0 +1,3 @@
+-- Idempotency-Key sent with a checkout; a retry with the same key returns the order it already created
+ALTER TABLE orders ADD COLUMN idempotency_key TEXT;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_user_idempotency ON orders(user_id, idempotency_key) WHERE idempotency_key IS NOT NULL;
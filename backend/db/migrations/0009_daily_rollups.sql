@@ -0,0 +1,43 @@
+-- daily sales rollups for admin analytics, kept current by app/analytics.py:record_order
+-- (physical orders count on the day they are placed, digital orders on the day they are paid)
+CREATE TABLE IF NOT EXISTS daily_sales (
+  day TEXT NOT NULL,
+  vendor_id INTEGER NOT NULL,
+  category_slug TEXT NOT NULL DEFAULT '',
+  product_type TEXT NOT NULL,
+  orders INTEGER NOT NULL DEFAULT 0,
+  items INTEGER NOT NULL DEFAULT 0,
+  gmv_pesewas INTEGER NOT NULL DEFAULT 0,
+  commission_pesewas INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, vendor_id, category_slug, product_type)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_daily_sales_vendor_day ON daily_sales(vendor_id, day);
+
+-- one row per day and order type; orders are counted once here even when they span several vendors
+CREATE TABLE IF NOT EXISTS daily_totals (
+  day TEXT NOT NULL,
+  product_type TEXT NOT NULL,
+  orders INTEGER NOT NULL DEFAULT 0,
+  items INTEGER NOT NULL DEFAULT 0,
+  gmv_pesewas INTEGER NOT NULL DEFAULT 0,
+  commission_pesewas INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (day, product_type)
+) WITHOUT ROWID;
+
+INSERT OR REPLACE INTO daily_sales(day, vendor_id, category_slug, product_type, orders, items, gmv_pesewas, commission_pesewas)
+SELECT date(CASE o.type WHEN 'digital' THEN o.paid_at ELSE o.created_at END), oi.vendor_id, COALESCE(p.category_slug, ''), oi.product_type,
+       COUNT(DISTINCT oi.order_id), SUM(oi.qty), SUM(oi.price_pesewas*oi.qty), SUM(oi.commission_pesewas)
+FROM order_items oi
+JOIN orders o ON o.id=oi.order_id
+JOIN products p ON p.id=oi.product_id
+WHERE (o.type='digital' AND o.paid_at IS NOT NULL) OR (o.type='physical' AND o.status!='cancelled')
+GROUP BY 1, 2, 3, 4;
+
+INSERT OR REPLACE INTO daily_totals(day, product_type, orders, items, gmv_pesewas, commission_pesewas)
+SELECT date(CASE o.type WHEN 'digital' THEN o.paid_at ELSE o.created_at END), o.type,
+       COUNT(DISTINCT o.id), SUM(oi.qty), SUM(oi.price_pesewas*oi.qty), SUM(oi.commission_pesewas)
+FROM order_items oi
+JOIN orders o ON o.id=oi.order_id
+WHERE (o.type='digital' AND o.paid_at IS NOT NULL) OR (o.type='physical' AND o.status!='cancelled')
+GROUP BY 1, 2;
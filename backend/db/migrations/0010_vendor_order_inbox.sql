@@ -0,0 +1,2 @@
+-- vendor order inbox: status filter + (updated_at, order_id) keyset order straight off the index
+CREATE INDEX IF NOT EXISTS idx_vendor_order_status_inbox ON vendor_order_status(vendor_id, status, updated_at, order_id);
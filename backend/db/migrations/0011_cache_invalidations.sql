@@ -0,0 +1,7 @@
+-- cross-process cache invalidation log (app/invalidation.py); AUTOINCREMENT so ids never go backwards after pruning
+CREATE TABLE IF NOT EXISTS cache_invalidations (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  scope TEXT NOT NULL,
+  key INTEGER,
+  created_at TEXT NOT NULL DEFAULT (datetime('now'))
+);
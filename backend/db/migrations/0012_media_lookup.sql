@@ -0,0 +1,4 @@
+-- /api/media/{file_id} only proxies image file_ids the catalog knows about; these make that check an index probe
+CREATE INDEX IF NOT EXISTS idx_product_images_file ON product_images(telegram_file_id);
+CREATE INDEX IF NOT EXISTS idx_products_cover_image ON products(cover_image_file_id) WHERE cover_image_file_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_vendor_uploads_file ON vendor_uploads(telegram_file_id, kind);
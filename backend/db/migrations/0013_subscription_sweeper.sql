@@ -0,0 +1,27 @@
+-- subscription expiry sweeper (app/subscriptions.py): lapsed subscriptions are found by renews_at
+CREATE INDEX IF NOT EXISTS idx_vendor_subscriptions_status_renews ON vendor_subscriptions(status, renews_at);
+
+-- renews_at a renewal reminder was last queued for, so each billing period gets one reminder
+ALTER TABLE vendor_subscriptions ADD COLUMN reminded_for TEXT;
+
+-- 1 when the sweeper deactivated a listing for being over the plan limit; such listings come back on renewal
+ALTER TABLE products ADD COLUMN paused_by_plan INTEGER NOT NULL DEFAULT 0;
+
+-- per-vendor active listing counter, kept by triggers so plan checks never COUNT(*) products
+ALTER TABLE vendors ADD COLUMN active_listings INTEGER NOT NULL DEFAULT 0;
+
+UPDATE vendors SET active_listings=(SELECT COUNT(*) FROM products p WHERE p.vendor_id=vendors.id AND p.is_active=1);
+
+CREATE TRIGGER IF NOT EXISTS products_listings_ai AFTER INSERT ON products WHEN NEW.is_active=1 BEGIN
+  UPDATE vendors SET active_listings=active_listings+1 WHERE id=NEW.vendor_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_listings_ad AFTER DELETE ON products WHEN OLD.is_active=1 BEGIN
+  UPDATE vendors SET active_listings=active_listings-1 WHERE id=OLD.vendor_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_listings_au AFTER UPDATE OF is_active, vendor_id ON products
+WHEN (OLD.is_active=1) != (NEW.is_active=1) OR (NEW.is_active=1 AND OLD.vendor_id != NEW.vendor_id) BEGIN
+  UPDATE vendors SET active_listings=active_listings-1 WHERE id=OLD.vendor_id AND OLD.is_active=1;
+  UPDATE vendors SET active_listings=active_listings+1 WHERE id=NEW.vendor_id AND NEW.is_active=1;
+END;
@@ -0,0 +1,9 @@
+-- one cart_items row per (cart, product): fold duplicate rows into the oldest one before adding the unique index
+UPDATE cart_items SET qty=(SELECT SUM(d.qty) FROM cart_items d WHERE d.cart_id=cart_items.cart_id AND d.product_id=cart_items.product_id)
+WHERE id IN (SELECT MIN(id) FROM cart_items GROUP BY cart_id, product_id HAVING COUNT(*) > 1);
+
+DELETE FROM cart_items WHERE id NOT IN (SELECT MIN(id) FROM cart_items GROUP BY cart_id, product_id);
+
+-- the unique index leads with cart_id, so it replaces idx_cart_items_cart
+DROP INDEX IF EXISTS idx_cart_items_cart;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_cart_items_cart_product ON cart_items(cart_id, product_id);
@@ -236,3 +236,37 @@ CREATE TABLE IF NOT EXISTS upload_states (
   kind TEXT NOT NULL,
   created_at TEXT NOT NULL DEFAULT (datetime('now'))
 );
+
+-- full-text search over the catalog (rowid = products.id)
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+  name, short_description, long_description, store_name,
+  tokenize = 'unicode61 remove_diacritics 2',
+  prefix = '2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+  INSERT INTO products_fts(rowid, name, short_description, long_description, store_name)
+  VALUES (new.id, new.name, new.short_description, new.long_description, (SELECT store_name FROM vendors WHERE id=new.vendor_id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, short_description, long_description, vendor_id ON products BEGIN
+  DELETE FROM products_fts WHERE rowid=old.id;
+  INSERT INTO products_fts(rowid, name, short_description, long_description, store_name)
+  VALUES (new.id, new.name, new.short_description, new.long_description, (SELECT store_name FROM vendors WHERE id=new.vendor_id));
+END;
+
+CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+  DELETE FROM products_fts WHERE rowid=old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS vendors_fts_au AFTER UPDATE OF store_name ON vendors BEGIN
+  UPDATE products_fts SET store_name=new.store_name WHERE rowid IN (SELECT id FROM products WHERE vendor_id=new.id);
+END;
+
+INSERT INTO products_fts(rowid, name, short_description, long_description, store_name)
+SELECT p.id, p.name, p.short_description, p.long_description, v.store_name
+FROM products p JOIN vendors v ON v.id=p.vendor_id
+WHERE NOT EXISTS (SELECT 1 FROM products_fts f WHERE f.rowid=p.id);
+
+-- keyset pagination for the storefront listing
+CREATE INDEX IF NOT EXISTS idx_products_active_created ON products(is_active, created_at DESC, id DESC);